@@ -0,0 +1,47 @@
+'''
+Runs the benchmark suite
+
+Usage: python -m benchmarks [-c COUNT] [-r REPEAT] [--save FILE]
+                            [--baseline FILE] [--tolerance T] [name ...]
+'''
+
+import argparse
+import sys
+
+from . import suite
+
+def run():
+    argParser = argparse.ArgumentParser(description = 'pychords benchmark suite')
+    argParser.add_argument('names', nargs = '*', metavar = 'name',
+        help = 'Benchmarks to run (default: all of %s)' % ', '.join(n for n, b in suite.BENCHMARKS))
+    argParser.add_argument('-c', '--count', type = int, default = 200, help = 'Number of songs')
+    argParser.add_argument('-r', '--repeat', type = int, default = 3, help = 'Repetitions of each benchmark')
+    argParser.add_argument('--verses', type = int, default = 4, help = 'Verses per song')
+    argParser.add_argument('--cells', type = int, default = 4, help = 'Chord/lyric pairs per line')
+    argParser.add_argument('--save', help = 'Store results as JSON file')
+    argParser.add_argument('--baseline', help = 'Compare results with stored JSON file')
+    argParser.add_argument('--tolerance', type = float, default = 0.1,
+        help = 'Allowed slowdown against baseline (default: %(default)s)')
+    args = argParser.parse_args()
+
+    def log(name, result):
+        print('%-20s %9.4f s %10.1f songs/sec' % (name, result['seconds'], result['songs_per_sec']))
+
+    results = suite.runSuite(args.count, args.repeat, args.names, log,
+                             verses = args.verses, cells = args.cells)
+    if args.save:
+        suite.save(results, args.save)
+
+    if args.baseline:
+        rows = suite.compare(results, suite.load(args.baseline))
+        print()
+        print('%-20s %10s %10s %8s' % ('benchmark', 'baseline', 'current', 'ratio'))
+        for name, base, current, ratio in rows:
+            print('%-20s %10.4f %10.4f %7.2fx' % (name, base, current, ratio))
+        slower = suite.regressions(rows, args.tolerance)
+        if slower:
+            print('\nRegressions: %s' % ', '.join(r[0] for r in slower))
+            sys.exit(1)
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,52 @@
+'''
+Compiled songbook - loading songs from a memory-mapped songbook against
+tokenizing and parsing the source files
+
+Usage: python -m benchmarks.bench_compiled [-c COUNT]
+'''
+
+import argparse
+import os
+import tempfile
+import time
+
+from pychords import main, compiled, render
+from . import corpus
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+def run():
+    argParser = argparse.ArgumentParser(description = __doc__.strip().splitlines()[0])
+    argParser.add_argument('-c', '--count', type = int, default = 5000, help = 'Number of songs')
+    args = argParser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        fileNames = corpus.writeCorpus(directory, args.count)
+        bookName = os.path.join(directory, 'book' + compiled.suffix)
+
+        seconds, documents = timed(lambda: [d for f, docs, e in main.parseFiles(fileNames) for d in docs])
+        print('%-26s %8.3f s' % ('parse sources', seconds))
+        seconds, count = timed(lambda: compiled.compileSongbook(bookName, documents))
+        print('%-26s %8.3f s  %d songs, %.1f MB (sources %.1f MB)' % (
+            'compile', seconds, count, os.path.getsize(bookName) / 1e6,
+            sum(os.path.getsize(f) for f in fileNames) / 1e6))
+
+        seconds, songbook = timed(lambda: compiled.CompiledSongbook(bookName))
+        print('%-26s %8.3f s' % ('open songbook', seconds))
+        title = songbook.title(args.count // 2)
+        seconds, song = timed(lambda: songbook.byTitle(title))
+        print('%-26s %8.6f s' % ('one song by title', seconds))
+        seconds, songs = timed(lambda: list(songbook))
+        print('%-26s %8.3f s' % ('all songs', seconds))
+
+        same = all(list(render.renderToAscii(a)) == list(render.renderToAscii(b))
+                   for a, b in zip(documents, songs))
+        print('rendered output %s' % ('same' if same else 'DIFFERS'))
+        del song, songs
+        songbook.close()
+
+if __name__ == '__main__':
+    run()
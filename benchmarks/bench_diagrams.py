@@ -0,0 +1,53 @@
+'''
+Chord diagrams in PDF songbooks - shared form XObjects against grids
+drawn inline at every use, and the cost of diagrams in text/HTML output
+
+Usage: python -m benchmarks.bench_diagrams [-c COUNT]
+'''
+
+import argparse
+import os
+import tempfile
+import time
+
+from pychords import render, render2pdf
+from . import suite
+
+class InlineDiagrams(render2pdf.Render2Pdf):
+    'Reference: every grid is drawn into the page content again'
+    def drawDiagram(self, define):
+        self.drawDiagramGrid(define)
+
+def renderPdf(fileName, documents, renderer = render2pdf.Render2Pdf, diagrams = True):
+    style = render2pdf.StyleSheet()
+    style.chordDiagrams = diagrams
+    r = renderer(fileName, style, verbose = False)
+    start = time.perf_counter()
+    r.render(documents)
+    return time.perf_counter() - start, os.path.getsize(fileName), len(r.diagramForms)
+
+def run():
+    argParser = argparse.ArgumentParser(description = __doc__.strip().splitlines()[0])
+    argParser.add_argument('-c', '--count', type = int, default = 300, help = 'Number of songs')
+    args = argParser.parse_args()
+
+    documents = suite.prepare(args.count)['documents']
+    print('%d songs' % args.count)
+    with tempfile.TemporaryDirectory() as directory:
+        fileName = os.path.join(directory, 'bench.pdf')
+        for name, kw in (('no diagrams', {'diagrams': False}),
+                         ('form xobjects', {}),
+                         ('inline grids', {'renderer': InlineDiagrams})):
+            seconds, size, forms = renderPdf(fileName, documents, **kw)
+            print('pdf  %-14s %8.3f s %10d bytes %6d forms' % (name, seconds, size, forms))
+
+    for fmt in ('text', 'html'):
+        for diagrams in (False, True):
+            start = time.perf_counter()
+            for line in render.renderLines(documents, fmt, show_diagrams = diagrams):
+                pass
+            print('%-4s %-14s %8.3f s' % (fmt, 'diagrams' if diagrams else 'no diagrams',
+                                         time.perf_counter() - start))
+
+if __name__ == '__main__':
+    run()
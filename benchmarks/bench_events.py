@@ -0,0 +1,92 @@
+'''
+Metadata extraction - event API (iterator and callbacks) against full
+parse of every song and walk of its document
+
+Extracted are title, subtitle, chords used and number of rows, the
+results of all methods are compared.
+
+Usage: python -m benchmarks.bench_events [-c COUNT]
+'''
+
+import argparse
+import time
+
+from pychords import parser, events
+from . import suite
+
+def viaParse(tokens):
+    document = parser.parse(iter(tokens))
+    head = document.getroot().find('head')
+    title = head.find('title')
+    subtitle = head.find('subtitle')
+    used = set()
+    rows = 0
+    for row in document.getroot().iter('row'):
+        # {ci} and {cb} comments are kept in rows of their own
+        cells = row.findall('cho')
+        if cells:
+            rows += 1
+        for cho in cells:
+            used.add(cho.get('c'))
+    used.discard('')
+    return (title.text if title is not None else None,
+            subtitle.text if subtitle is not None else None, used, rows)
+
+def viaEvents(tokens):
+    title = subtitle = None
+    used = set()
+    rows = 0
+    for event, name, value, lineno in events.iterevents(iter(tokens)):
+        if event is events.START:
+            if name == 'cell':
+                used.add(value)
+            elif name == 'row':
+                rows += 1
+            elif name == 'meta':
+                if value[0] == 'title':
+                    title = value[1]
+                elif value[0] == 'subtitle':
+                    subtitle = value[1]
+    used.discard('')
+    return title, subtitle, used, rows
+
+class Extractor(events.Handler):
+    def __init__(self):
+        self.title = self.subtitle = None
+        self.used = set()
+        self.rows = 0
+
+    def start(self, name, value, lineno):
+        if name == 'cell':
+            self.used.add(value)
+        elif name == 'row':
+            self.rows += 1
+        elif name == 'meta':
+            if value[0] == 'title':
+                self.title = value[1]
+            elif value[0] == 'subtitle':
+                self.subtitle = value[1]
+
+def viaHandler(tokens):
+    h = events.feed(iter(tokens), Extractor())
+    h.used.discard('')
+    return h.title, h.subtitle, h.used, h.rows
+
+def run():
+    argParser = argparse.ArgumentParser(description = __doc__.strip().splitlines()[0])
+    argParser.add_argument('-c', '--count', type = int, default = 2000, help = 'Number of songs')
+    args = argParser.parse_args()
+
+    tokens = suite.prepare(args.count)['tokens']
+    results = {}
+    for name, extract in (('full parse', viaParse), ('events', viaEvents), ('handler', viaHandler)):
+        start = time.perf_counter()
+        results[name] = [extract(t) for t in tokens]
+        elapsed = time.perf_counter() - start
+        print('%-12s %8.3f s %10.0f songs/s' % (name, elapsed, len(tokens) / elapsed))
+    reference = results['full parse']
+    for name in ('events', 'handler'):
+        print('%-12s %s' % (name, 'same results' if results[name] == reference else 'DIFFERS'))
+
+if __name__ == '__main__':
+    run()
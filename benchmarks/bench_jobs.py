@@ -0,0 +1,36 @@
+'''
+Scaling of multi-file parsing (pychords -j) with number of processes
+
+Usage: python -m benchmarks.bench_jobs [-c COUNT]
+'''
+
+import argparse
+import os
+import tempfile
+import time
+
+from pychords import main
+from . import corpus
+
+def run():
+    argParser = argparse.ArgumentParser(description = __doc__.strip().splitlines()[0])
+    argParser.add_argument('-c', '--count', type = int, default = 3000, help = 'Number of songs')
+    args = argParser.parse_args()
+
+    cores = os.cpu_count() or 1
+    jobsList = sorted(set([1, 2, 4, 8, cores]))
+
+    with tempfile.TemporaryDirectory() as directory:
+        fileNames = corpus.writeCorpus(directory, args.count)
+        print('%d songs, %d cpu cores' % (len(fileNames), cores))
+        print('%6s %10s %8s' % ('jobs', 'seconds', 'speedup'))
+        base = None
+        for jobs in jobsList:
+            start = time.perf_counter()
+            documents = [d for f, docs, e in main.parseFiles(fileNames, jobs) for d in docs]
+            elapsed = time.perf_counter() - start
+            base = base or elapsed
+            print('%6d %10.3f %7.2fx' % (jobs, elapsed, base / elapsed))
+
+if __name__ == '__main__':
+    run()
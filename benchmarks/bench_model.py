@@ -0,0 +1,46 @@
+'''
+Memory per song of ElementTree and compact document models
+
+Usage: python -m benchmarks.bench_model [-c COUNT]
+'''
+
+import argparse
+import io
+import random
+import time
+import tracemalloc
+
+from pychords import tokenizer, parser, render
+from . import corpus
+
+def measure(texts, model):
+    'Returns (bytes held per song, seconds) for parsing all texts'
+    tracemalloc.start()
+    start = time.perf_counter()
+    documents = [parser.parse(tokenizer.tokenize(io.StringIO(t)), model = model) for t in texts]
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current / len(texts), elapsed, documents
+
+def run():
+    argParser = argparse.ArgumentParser(description = __doc__.strip().splitlines()[0])
+    argParser.add_argument('-c', '--count', type = int, default = 1000, help = 'Number of songs')
+    args = argParser.parse_args()
+
+    rnd = random.Random(0)
+    texts = [corpus.makeSong(rnd, i) for i in range(args.count)]
+
+    results = {}
+    for model in ('etree', 'compact'):
+        perSong, elapsed, documents = measure(texts, model)
+        results[model] = documents
+        print('%-8s %10.0f bytes/song %8.3f s parse' % (model, perSong, elapsed))
+
+    # both models must render the same
+    for a, b in zip(results['etree'], results['compact']):
+        if list(render.renderToHtmlTables(a)) != list(render.renderToHtmlTables(b)):
+            raise SystemExit('Models render differently')
+
+if __name__ == '__main__':
+    run()
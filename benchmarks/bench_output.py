@@ -0,0 +1,43 @@
+'''
+Writing of rendered text and HTML - print() per line compared with the
+buffered output sink
+
+Usage: python -m benchmarks.bench_output [-c COUNT]
+'''
+
+import argparse
+import os
+import time
+
+from pychords import render, output
+from . import suite
+
+def printLines(fileName, lines):
+    with open(fileName, 'w', encoding = 'utf-8') as f:
+        for line in lines:
+            print(line, file = f)
+
+def best(function, *args, repeat = 5):
+    'Returns the best time of repeated calls of function'
+    times = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        function(*args)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def run():
+    argParser = argparse.ArgumentParser(description = __doc__.strip().splitlines()[0])
+    argParser.add_argument('-c', '--count', type = int, default = 1000, help = 'Number of songs')
+    args = argParser.parse_args()
+
+    documents = suite.prepare(args.count)['documents']
+    # the null device leaves out file system costs common to both ways
+    for fmt in ('text', 'html', 'html_css'):
+        lines = list(render.renderLines(documents, fmt))
+        printed = best(printLines, os.devnull, lines)
+        buffered = best(output.writeTo, os.devnull, lines)
+        print('%-9s %8d lines  print %.3f s  sink %.3f s' % (fmt, len(lines), printed, buffered))
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,40 @@
+'''
+Scaling of parallel PDF rendering (render2pdf.renderParallel) with number
+of processes
+
+Usage: python -m benchmarks.bench_parallel_pdf [-c COUNT]
+'''
+
+import argparse
+import os
+import tempfile
+import time
+
+from pychords import render2pdf
+from . import suite
+
+def run():
+    argParser = argparse.ArgumentParser(description = __doc__.strip().splitlines()[0])
+    argParser.add_argument('-c', '--count', type = int, default = 2000, help = 'Number of songs')
+    args = argParser.parse_args()
+
+    documents = suite.prepare(args.count)['documents']
+    cores = os.cpu_count() or 1
+    print('%d songs, %d cpu cores' % (len(documents), cores))
+    print('%6s %10s %8s %12s' % ('jobs', 'seconds', 'speedup', 'bytes'))
+
+    with tempfile.TemporaryDirectory() as directory:
+        fileName = os.path.join(directory, 'book.pdf')
+        start = time.perf_counter()
+        render2pdf.Render2Pdf(fileName, render2pdf.StyleSheet(), verbose = False).render(documents)
+        base = time.perf_counter() - start
+        print('%6s %10.3f %7.2fx %12d' % ('serial', base, 1.0, os.path.getsize(fileName)))
+
+        for jobs in sorted(set([1, 2, 4, 8, cores])):
+            start = time.perf_counter()
+            render2pdf.renderParallel(fileName, render2pdf.StyleSheet(), documents, jobs)
+            elapsed = time.perf_counter() - start
+            print('%6d %10.3f %7.2fx %12d' % (jobs, elapsed, base / elapsed, os.path.getsize(fileName)))
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,88 @@
+'''
+Parser throughput and differential check of parser.parse() against the
+original stack based parser.parse_stack()
+
+Usage: python -m benchmarks.bench_parser [-c COUNT] [--fuzz N]
+'''
+
+import argparse
+import io
+import random
+import time
+from xml.etree.ElementTree import tostring
+
+from pychords import tokenizer, parser
+from . import corpus
+
+# building blocks of fuzzed inputs, covering all supported directives
+FUZZ_LINES = [
+    '', '', '', '[C]one [G]two', 'plain lyric', '[Am]', '[D]x [E]', '# note',
+    'text # note', '[F]a # note', '{t:Title}', '{title:Title}', '{st:Sub}',
+    '{subtitle:Sub}', '{define: C base-fret 1 frets x 3 2 0 1 0}',
+    '{c:Comment}', '{comment:Comment}', '{ci:Italic}', '{comment_italic:Italic}',
+    '{cb:Box}', '{comment_box:Box}', '{soc}', '{start_of_chorus}', '{eoc}',
+    '{end_of_chorus}', '{soc} [G]after', '[A]before {eoc}', '{sot}\ne|--|\n{eot}',
+    '{start_of_tab}\nB|--|\n{end_of_tab}', '{tab:e|-0-|}', '{np}', '{new_page}',
+    '{npp}', '{new_physical_page}', '{ns}', '{new_song}', '{rowname}',
+    '[G]x {ci:mid} y', '{c:a}{ci:b}',
+]
+
+def fuzzSong(rnd, lines = 30):
+    return '\n'.join(rnd.choice(FUZZ_LINES) for i in range(rnd.randint(0, lines)))
+
+def outcome(parse, text):
+    'Returns serialized document or name of the raised exception'
+    try:
+        return tostring(parse(tokenizer.tokenize(io.StringIO(text))).getroot())
+    except Exception as e:
+        return type(e).__name__
+
+def check(texts):
+    'Compares both parsers, returns number of differences'
+    differences = 0
+    for text in texts:
+        if outcome(parser.parse, text) != outcome(parser.parse_stack, text):
+            differences += 1
+            print('Parsers differ on input:\n%s\n' % text)
+    return differences
+
+def measure(parse, tokens, repeat = 3):
+    best = None
+    for i in range(repeat):
+        start = time.perf_counter()
+        parse(iter(tokens))
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def run():
+    argParser = argparse.ArgumentParser(description = __doc__.strip().splitlines()[0])
+    argParser.add_argument('-c', '--count', type = int, default = 500, help = 'Number of concatenated songs')
+    argParser.add_argument('--fuzz', type = int, default = 2000, help = 'Number of fuzzed inputs to compare')
+    args = argParser.parse_args()
+
+    rnd = random.Random(0)
+    texts = [fuzzSong(rnd) for i in range(args.fuzz)]
+    texts.extend(corpus.makeSong(rnd, i) for i in range(50))
+    differences = check(texts)
+    print('differential check: %d inputs, %d differences' % (len(texts), differences))
+    if differences:
+        raise SystemExit(1)
+
+    inputs = [
+        ('%d concatenated songs' % args.count,
+            ''.join(corpus.makeSong(rnd, i) for i in range(args.count))),
+        # blank lines inside of a long chorus make the stack parser scan
+        #   the whole stack
+        ('chorus of %d lines' % (args.count * 10),
+            '{soc}\n' + '\n\n'.join(corpus.makeLine(rnd) for i in range(args.count * 10)) + '\n{eoc}\n'),
+    ]
+    for title, text in inputs:
+        tokens = list(tokenizer.tokenize(io.StringIO(text)))
+        print('input: %s, %d tokens' % (title, len(tokens)))
+        for name, parse in (('stack', parser.parse_stack), ('state machine', parser.parse)):
+            elapsed = measure(parse, tokens)
+            print('  %-14s %8.3f s %12.0f tokens/sec' % (name, elapsed, len(tokens) / elapsed))
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,75 @@
+'''
+PDF rendering - measurement of chord and lyric cells and comparison of
+per-cell and batched text emission
+
+Usage: python -m benchmarks.bench_pdf [-c COUNT]
+'''
+
+import argparse
+import os
+import tempfile
+import time
+
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+from pychords import render2pdf
+from . import suite
+
+def legacyExtent(s, fontName, fontSize):
+    'Original Render2Pdf.getStringExtent()'
+    face = pdfmetrics.getFont(fontName).face
+    ascent = (face.ascent * fontSize) / 1000.0
+    descent = (face.descent * fontSize) / 1000.0
+    return (stringWidth(s, fontName, fontSize), ascent - descent)
+
+def cells(documents):
+    'Returns all strings measured by the renderer'
+    strings = []
+    for document in documents:
+        for block in document.getroot().find('body'):
+            for line in block:
+                if line.tag == 'row':
+                    for cho in line:
+                        strings.append(cho.attrib.get('c', ''))
+                        strings.append(cho.text or ' ')
+    return strings
+
+def timed(function, *args):
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+def run():
+    argParser = argparse.ArgumentParser(description = __doc__.strip().splitlines()[0])
+    argParser.add_argument('-c', '--count', type = int, default = 500, help = 'Number of songs')
+    args = argParser.parse_args()
+
+    documents = suite.prepare(args.count)['documents']
+    strings = cells(documents)
+
+    with tempfile.TemporaryDirectory() as directory:
+        r = render2pdf.Render2Pdf(os.path.join(directory, 'metrics.pdf'), render2pdf.StyleSheet())
+
+        def measureLegacy():
+            for s in strings:
+                legacyExtent(s.encode('utf-8'), 'Helvetica', 10)
+
+        def measureCached():
+            extent = r.metrics.stringExtent
+            for s in strings:
+                extent(s, 'Helvetica', 10)
+
+        print('%d songs, %d measured strings' % (args.count, len(strings)))
+        print('%-22s %8.3f s' % ('getStringExtent (old)', timed(measureLegacy)))
+        print('%-22s %8.3f s' % ('FontMetrics', timed(measureCached)))
+
+        for batchText in (False, True):
+            fileName = os.path.join(directory, 'batch%d.pdf' % batchText)
+            r = render2pdf.Render2Pdf(fileName, render2pdf.StyleSheet(), batchText = batchText)
+            elapsed = timed(r.render, documents)
+            print('%-22s %8.3f s %10d bytes' % ('render, batchText=%s' % batchText,
+                                                elapsed, os.path.getsize(fileName)))
+
+if __name__ == '__main__':
+    run()
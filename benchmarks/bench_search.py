@@ -0,0 +1,65 @@
+'''
+Building and querying of the lyric/chord search index - full build,
+no-op update, incremental update of one file and query latency
+
+Usage: python -m benchmarks.bench_search [-c COUNT] [-q QUERIES]
+'''
+
+import argparse
+import os
+import random
+import re
+import tempfile
+import time
+
+from pychords.search import SearchIndex
+from . import corpus
+
+def run():
+    argParser = argparse.ArgumentParser(description = __doc__.strip().splitlines()[0])
+    argParser.add_argument('-c', '--count', type = int, default = 1000, help = 'Number of songs')
+    argParser.add_argument('-q', '--queries', type = int, default = 200, help = 'Number of queries')
+    args = argParser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        songs = os.path.join(directory, 'songs')
+        os.mkdir(songs)
+        fileNames = corpus.writeCorpus(songs, args.count)
+        index = SearchIndex(os.path.join(directory, 'search.db'))
+
+        for name, action in (
+                ('full build', lambda: index.update([songs])),
+                ('no-op update', lambda: index.update([songs]))):
+            start = time.perf_counter()
+            indexed, removed = action()
+            print('%-18s %8.3f s  %d files indexed' % (name, time.perf_counter() - start, indexed))
+
+        with open(fileNames[0], 'a') as f:
+            f.write('[G]brand new line\n')
+        start = time.perf_counter()
+        indexed, removed = index.update([songs])
+        print('%-18s %8.3f s  %d files indexed' % ('one edit', time.perf_counter() - start, indexed))
+
+        rnd = random.Random(1)
+        # (lyrics, chords) of random lines
+        queries = []
+        for i in range(args.queries):
+            line = corpus.makeLine(rnd)
+            queries.append((re.sub(r'\[[^\]]*\]', '', line), re.findall(r'\[([^\]]*)\]', line)))
+        for name, search in (
+                ('word', lambda q: index.search(q[0].split()[0])),
+                ('chord', lambda q: index.search(chords = q[1][:1])),
+                ('line', lambda q: index.search(q[0])),
+                ('line+chords', lambda q: index.search(q[0], q[1]))):
+            times = []
+            for q in queries:
+                start = time.perf_counter()
+                search(q)
+                times.append(time.perf_counter() - start)
+            times.sort()
+            print('%-18s median %6.2f ms, p95 %6.2f ms' % (
+                'query ' + name, times[len(times) // 2] * 1000, times[int(len(times) * 0.95)] * 1000))
+        index.close()
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,69 @@
+'''
+Lazy songbook - metadata scan, browsing and full iteration of a library
+through Songbook against parsing all songs into a list
+
+Memory is the peak traced by tracemalloc while the songs are processed.
+
+Usage: python -m benchmarks.bench_songbook [-c COUNT] [--cache-size KB]
+'''
+
+import argparse
+import random
+import tempfile
+import time
+import tracemalloc
+
+from pychords import main, render, songbook
+from . import corpus
+
+def measure(function):
+    'Returns (seconds, peak MiB, result) of function()'
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = function()
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak / 1024.0 / 1024.0, result
+
+def renderAll(documents):
+    'Renders documents to text, returns number of lines'
+    return sum(1 for line in render.renderLines(documents, 'text'))
+
+def run():
+    argParser = argparse.ArgumentParser(description = __doc__.strip().splitlines()[0])
+    argParser.add_argument('-c', '--count', type = int, default = 2000, help = 'Number of songs')
+    argParser.add_argument('--cache-size', type = int, default = 1024,
+        help = 'Cache size of the songbook in KB of source text')
+    args = argParser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        fileNames = corpus.writeCorpus(directory, args.count)
+
+        def parseAll():
+            documents = [d for f, docs, e in main.parseFiles(fileNames) for d in docs]
+            return renderAll(documents)
+        seconds, peak, lines = measure(parseAll)
+        print('%-24s %8.3f s %8.1f MiB  %d lines' % ('parse all, render', seconds, peak, lines))
+
+        book = songbook.Songbook(directory, args.cache_size * 1024)
+        seconds, peak, count = measure(lambda: len(book))
+        print('%-24s %8.3f s %8.1f MiB  %d songs' % ('songbook scan', seconds, peak, count))
+        seconds, peak, lines = measure(lambda: renderAll(book))
+        print('%-24s %8.3f s %8.1f MiB  %d lines' % ('songbook render', seconds, peak, lines))
+
+        # browsing - most requests go to a small set of popular songs
+        rnd = random.Random(0)
+        popular = rnd.sample(range(count), 50)
+        requests = [rnd.choice(popular) if rnd.random() < 0.9 else rnd.randrange(count)
+                    for i in range(5000)]
+        def browse():
+            # documents are not kept, as by a service answering requests
+            for i in requests:
+                book[i]
+        seconds, peak, result = measure(browse)
+        print('%-24s %8.3f s %8.1f MiB  %d requests, %d cached' % (
+            'songbook browse', seconds, peak, len(requests), len(book.cache)))
+
+if __name__ == '__main__':
+    run()
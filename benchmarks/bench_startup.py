@@ -0,0 +1,70 @@
+'''
+Startup time of the command line tool - import time of pychords.main
+(python -X importtime) and wall time of short invocations per format
+
+Exits with status 1 if import of pychords.main takes longer than
+--max-import milliseconds, so it can guard startup regressions.
+
+Usage: python -m benchmarks.bench_startup [-r REPEAT] [--max-import MS]
+'''
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from . import corpus
+
+def importTimes(module):
+    '''
+    Returns (total microseconds, {module: cumulative microseconds}) of
+    importing module in a fresh interpreter
+    '''
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import ' + module],
+                            stderr = subprocess.PIPE, universal_newlines = True, check = True)
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self, cumulative, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = int(cumulative)
+    return modules[module], modules
+
+def run():
+    argParser = argparse.ArgumentParser(description = __doc__.strip().splitlines()[0])
+    argParser.add_argument('-r', '--repeat', type = int, default = 5, help = 'Runs of each measurement (best is taken)')
+    argParser.add_argument('--max-import', type = float, help = 'Maximal import time of pychords.main in ms')
+    args = argParser.parse_args()
+
+    best = None
+    for i in range(args.repeat):
+        total, modules = importTimes('pychords.main')
+        if best is None or total < best[0]:
+            best = (total, modules)
+    total, modules = best
+    print('import pychords.main %8.1f ms' % (total / 1000.0))
+    for name in ('reportlab.pdfgen.canvas', 'pkg_resources', 'sqlite3', 'concurrent.futures.process', 'xml.sax.saxutils'):
+        print('  %-28s %s' % (name, 'not imported' if name not in modules else
+                                  '%.1f ms' % (modules[name] / 1000.0)))
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    script = os.path.join(root, 'pychords.py')
+    with tempfile.TemporaryDirectory() as directory:
+        fileName = corpus.writeCorpus(directory, 1)[0]
+        for fmt in ('text', 'html', 'pdf'):
+            times = []
+            for i in range(args.repeat):
+                start = time.perf_counter()
+                subprocess.run([sys.executable, script, '-f', fmt, '-n', os.path.join(directory, 'out'), fileName],
+                               stdout = subprocess.DEVNULL, check = True)
+                times.append(time.perf_counter() - start)
+            print('pychords -f %-4s      %8.1f ms (one song, best of %d)' % (fmt, min(times) * 1000, args.repeat))
+
+    if args.max_import is not None and total / 1000.0 > args.max_import:
+        print('import time exceeds %.1f ms' % args.max_import)
+        sys.exit(1)
+
+if __name__ == '__main__':
+    run()
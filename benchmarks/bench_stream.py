@@ -0,0 +1,77 @@
+'''
+Streaming pipeline - peak RSS and time to the first output line of text
+output with and without --stream for growing numbers of songs, in
+separate files and in one songbook on standard input ({new_song} separated)
+
+Usage: python -m benchmarks.bench_stream [-c COUNT ...] [-f FORMAT]
+'''
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from . import corpus
+
+# runs pychords and reports peak RSS (in KiB on Linux) on standard error
+CHILD = '''
+import resource, sys
+from pychords import main
+try:
+    main.main(sys.argv[1:])
+finally:
+    sys.stderr.write('maxrss %d\\n' % resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+'''
+
+def measure(root, arguments, directory, stdin = None):
+    '''
+    Returns (peak RSS in KiB, seconds to first output line, total seconds),
+    stdin is name of file passed as standard input
+    '''
+    errName = os.path.join(directory, 'stderr.txt')
+    with open(errName, 'w') as err, open(stdin or os.devnull, 'rb') as infile:
+        start = time.perf_counter()
+        process = subprocess.Popen([sys.executable, '-c', CHILD] + arguments,
+                                   stdin = infile, stdout = subprocess.PIPE, stderr = err, cwd = root)
+        # progress messages of the default mode are not the output
+        for line in process.stdout:
+            if not line.startswith((b'Reading', b'Sorting', b'Rendering')):
+                break
+        first = time.perf_counter() - start
+        while process.stdout.read(65536):
+            pass
+        process.wait()
+        total = time.perf_counter() - start
+    with open(errName) as err:
+        rss = [int(line.split()[1]) for line in err if line.startswith('maxrss')]
+    return rss[0], first, total
+
+def run():
+    argParser = argparse.ArgumentParser(description = __doc__.strip().splitlines()[0])
+    argParser.add_argument('-c', '--count', type = int, nargs = '+', default = [250, 1000, 4000],
+        help = 'Numbers of songs')
+    argParser.add_argument('-f', '--format', default = 'text', choices = ['text', 'html', 'html_css'])
+    args = argParser.parse_args()
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    with tempfile.TemporaryDirectory() as directory:
+        fileNames = corpus.writeCorpus(directory, max(args.count))
+        bookName = os.path.join(directory, 'songbook.cho')
+        print('%6s %-18s %10s %12s %10s' % ('songs', 'mode', 'peak MiB', 'first line', 'total'))
+        for count in args.count:
+            with open(bookName, 'w', encoding = 'utf-8') as book:
+                for i, fileName in enumerate(fileNames[:count]):
+                    with open(fileName, encoding = 'utf-8') as f:
+                        book.write(('{new_song}\n' if i else '') + f.read())
+            for mode, options, stdin in (('all documents', fileNames[:count], None),
+                                         ('stream', ['--stream'] + fileNames[:count], None),
+                                         ('stream -o title', ['--stream', '-o', 'title'] + fileNames[:count], None),
+                                         ('all stdin', ['-'], bookName),
+                                         ('stream stdin', ['--stream', '-'], bookName)):
+                rss, first, total = measure(root, ['-f', args.format] + options, directory, stdin)
+                print('%6d %-18s %10.1f %10.3f s %8.3f s' % (count, mode, rss / 1024.0, first, total))
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,73 @@
+'''
+Tokenizer throughput (tokens/sec) compared with the original implementation
+
+Usage: python -m benchmarks.bench_tokenizer [-c COUNT] [-r REPEAT]
+'''
+
+import argparse
+import io
+import random
+import re
+import time
+
+from pychords import tokenizer
+from . import corpus
+
+def legacyTokenize(infile):
+    'Original readlines() based tokenizer, kept as reference'
+    tokentypes = ('directive', 'chord', 'comment', 'lyric')
+    pattern = re.compile(r'''
+        \s* \{ ( [^}]+ ) \} # directive (meta or block)
+    |
+        \[ ( [^\]]+ ) \]    # chord
+    |
+        \s* \#  ( .+ )      # comment - only if # is not in chord or directive
+    |
+        ( [^[]+ )           # lyric
+    ''', re.VERBOSE)
+    yield (1, 'sof', '')
+    lines = iter(enumerate(infile.readlines()))
+    for lineno, line in lines:
+        yield (lineno+1, 'sol', '')
+        line = line.rstrip()
+        for tokens in pattern.findall(line):
+            (ttype, tvalue) = [t for t in zip(tokentypes, tokens) if t[1] != ''][0]
+            if ttype == 'directive' and tvalue in ('sot', 'start_of_tab'):
+                tvalue = tokenizer.preformatted_tokenize(lines, r'^\s*\{(eot|end_of_tab)\}\s*$')
+                tvalue = 'tab:' + ''.join([v[1] for v in tvalue])
+            yield (lineno + 1, ttype, tvalue)
+        yield (lineno + 1, 'eol', '')
+    yield (lineno + 1, 'eof', '')
+
+def measure(tokenize, text, repeat):
+    'Returns (number of tokens, best tokens/sec)'
+    best = None
+    for i in range(repeat):
+        start = time.perf_counter()
+        count = 0
+        for token in tokenize(io.StringIO(text)):
+            count += 1
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return count, count / best
+
+def run():
+    argParser = argparse.ArgumentParser(description = __doc__.strip().splitlines()[0])
+    argParser.add_argument('-c', '--count', type = int, default = 2000, help = 'Number of songs in the input')
+    argParser.add_argument('-r', '--repeat', type = int, default = 5, help = 'Number of repetitions')
+    args = argParser.parse_args()
+
+    rnd = random.Random(0)
+    text = ''.join(corpus.makeSong(rnd, i) for i in range(args.count))
+
+    legacy = list(legacyTokenize(io.StringIO(text)))
+    if legacy != list(tokenizer.tokenize(io.StringIO(text))):
+        raise SystemExit('Tokenizer output differs from the original implementation')
+
+    print('input: %d songs, %d bytes' % (args.count, len(text)))
+    for name, tokenize in (('original', legacyTokenize), ('streaming', tokenizer.tokenize)):
+        count, rate = measure(tokenize, text, args.repeat)
+        print('%-10s %9d tokens %12.0f tokens/sec' % (name, count, rate))
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,52 @@
+'''
+Transposition of whole songbooks - table-driven transposition of both
+document models against parsing and formatting every chord occurrence
+
+Usage: python -m benchmarks.bench_transpose [-c COUNT]
+'''
+
+import argparse
+import time
+
+from pychords import chords, model
+from . import suite
+
+def naiveTranspose(document, shift):
+    'Reference: every chord occurrence is parsed and formatted again'
+    for e in document.getroot().iter('cho'):
+        chord = chords.parseChord(e.get('c', ''), normalize = False)
+        if chord is not None:
+            e.set('c', chords.formatChord(chord._replace(
+                root = (chord.root + shift) % 12,
+                bass = None if chord.bass is None else (chord.bass + shift) % 12)))
+
+def chordNames(document):
+    return [cho.attrib.get('c', '') for block in document.getroot().find('body')
+            for line in block for cho in line if line.tag == 'row']
+
+def run():
+    argParser = argparse.ArgumentParser(description = __doc__.strip().splitlines()[0])
+    argParser.add_argument('-c', '--count', type = int, default = 2000, help = 'Number of songs')
+    args = argParser.parse_args()
+
+    documents = suite.prepare(args.count)['documents']
+    original = [chordNames(d) for d in documents]
+    songs = [model.fromElementTree(d) for d in documents]
+
+    # all 12 shifts, so every song ends up in its original key
+    for name, transpose, docs in (
+            ('naive', naiveTranspose, documents),
+            ('table etree', lambda d, s: chords.transposeDocument(d, s, False), documents),
+            ('table compact', lambda d, s: chords.transposeDocument(d, s, False), songs)):
+        start = time.perf_counter()
+        for shift in range(12):
+            for document in docs:
+                transpose(document, 1)
+        elapsed = time.perf_counter() - start
+        same = all([chords.normalizeChord(c) for c in chordNames(d)] ==
+                   [chords.normalizeChord(c) for c in o] for d, o in zip(docs, original))
+        print('%-14s %8.3f s %10.0f songs/s  round trip %s' % (
+            name, elapsed, 12 * len(docs) / elapsed, 'ok' if same else 'DIFFERS'))
+
+if __name__ == '__main__':
+    run()
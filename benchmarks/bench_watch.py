@@ -0,0 +1,78 @@
+'''
+Watch mode - latency from an edit of one song to the rebuilt output,
+compared with a cold start of the command line tool
+
+Usage: python -m benchmarks.bench_watch [-c COUNT] [-f FORMAT] [-e EDITS] [--incremental]
+'''
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from . import corpus
+
+def waitFor(process, prefix):
+    'Reads output of the watching process until a line starting with prefix'
+    for line in process.stdout:
+        if line.startswith(prefix):
+            return line
+    raise RuntimeError('Watching process finished')
+
+def run():
+    argParser = argparse.ArgumentParser(description = __doc__.strip().splitlines()[0])
+    argParser.add_argument('-c', '--count', type = int, default = 20, help = 'Number of songs')
+    argParser.add_argument('-f', '--format', default = 'pdf', choices = ['text', 'html', 'pdf'])
+    argParser.add_argument('-e', '--edits', type = int, default = 5, help = 'Number of edits')
+    argParser.add_argument('--interval', type = float, default = 0.05, help = 'Polling interval')
+    argParser.add_argument('--debounce', type = float, default = 0.05, help = 'Debounce time')
+    argParser.add_argument('--incremental', action = 'store_true',
+        help = 'Incremental PDF build (only edited songs are rendered again)')
+    args = argParser.parse_args()
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    script = os.path.join(root, 'pychords.py')
+
+    with tempfile.TemporaryDirectory() as directory:
+        fileNames = corpus.writeCorpus(directory, args.count)
+        output = os.path.join(directory, 'out')
+        command = [sys.executable, script, '-f', args.format, '-n', output] + fileNames
+        if args.incremental:
+            command += ['--build-dir', os.path.join(directory, 'build')]
+
+        start = time.perf_counter()
+        subprocess.run(command, check = True, stdout = subprocess.DEVNULL)
+        cold = time.perf_counter() - start
+        print('%d songs, %s%s' % (args.count, args.format, ', incremental' if args.incremental else ''))
+        print('cold start     %8.3f s' % cold)
+
+        # unbuffered output, the messages tell when rebuilds finished
+        process = subprocess.Popen([sys.executable, '-u'] + command[1:] + [
+                                       '--watch', '--watch-interval', str(args.interval),
+                                       '--debounce', str(args.debounce)],
+                                   stdout = subprocess.PIPE, universal_newlines = True)
+        try:
+            waitFor(process, 'Watching')
+            latencies = []
+            rebuilds = []
+            for i in range(args.edits):
+                time.sleep(0.2)
+                with open(fileNames[i % len(fileNames)], 'a') as f:
+                    f.write('[G]edit number %d\n' % i)
+                start = time.perf_counter()
+                line = waitFor(process, 'Rebuilt')
+                latencies.append(time.perf_counter() - start)
+                rebuilds.append(float(line.split()[2]))
+        finally:
+            process.terminate()
+            process.wait()
+        latencies.sort()
+        rebuilds.sort()
+        print('rebuild        %8.3f s median, %.3f s max' % (rebuilds[len(rebuilds) // 2], rebuilds[-1]))
+        print('edit to output %8.3f s median, %.3f s max (polling %.2f s, debounce %.2f s)' % (
+            latencies[len(latencies) // 2], latencies[-1], args.interval, args.debounce))
+
+if __name__ == '__main__':
+    run()
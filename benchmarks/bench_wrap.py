@@ -0,0 +1,35 @@
+'''
+ASCII rendering of wide, chord-dense songs at several widths with greedy
+and optimal line wrapping
+
+Usage: python -m benchmarks.bench_wrap [-c COUNT] [--cells N]
+'''
+
+import argparse
+import time
+
+from pychords import render
+from . import suite
+
+def run():
+    argParser = argparse.ArgumentParser(description = __doc__.strip().splitlines()[0])
+    argParser.add_argument('-c', '--count', type = int, default = 200, help = 'Number of songs')
+    argParser.add_argument('--cells', type = int, default = 16, help = 'Chord/lyric pairs per source line')
+    args = argParser.parse_args()
+
+    documents = suite.prepare(args.count, cells = args.cells)['documents']
+    print('%d songs, %d cells per row' % (args.count, args.cells))
+    print('%6s %-8s %9s %8s %10s' % ('width', 'method', 'seconds', 'lines', 'overfull'))
+    for width in (30, 50, 79, 120):
+        for method in ('greedy', 'optimal'):
+            start = time.perf_counter()
+            lines = []
+            for document in documents:
+                lines.extend(render.renderToAscii(document, width = width, wrap_method = method))
+            elapsed = time.perf_counter() - start
+            # overfull lines are possible only with cells wider than a line
+            overfull = sum(1 for l in '\n'.join(lines).splitlines() if len(l.rstrip()) > width)
+            print('%6d %-8s %9.3f %8d %10d' % (width, method, elapsed, len(lines), overfull))
+
+if __name__ == '__main__':
+    run()
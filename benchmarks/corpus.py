@@ -0,0 +1,94 @@
+'''
+Generator of synthetic ChordPro songs for benchmarking
+
+Songs contain titles, subtitles, chord definitions, verses, choruses,
+comments and {sot} tabs. Size of the songs is configurable, generation is
+deterministic for given seed.
+
+Usage: python -m benchmarks.corpus DIRECTORY [-c COUNT] [--verses N] ...
+'''
+
+import argparse
+import os
+import random
+
+CHORDS = ['C', 'G', 'Am', 'F', 'D', 'Em', 'E7', 'Bb', 'F#m', 'Dsus4',
+          'Cmaj7', 'G/B', 'A7', 'Ebdim', 'C#m7']
+WORDS = ['love', 'night', 'river', 'home', 'light', 'road', 'heart',
+         'rain', 'sky', 'down', 'again', 'my', 'the', 'and', 'you',
+         'morning', 'whisper', 'forever', 'mountain', 'old']
+DEFINES = ['C base-fret 1 frets x 3 2 0 1 0', 'G base-fret 1 frets 3 2 0 0 0 3',
+           'Am base-fret 1 frets x 0 2 2 1 0', 'F base-fret 1 frets 1 3 3 2 1 1']
+
+def makeTitle(rnd, index):
+    return '%s %s %d' % (rnd.choice(WORDS).capitalize(), rnd.choice(WORDS), index)
+
+def makeLine(rnd, cells = 4):
+    'Returns one lyric line with inline chords'
+    return ''.join('[%s]%s ' % (rnd.choice(CHORDS), ' '.join(rnd.sample(WORDS, 2)))
+                   for i in range(cells)).rstrip()
+
+def makeTab(rnd, lines = 6):
+    'Returns {sot} section with guitar tablature'
+    strings = 'eBGDAE'[:lines]
+    rows = ['%s|%s|' % (s, ''.join(rnd.choice('-----0123') for i in range(24))) for s in strings]
+    return '\n'.join(['{sot}'] + rows + ['{eot}'])
+
+def makeSong(rnd, index, verses = 4, lines = 4, cells = 4, chorus = True, tab = True, comments = True):
+    '''
+    Returns text of one song
+
+    verses and lines (per verse) control the length of the song, cells is
+    number of chord/lyric pairs per line
+    '''
+    out = ['{title: %s}' % makeTitle(rnd, index)]
+    if rnd.random() < 0.5:
+        out.append('{subtitle: %s}' % makeTitle(rnd, index))
+    out.extend('{define: %s}' % d for d in rnd.sample(DEFINES, rnd.randint(0, 2)))
+    out.append('')
+    for v in range(verses):
+        if comments and rnd.random() < 0.2:
+            out.append(rnd.choice(['{c: Repeat twice}', '{ci: slowly}', '# source note']))
+        out.extend(makeLine(rnd, cells) for i in range(lines))
+        out.append('')
+        if chorus and v == 0:
+            out.append('{soc}')
+            out.extend(makeLine(rnd, cells) for i in range(lines))
+            out.append('{eoc}')
+            out.append('')
+    if tab:
+        out.append(makeTab(rnd))
+    return '\n'.join(out) + '\n'
+
+def writeCorpus(directory, count, seed = 0, **size):
+    '''
+    Writes count songs into directory, returns list of file names
+
+    Keyword arguments are passed to makeSong()
+    '''
+    rnd = random.Random(seed)
+    fileNames = []
+    for i in range(count):
+        fileName = os.path.join(directory, 'song%05d.cho' % i)
+        with open(fileName, 'w', encoding = 'utf-8') as f:
+            f.write(makeSong(rnd, i, **size))
+        fileNames.append(fileName)
+    return fileNames
+
+def run():
+    argParser = argparse.ArgumentParser(description = 'Generator of synthetic ChordPro songs')
+    argParser.add_argument('directory', help = 'Output directory')
+    argParser.add_argument('-c', '--count', type = int, default = 100, help = 'Number of songs')
+    argParser.add_argument('--seed', type = int, default = 0, help = 'Random seed')
+    argParser.add_argument('--verses', type = int, default = 4, help = 'Verses per song')
+    argParser.add_argument('--lines', type = int, default = 4, help = 'Lines per verse')
+    argParser.add_argument('--cells', type = int, default = 4, help = 'Chord/lyric pairs per line')
+    args = argParser.parse_args()
+
+    os.makedirs(args.directory, exist_ok = True)
+    fileNames = writeCorpus(args.directory, args.count, args.seed,
+                            verses = args.verses, lines = args.lines, cells = args.cells)
+    print('%d songs written to %s' % (len(fileNames), args.directory))
+
+if __name__ == '__main__':
+    run()
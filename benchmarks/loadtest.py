@@ -0,0 +1,85 @@
+'''
+Load test of the render server - concurrent clients posting songs to
+/render over keep-alive connections
+
+By default a server is started in this process on a free localhost
+port, --url tests an already running "pychords serve".
+
+Usage: python -m benchmarks.loadtest [-n REQUESTS] [-c CLIENTS]
+           [-f FORMAT ...] [--songs SONGS] [--url URL]
+'''
+
+import argparse
+import http.client
+import json
+import random
+import threading
+import time
+import urllib.parse
+
+from . import corpus
+
+def client(url, requests, latencies, errors):
+    'Sends requests (list of JSON bodies) over one connection'
+    parts = urllib.parse.urlsplit(url)
+    connection = http.client.HTTPConnection(parts.hostname, parts.port)
+    for body in requests:
+        start = time.perf_counter()
+        connection.request('POST', parts.path, body, {'Content-Type': 'application/json'})
+        response = connection.getresponse()
+        response.read()
+        latencies.append(time.perf_counter() - start)
+        if response.status != 200:
+            errors.append(response.status)
+    connection.close()
+
+def run():
+    argParser = argparse.ArgumentParser(description = __doc__.strip().splitlines()[0])
+    argParser.add_argument('-n', '--requests', type = int, default = 500, help = 'Number of requests')
+    argParser.add_argument('-c', '--clients', type = int, default = 8, help = 'Concurrent clients')
+    argParser.add_argument('-f', '--format', nargs = '+', default = ['text', 'html', 'pdf'],
+        choices = ['text', 'html', 'html_css', 'pdf'], help = 'Formats of requests (chosen randomly)')
+    argParser.add_argument('--songs', type = int, default = 50,
+        help = 'Number of distinct songs, fewer songs mean more cache hits')
+    argParser.add_argument('--url', help = 'URL of /render of a running server')
+    args = argParser.parse_args()
+
+    rnd = random.Random(0)
+    songs = [corpus.makeSong(rnd, i) for i in range(args.songs)]
+    bodies = [json.dumps({'text': rnd.choice(songs), 'format': rnd.choice(args.format)})
+              for i in range(args.requests)]
+
+    server = None
+    url = args.url
+    if url is None:
+        from pychords.server import RenderServer
+        server = RenderServer(('127.0.0.1', 0))
+        threading.Thread(target = server.serve_forever, daemon = True).start()
+        url = 'http://127.0.0.1:%d/render' % server.server_address[1]
+
+    latencies = []
+    errors = []
+    threads = [threading.Thread(target = client, args = (url, bodies[i::args.clients], latencies, errors))
+               for i in range(args.clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    print('%d requests, %d clients, %d songs, formats %s' % (
+        len(bodies), args.clients, args.songs, ' '.join(args.format)))
+    print('%8.1f requests/s, %d errors' % (len(latencies) / elapsed, len(errors)))
+    print('latency median %.2f ms, p95 %.2f ms, max %.2f ms' % (
+        latencies[len(latencies) // 2] * 1000, latencies[int(len(latencies) * 0.95)] * 1000,
+        latencies[-1] * 1000))
+    if server is not None:
+        cache = server.service.cache
+        print('cache %d hits, %d misses' % (cache.hits, cache.misses))
+        server.shutdown()
+        server.server_close()
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,136 @@
+'''
+Timed benchmarks of the processing stages and comparison of results
+with a stored baseline
+
+Results are stored as JSON:
+    {
+        "version": pychords version, "python": python version,
+        "songs": number of songs,
+        "results": {benchmark name: {"seconds": best time,
+                                     "songs_per_sec": throughput}}
+    }
+'''
+
+import io
+import json
+import os
+import platform
+import random
+import tempfile
+import time
+
+import pychords
+from pychords import tokenizer, parser, render, chords
+from . import corpus
+
+def consume(iterator):
+    for item in iterator:
+        pass
+
+def benchTokenize(ctx):
+    for text in ctx['texts']:
+        consume(tokenizer.tokenize(io.StringIO(text)))
+
+def benchParse(ctx):
+    for tokens in ctx['tokens']:
+        parser.parse(iter(tokens))
+
+def benchTranspose(ctx):
+    for document in ctx['documents']:
+        chords.transposeDocument(document, 1)
+
+def benchAscii(ctx):
+    for document in ctx['documents']:
+        consume(render.renderToAscii(document))
+
+def benchHtmlTables(ctx):
+    for document in ctx['documents']:
+        consume(render.renderToHtmlTables(document))
+
+def benchHtmlCss(ctx):
+    for document in ctx['documents']:
+        consume(render.renderToHtmlCss(document))
+
+def benchPdf(ctx):
+    from pychords import render2pdf
+    fileName = os.path.join(ctx['directory'], 'bench.pdf')
+    r = render2pdf.Render2Pdf(fileName, render2pdf.StyleSheet())
+    r.render(ctx['documents'])
+
+BENCHMARKS = [
+    ('tokenize', benchTokenize),
+    ('parse', benchParse),
+    ('transpose', benchTranspose),
+    ('render_ascii', benchAscii),
+    ('render_html_tables', benchHtmlTables),
+    ('render_html_css', benchHtmlCss),
+    ('render_pdf', benchPdf),
+]
+
+def prepare(count, seed = 0, **size):
+    'Generates corpus and the inputs of all stages'
+    rnd = random.Random(seed)
+    texts = [corpus.makeSong(rnd, i, **size) for i in range(count)]
+    tokens = [list(tokenizer.tokenize(io.StringIO(t))) for t in texts]
+    documents = [parser.parse(iter(t)) for t in tokens]
+    return {'texts': texts, 'tokens': tokens, 'documents': documents}
+
+def runSuite(count = 200, repeat = 3, only = None, log = None, **size):
+    '''
+    Runs all benchmarks (or these listed in only), returns results dict
+
+    Each benchmark is run repeat times, the best time is reported.
+    '''
+    ctx = prepare(count, **size)
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        ctx['directory'] = directory
+        for name, bench in BENCHMARKS:
+            if only and name not in only:
+                continue
+            best = None
+            for i in range(repeat):
+                start = time.perf_counter()
+                bench(ctx)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            results[name] = {'seconds': best, 'songs_per_sec': count / best}
+            if log:
+                log(name, results[name])
+    return {
+        'version': pychords.__version__,
+        'python': platform.python_version(),
+        'songs': count,
+        'results': results,
+    }
+
+def save(results, fileName):
+    with open(fileName, 'w') as f:
+        json.dump(results, f, indent = 2, sort_keys = True)
+
+def load(fileName):
+    with open(fileName) as f:
+        return json.load(f)
+
+def compare(results, baseline):
+    '''
+    Compares results with baseline (both in the results format)
+
+    Returns list of (name, baseline seconds, current seconds, ratio) tuples
+    for benchmarks present in both, ratio above 1 means slowdown. Baseline
+    times are scaled to the current number of songs, so results of corpora
+    of different size are comparable.
+    '''
+    rows = []
+    for name, current in sorted(results['results'].items()):
+        base = baseline['results'].get(name)
+        if base is None:
+            continue
+        ratio = base['songs_per_sec'] / current['songs_per_sec']
+        rows.append((name, base['seconds'] / baseline['songs'] * results['songs'],
+                     current['seconds'], ratio))
+    return rows
+
+def regressions(rows, tolerance = 0.1):
+    'Returns rows of compare() which are slower than the baseline'
+    return [r for r in rows if r[3] > 1 + tolerance]
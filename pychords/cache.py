@@ -0,0 +1,83 @@
+import hashlib
+import os
+import pickle
+import tempfile
+import zlib
+
+from . import __version__
+
+class ParseCache:
+    '''
+    Persistent on-disk storage of parsed documents (list of songs of a
+    source file)
+
+    Entries are keyed by hash of the source file content and pychords
+    version, so any change of the song or of the parser invalidates them.
+    Total size of the cache directory is kept below maxSize bytes by
+    evicting least recently used entries (see trim()).
+    '''
+    suffix = '.pcache'
+    # changed when layout of the entries changes
+    layout = b'songs'
+
+    def __init__(self, directory, maxSize = 256 * 1024 * 1024):
+        self.directory = directory
+        self.maxSize = maxSize
+        os.makedirs(directory, exist_ok = True)
+
+    def key(self, data):
+        'Returns cache key for raw (bytes) content of a source file'
+        h = hashlib.sha256(__version__.encode('ascii'))
+        h.update(b'\0' + self.layout + b'\0')
+        h.update(data)
+        return h.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key + self.suffix)
+
+    def load(self, key):
+        'Returns cached documents or None if there is no (valid) entry'
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as f:
+                documents = pickle.loads(zlib.decompress(f.read()))
+            # entry age drives the eviction - mark it as recently used
+            os.utime(path)
+        except (OSError, EOFError, zlib.error, pickle.UnpicklingError):
+            return None
+        return documents
+
+    def store(self, key, documents):
+        'Stores documents, concurrent writers of the same entry are harmless'
+        data = zlib.compress(pickle.dumps(documents, pickle.HIGHEST_PROTOCOL))
+        fd, tmpPath = tempfile.mkstemp(dir = self.directory, suffix = '.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmpPath, self.path(key))
+        except OSError:
+            if os.path.exists(tmpPath):
+                os.remove(tmpPath)
+            raise
+
+    def trim(self):
+        'Evicts least recently used entries until the cache fits into maxSize'
+        entries = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(self.suffix):
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, entry.path))
+                total += st.st_size
+        entries.sort()
+        for mtime, size, path in entries:
+            if total <= self.maxSize:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
@@ -0,0 +1,374 @@
+import re
+import sys
+from collections import namedtuple
+
+from .model import Song, Block, Row
+
+####             ####
+#### chord names ####
+####             ####
+
+NOTES_SHARP = ('C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B')
+NOTES_FLAT = ('C', 'Db', 'D', 'Eb', 'E', 'F', 'Gb', 'G', 'Ab', 'A', 'Bb', 'B')
+
+# semitone of the note letters, H is the german/czech name of B
+NOTE_BASES = {'C': 0, 'D': 2, 'E': 4, 'F': 5, 'G': 7, 'A': 9, 'B': 11, 'H': 11}
+
+# alternative spellings of chord qualities, matched at the start of the
+#   quality string
+QUALITY_PREFIXES = (
+    ('minor', 'm'), ('min', 'm'), ('mi', 'm'), ('-', 'm'),
+    ('major', ''), ('Maj', 'maj'), ('M7', 'maj7'), ('M9', 'maj9'),
+    ('maj', 'maj'), ('ma', 'maj'), ('°', 'dim'), ('o7', 'dim7'), ('+', 'aug'),
+)
+
+# quality is a sequence of the known suffixes, so names like Bridge, Coda
+#   or 'A tempo' are not taken for chords
+chordPattern = re.compile(r'''^([A-H])(\#|b)?
+    ((?:major|maj|Maj|ma|M|minor|min|mi|m|-|dim|°|o|ø|aug|\+|sus|add|alt|[b\#]?\d+|[()])*)
+    (?:/([A-H])(\#|b)?)?$''', re.VERBOSE)
+
+Chord = namedtuple('Chord', 'root quality bass')
+
+def noteValue(letter, accidental):
+    value = NOTE_BASES[letter]
+    if accidental == '#':
+        value += 1
+    elif accidental == 'b':
+        value -= 1
+    return value % 12
+
+def normalizeQuality(quality):
+    for prefix, replacement in QUALITY_PREFIXES:
+        if quality.startswith(prefix):
+            return replacement + quality[len(prefix):]
+    return quality
+
+def parseChord(name, normalize = True):
+    '''
+    Splits chord name into Chord(root, quality, bass), root and bass are
+    semitones (0 is C), bass is None for chords without a bass note.
+    Quality is kept as written unless normalize is True.
+    Returns None if name is not a chord (N.C., repeat marks, ...).
+    '''
+    m = chordPattern.match(name.strip())
+    if m is None:
+        return None
+    letter, accidental, quality, bassLetter, bassAccidental = m.groups()
+    bass = noteValue(bassLetter, bassAccidental) if bassLetter else None
+    if normalize:
+        quality = normalizeQuality(quality)
+    return Chord(noteValue(letter, accidental), quality, bass)
+
+def formatChord(chord, flats = False):
+    'Returns name of Chord, accidentals are sharps unless flats is True'
+    notes = NOTES_FLAT if flats else NOTES_SHARP
+    name = notes[chord.root] + chord.quality
+    if chord.bass is not None:
+        name += '/' + notes[chord.bass]
+    return name
+
+def normalizeChord(name):
+    '''
+    Returns canonical name of a chord - sharps instead of flats and
+    unified quality spelling, so e.g. 'Gbmin7' and 'F#m7' are equal
+    '''
+    chord = parseChord(name)
+    if chord is None:
+        return name.strip()
+    return formatChord(chord)
+
+
+####                  ####
+#### chord definitions ####
+####                  ####
+
+# {define} directive is either 'NAME base-fret N frets F1 ... F6 [fingers ...]'
+#   or the older 'NAME N F1 ... F6', fret x (or -) is a muted string
+Define = namedtuple('Define', 'name baseFret frets fingers')
+
+def parseDefine(text):
+    '''
+    Parses argument of {define} directive into Define, frets are relative
+    to the base fret (0 is open string, -1 muted string). Returns None if
+    text is not a valid definition.
+    '''
+    parts = text.replace(':', ' ').split()
+    if len(parts) < 2:
+        return None
+    name, parts = parts[0], parts[1:]
+    fingers = ()
+    try:
+        if parts[0].lower() == 'base-fret':
+            baseFret = int(parts[1])
+            if len(parts) < 3 or parts[2].lower() != 'frets':
+                return None
+            parts = parts[3:]
+            if 'fingers' in parts:
+                i = parts.index('fingers')
+                parts, fingers = parts[:i], tuple(parts[i + 1:])
+        else:
+            baseFret = int(parts[0])
+            parts = parts[1:]
+        frets = tuple(-1 if f.lower() in ('x', '-') else int(f) for f in parts)
+    except (ValueError, IndexError):
+        return None
+    if not frets or baseFret < 1:
+        return None
+    return Define(name, baseFret, frets, fingers)
+
+def formatDefine(define):
+    'Returns {define} argument of Define in the base-fret/frets form'
+    text = '%s base-fret %d frets %s' % (define.name, define.baseFret,
+        ' '.join('x' if f < 0 else str(f) for f in define.frets))
+    if define.fingers:
+        text += ' fingers ' + ' '.join(define.fingers)
+    return text
+
+
+####               ####
+#### chord catalog ####
+####               ####
+
+# fingerings of common guitar chords in standard tuning (E A D G B E),
+#   names with flats are found through normalizeChord()
+CATALOG_DEFINES = (
+    'C base-fret 1 frets x 3 2 0 1 0',
+    'C7 base-fret 1 frets x 3 2 3 1 0',
+    'Cmaj7 base-fret 1 frets x 3 2 0 0 0',
+    'Cm base-fret 3 frets x 1 3 3 2 1',
+    'Cm7 base-fret 3 frets x 1 3 1 2 1',
+    'Csus4 base-fret 1 frets x 3 3 0 1 1',
+    'Cadd9 base-fret 1 frets x 3 2 0 3 0',
+    'C# base-fret 4 frets x 1 3 3 3 1',
+    'C#m base-fret 4 frets x 1 3 3 2 1',
+    'D base-fret 1 frets x x 0 2 3 2',
+    'D7 base-fret 1 frets x x 0 2 1 2',
+    'Dmaj7 base-fret 1 frets x x 0 2 2 2',
+    'Dm base-fret 1 frets x x 0 2 3 1',
+    'Dm7 base-fret 1 frets x x 0 2 1 1',
+    'Dsus2 base-fret 1 frets x x 0 2 3 0',
+    'Dsus4 base-fret 1 frets x x 0 2 3 3',
+    'D# base-fret 6 frets x 1 3 3 3 1',
+    'D#m base-fret 6 frets x 1 3 3 2 1',
+    'E base-fret 1 frets 0 2 2 1 0 0',
+    'E7 base-fret 1 frets 0 2 0 1 0 0',
+    'Emaj7 base-fret 1 frets 0 2 1 1 0 0',
+    'Em base-fret 1 frets 0 2 2 0 0 0',
+    'Em7 base-fret 1 frets 0 2 2 0 3 0',
+    'Esus4 base-fret 1 frets 0 2 2 2 0 0',
+    'F base-fret 1 frets 1 3 3 2 1 1',
+    'F7 base-fret 1 frets 1 3 1 2 1 1',
+    'Fmaj7 base-fret 1 frets x x 3 2 1 0',
+    'Fm base-fret 1 frets 1 3 3 1 1 1',
+    'F# base-fret 2 frets 1 3 3 2 1 1',
+    'F#7 base-fret 2 frets 1 3 1 2 1 1',
+    'F#m base-fret 2 frets 1 3 3 1 1 1',
+    'G base-fret 1 frets 3 2 0 0 0 3',
+    'G7 base-fret 1 frets 3 2 0 0 0 1',
+    'Gmaj7 base-fret 1 frets 3 2 0 0 0 2',
+    'Gm base-fret 3 frets 1 3 3 1 1 1',
+    'Gsus4 base-fret 1 frets 3 3 0 0 1 3',
+    'G# base-fret 4 frets 1 3 3 2 1 1',
+    'G#m base-fret 4 frets 1 3 3 1 1 1',
+    'A base-fret 1 frets x 0 2 2 2 0',
+    'A7 base-fret 1 frets x 0 2 0 2 0',
+    'Amaj7 base-fret 1 frets x 0 2 1 2 0',
+    'Am base-fret 1 frets x 0 2 2 1 0',
+    'Am7 base-fret 1 frets x 0 2 0 1 0',
+    'Asus2 base-fret 1 frets x 0 2 2 0 0',
+    'Asus4 base-fret 1 frets x 0 2 2 3 0',
+    'A# base-fret 1 frets x 1 3 3 3 1',
+    'A#7 base-fret 1 frets x 1 3 1 3 1',
+    'A#m base-fret 1 frets x 1 3 3 2 1',
+    'B base-fret 2 frets x 1 3 3 3 1',
+    'B7 base-fret 1 frets x 2 1 2 0 2',
+    'Bm base-fret 2 frets x 1 3 3 2 1',
+    'Bm7 base-fret 1 frets x 2 0 2 0 2',
+)
+
+# built-in catalog, normalized chord name -> Define
+CATALOG = dict((normalizeChord(d.name), d) for d in map(parseDefine, CATALOG_DEFINES))
+
+def songDiagrams(document, catalog = None, showUndefined = True):
+    '''
+    Returns list of (chord name, Define or None) of chord diagrams of
+    document - chords in the order of first use, followed by {define}d
+    chords which are not used.
+
+    Fingerings of {define} directives override catalog (dict of
+    normalized chord name -> Define, the built-in CATALOG if None).
+    Chords without fingering get None, they are left out unless
+    showUndefined is True.
+    '''
+    if catalog is None:
+        catalog = CATALOG
+    root = document.getroot()
+    defines = {}
+    for e in root.find('head').findall('define'):
+        define = parseDefine(e.text)
+        if define is not None:
+            defines[normalizeChord(define.name)] = define
+
+    names = {}
+    for block in root.find('body'):
+        if block.tag in ('verse', 'chorus'):
+            for line in block:
+                if line.tag == 'row':
+                    for cho in line:
+                        name = cho.attrib.get('c')
+                        if name and name not in names:
+                            names[name] = normalizeChord(name)
+
+    diagrams = []
+    used = set()
+    for name, key in names.items():
+        if key in used:
+            continue
+        used.add(key)
+        define = defines.get(key) or catalog.get(key)
+        if define is None and (not showUndefined or parseChord(name) is None):
+            continue
+        diagrams.append((name, define))
+    for key, define in defines.items():
+        if key not in used:
+            diagrams.append((define.name, define))
+    return diagrams
+
+
+####               ####
+#### transposition ####
+####               ####
+
+# note names for every shift and both accidentals,
+#   NOTE_TABLES[flats][shift][note] is name of note transposed by shift
+NOTE_TABLES = tuple(
+    tuple(tuple(sys.intern(notes[(note + shift) % 12]) for note in range(12)) for shift in range(12))
+    for notes in (NOTES_SHARP, NOTES_FLAT))
+
+# major keys written with flats, minor keys use their relative major
+FLAT_KEYS = frozenset((5, 10, 3, 8, 1))
+
+# chord name -> Chord with quality as written (None for non-chords),
+#   every distinct name is parsed only once
+parsedChords = {}
+
+class TransposeTable(dict):
+    '''
+    Mapping of chord names to names transposed by shift semitones
+
+    Names are computed on first use from the precomputed note tables and
+    interned, so a songbook costs one dict lookup per chord. Names which
+    are not chords map to themselves.
+    '''
+    def __init__(self, shift, flats):
+        dict.__init__(self)
+        self.shift = shift % 12
+        self.flats = flats
+        self.notes = NOTE_TABLES[bool(flats)][self.shift]
+
+    def __missing__(self, name):
+        try:
+            chord = parsedChords[name]
+        except KeyError:
+            chord = parsedChords[name] = parseChord(name, normalize = False)
+        if chord is None:
+            result = name
+        else:
+            result = self.notes[chord.root] + chord.quality
+            if chord.bass is not None:
+                result += '/' + self.notes[chord.bass]
+            result = sys.intern(result)
+        self[name] = result
+        return result
+
+# one table per (shift, flats), shared by all documents
+transposeTables = {}
+
+def transposeTable(shift, flats = False):
+    'Returns shared TransposeTable for shift and accidentals'
+    key = (shift % 12, bool(flats))
+    table = transposeTables.get(key)
+    if table is None:
+        table = transposeTables[key] = TransposeTable(*key)
+    return table
+
+def transposeChord(name, shift, flats = False):
+    'Returns chord name transposed by shift semitones'
+    return transposeTable(shift, flats)[name]
+
+def transposeDefine(text, table):
+    '''
+    Returns {define} argument with the chord renamed by table. Fingerings
+    without open strings are movable and are shifted along the neck.
+    Returns None for other definitions of chords, they would be wrong for
+    the new name (diagrams fall back to the catalog). Definitions of
+    names which are not chords are kept unchanged.
+    '''
+    define = parseDefine(text)
+    if define is None or parseChord(define.name) is None:
+        return text
+    if 0 in define.frets:
+        return None
+    baseFret = (define.baseFret - 1 + table.shift) % 12 + 1
+    return formatDefine(define._replace(name = table[define.name], baseFret = baseFret))
+
+def preferFlats(key):
+    'Returns True if key (Chord of the song key) is written with flats'
+    root = key.root
+    if key.quality.startswith('m') and not key.quality.startswith('maj'):
+        root = (root + 3) % 12
+    return root in FLAT_KEYS
+
+def documentKey(chordNames):
+    'Returns Chord of the first chord in chordNames (key of the song) or None'
+    for name in chordNames:
+        if name:
+            chord = parsedChords.get(name)
+            if chord is None:
+                chord = parsedChords[name] = parseChord(name, normalize = False)
+            if chord is not None:
+                return chord
+    return None
+
+def transposeDocument(document, shift, flats = None):
+    '''
+    Transposes all chords and chord definitions of document (built by
+    parser.parse() or compact model.Song) by shift semitones in place,
+    returns the document.
+
+    flats selects accidentals of the new chords, None means flats for
+    flat keys (judged by the first chord of the transposed song).
+    '''
+    root = document.getroot()
+    if isinstance(root, Song):
+        return transposeSong(root, shift, flats)
+
+    if flats is None:
+        key = documentKey(e.get('c') for e in root.iter('cho'))
+        flats = key is not None and preferFlats(key._replace(root = (key.root + shift) % 12))
+    table = transposeTable(shift, flats)
+    for e in root.iter('cho'):
+        c = e.get('c')
+        if c:
+            e.set('c', table[c])
+    head = root.find('head')
+    for e in head.findall('define'):
+        e.text = transposeDefine(e.text, table)
+        if e.text is None:
+            head.remove(e)
+    return document
+
+def transposeSong(song, shift, flats = None):
+    'Variant of transposeDocument() for compact model.Song'
+    rows = [line for block in song.blocks if isinstance(block, Block)
+            for line in block.lines if isinstance(line, Row)]
+    if flats is None:
+        key = documentKey(c for row in rows for c in row.chords)
+        flats = key is not None and preferFlats(key._replace(root = (key.root + shift) % 12))
+    table = transposeTable(shift, flats)
+    for row in rows:
+        row.chords = tuple([table[c] if c else c for c in row.chords])
+    defines = [transposeDefine(d, table) for d in song.defines]
+    song.defines = tuple([d for d in defines if d is not None])
+    return song
@@ -0,0 +1,354 @@
+import bisect
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from .model import Song, Block, Row, Node, fromElementTree
+
+####                   ####
+#### compiled songbook ####
+####                   ####
+
+# Parsed songs stored in a single binary file, which is memory-mapped by
+# the reader - opening a songbook costs the same for 10 or 10000 songs and
+# a song is decoded only when it is accessed. Layout (little-endian):
+#
+#   header      magic, version, number of songs, number of strings and
+#               byte offsets of the sections below
+#   records     song records, 32-bit words
+#   songs       word offsets of the records, number of songs + 1 entries
+#   strings     byte offsets into the string data, number of strings + 1
+#   data        UTF-8 encoded strings, each distinct string stored once
+#   titles      song indexes ordered by titleKey()
+#
+# A song record is: title, subtitle, number of defines, defines, number
+# of blocks, blocks. Strings are referenced by their index (NONE for
+# None). Block items are encoded as:
+#
+#   BLOCK tag count items...            verse or chorus
+#   ROW count chord lyric ...           row of chord/lyric cells
+#   NODE tag text count key value ...   comment, tab, ...
+
+suffix = '.songbook'
+magic = b'PYCHBOOK'
+version = 1
+header = struct.Struct('<8sIIIIQQQQQ')
+
+NONE = 0xffffffff
+BLOCK, ROW, NODE = 0, 1, 2
+
+def titleKey(title):
+    'Returns key of title for ordering and lookup'
+    return (title or '').strip().casefold()
+
+def words(data):
+    'Returns sequence of 32-bit unsigned integers of little-endian data'
+    if sys.byteorder == 'little':
+        return data.cast('I')
+    a = array('I')
+    a.frombytes(data)
+    a.byteswap()
+    return a
+
+class SongbookWriter:
+    '''
+    Writes compiled songbook into fileName
+
+    Songs are written as they are added, only the string table is kept
+    in memory until close().
+    '''
+    def __init__(self, fileName):
+        self.fileName = fileName
+        self.file = open(fileName, 'wb')
+        self.file.write(b'\0' * header.size)
+        self.strings = {}
+        self.offsets = array('I', [0])
+        self.titles = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        if excType is None:
+            self.close()
+        else:
+            self.file.close()
+            os.remove(self.fileName)
+        return False
+
+    def string(self, s):
+        'Returns index of s in the string table'
+        if s is None:
+            return NONE
+        index = self.strings.get(s)
+        if index is None:
+            index = self.strings[s] = len(self.strings)
+        return index
+
+    def add(self, document):
+        'Appends song of document (ElementTree or model.Song)'
+        if not isinstance(document, Song):
+            document = fromElementTree(document)
+        record = array('I', [self.string(document.title), self.string(document.subtitle),
+                             len(document.defines)])
+        record.extend([self.string(d) for d in document.defines])
+        blocks = [b for b in document.blocks if isinstance(b.tag, str)]
+        record.append(len(blocks))
+        for block in blocks:
+            self.encode(block, record)
+        self.write(record)
+        self.offsets.append(self.offsets[-1] + len(record))
+        self.titles.append(titleKey(document.title))
+
+    def encode(self, item, record):
+        'Appends encoded block, row or node to record'
+        if isinstance(item, Row):
+            record.append(ROW)
+            record.append(len(item.chords))
+            for chord, lyric in zip(item.chords, item.lyrics):
+                record.append(self.string(chord))
+                # rows are decoded without the None check
+                record.append(self.string(lyric or ''))
+        elif isinstance(item, Block):
+            # comments of the source (not {comment}) are not rendered
+            lines = [l for l in item.lines if isinstance(l.tag, str)]
+            record.extend((BLOCK, self.string(item.tag), len(lines)))
+            for line in lines:
+                self.encode(line, record)
+        else:
+            attrib = item._attrib or {}
+            record.extend((NODE, self.string(item.tag), self.string(item.text), len(attrib)))
+            for key, value in attrib.items():
+                record.append(self.string(key))
+                record.append(self.string(value))
+
+    def write(self, a):
+        if sys.byteorder != 'little':
+            a = array('I', a)
+            a.byteswap()
+        a.tofile(self.file)
+
+    def close(self):
+        'Writes indexes and the header, returns number of songs'
+        f = self.file
+        count = len(self.offsets) - 1
+        songsOffset = f.tell()
+        self.write(self.offsets)
+
+        stringsOffset = f.tell()
+        data = [s.encode('utf-8') for s in self.strings]
+        offsets = array('I', [0])
+        for d in data:
+            offsets.append(offsets[-1] + len(d))
+        self.write(offsets)
+        dataOffset = f.tell()
+        for d in data:
+            f.write(d)
+        # keep the title index aligned
+        f.write(b'\0' * (-f.tell() % 4))
+
+        titlesOffset = f.tell()
+        self.write(array('I', sorted(range(count), key = lambda i: (self.titles[i], i))))
+
+        f.seek(0)
+        f.write(header.pack(magic, version, count, len(self.strings), 0,
+                            header.size, songsOffset, stringsOffset, dataOffset, titlesOffset))
+        f.close()
+        return count
+
+def compileSongbook(fileName, documents):
+    'Writes documents into compiled songbook fileName, returns number of songs'
+    with SongbookWriter(fileName) as writer:
+        for document in documents:
+            writer.add(document)
+    return len(writer.offsets) - 1
+
+class CompiledSongbook:
+    '''
+    Memory-mapped compiled songbook, a read-only sequence of songs
+
+    Items are model.Song documents, decoded on every access - callers
+    keep the songs they need. Titles are available without decoding the
+    songs, find() looks a song up by title in the sorted title index.
+    '''
+    def __init__(self, fileName):
+        self.fileName = fileName
+        with open(fileName, 'rb') as f:
+            if os.fstat(f.fileno()).st_size < header.size:
+                raise ValueError('%s is not a compiled songbook' % fileName)
+            self.map = mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
+        view = memoryview(self.map)
+        try:
+            self.check(view)
+        except ValueError:
+            view.release()
+            self.map.close()
+            raise
+        (fileMagic, fileVersion, self.count, stringCount, reserved, recordsOffset,
+         songsOffset, stringsOffset, dataOffset, titlesOffset) = header.unpack_from(view)
+        self.records = words(view[recordsOffset:songsOffset])
+        self.songs = words(view[songsOffset:stringsOffset])
+        self.strings = words(view[stringsOffset:dataOffset])
+        self.data = view[dataOffset:]
+        self.titleIndex = words(view[titlesOffset:titlesOffset + 4 * self.count])
+        # few distinct chord names occur in every song, decode them once
+        self.chordNames = {}
+
+    def check(self, view):
+        'Raises ValueError if header of view does not describe a valid songbook'
+        (fileMagic, fileVersion, count, stringCount, reserved, recordsOffset,
+         songsOffset, stringsOffset, dataOffset, titlesOffset) = header.unpack_from(view)
+        if fileMagic != magic:
+            raise ValueError('%s is not a compiled songbook' % self.fileName)
+        if fileVersion != version:
+            raise ValueError('Unsupported version %d of compiled songbook %s' % (fileVersion, self.fileName))
+        # sections must follow each other within the file (e.g. not truncated)
+        if not (recordsOffset == header.size and recordsOffset <= songsOffset and
+                stringsOffset == songsOffset + 4 * (count + 1) and
+                dataOffset == stringsOffset + 4 * (stringCount + 1) and
+                dataOffset <= titlesOffset and titlesOffset + 4 * count == len(view) and
+                (songsOffset - recordsOffset) % 4 == 0 and titlesOffset % 4 == 0):
+            raise ValueError('Corrupted compiled songbook %s' % self.fileName)
+
+    def close(self):
+        # views must be released before the map can be closed
+        for name in ('records', 'songs', 'strings', 'titleIndex'):
+            a = getattr(self, name)
+            if isinstance(a, memoryview):
+                a.release()
+        self.data.release()
+        self.map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.close()
+        return False
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.song(i) for i in range(*index.indices(self.count))]
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError('Song index out of range')
+        return self.song(index)
+
+    def __iter__(self):
+        for i in range(self.count):
+            yield self.song(i)
+
+    def string(self, index):
+        if index == NONE:
+            return None
+        return str(self.data[self.strings[index]:self.strings[index + 1]], 'utf-8')
+
+    def title(self, index):
+        'Returns title of song index without decoding the song'
+        return self.string(self.records[self.songs[index]])
+
+    def head(self, index):
+        'Returns (title, subtitle, defines) of song index without decoding the song'
+        r = self.records
+        pos = self.songs[index]
+        count = r[pos + 2]
+        return (self.string(r[pos]), self.string(r[pos + 1]),
+                tuple([self.string(r[i]) for i in range(pos + 3, pos + 3 + count)]))
+
+    def titles(self):
+        'Returns list of titles of all songs'
+        return [self.title(i) for i in range(self.count)]
+
+    def find(self, title):
+        'Returns index of the (first) song with title, None if there is no such song'
+        key = titleKey(title)
+        keys = TitleKeys(self)
+        i = bisect.bisect_left(keys, key)
+        if i < self.count and keys[i] == key:
+            return self.titleIndex[i]
+        return None
+
+    def byTitle(self, title):
+        'Returns song with title, raises KeyError if there is no such song'
+        index = self.find(title)
+        if index is None:
+            raise KeyError(title)
+        return self.song(index)
+
+    def song(self, index):
+        'Decodes song index into model.Song'
+        r = self.records
+        string = self.string
+        pos = self.songs[index]
+        song = Song(string(r[pos]), string(r[pos + 1]))
+        count = r[pos + 2]
+        pos += 3
+        song.defines = tuple([string(r[i]) for i in range(pos, pos + count)])
+        pos += count
+        count = r[pos]
+        pos += 1
+        blocks = song.blocks
+        for i in range(count):
+            item, pos = self.decode(pos)
+            blocks.append(item)
+        return song
+
+    def decode(self, pos):
+        'Returns (item, position after it) of block, row or node at pos'
+        r = self.records
+        string = self.string
+        kind = r[pos]
+        if kind == ROW:
+            count = r[pos + 1]
+            pos += 2
+            end = pos + 2 * count
+            chordNames = self.chordNames
+            chords = []
+            for i in range(pos, end, 2):
+                index = r[i]
+                chord = chordNames.get(index)
+                if chord is None:
+                    chord = chordNames[index] = sys.intern(string(index))
+                chords.append(chord)
+            strings = self.strings
+            data = self.data
+            lyrics = tuple([str(data[strings[index]:strings[index + 1]], 'utf-8')
+                            for index in r[pos + 1:end:2]])
+            return Row(tuple(chords), lyrics), end
+        elif kind == BLOCK:
+            tag = string(r[pos + 1])
+            count = r[pos + 2]
+            pos += 3
+            lines = []
+            for i in range(count):
+                line, pos = self.decode(pos)
+                lines.append(line)
+            return Block(tag, lines), pos
+        elif kind == NODE:
+            tag = string(r[pos + 1])
+            text = string(r[pos + 2])
+            count = r[pos + 3]
+            pos += 4
+            attrib = {}
+            for i in range(count):
+                attrib[string(r[pos])] = string(r[pos + 1])
+                pos += 2
+            return Node(tag, text, attrib), pos
+        raise ValueError('Corrupted compiled songbook %s' % self.fileName)
+
+class TitleKeys:
+    'Sequence of keys of the title index, for bisect'
+    def __init__(self, songbook):
+        self.songbook = songbook
+
+    def __len__(self):
+        return self.songbook.count
+
+    def __getitem__(self, i):
+        return titleKey(self.songbook.title(self.songbook.titleIndex[i]))
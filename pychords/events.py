@@ -0,0 +1,209 @@
+from .parser import BadFormattingError, BadDirectiveError, NotFinishedError
+
+####                     ####
+#### event based parsing ####
+####                     ####
+
+# Event API for tools which need only a part of a song (titles, chords,
+# line counts, ...) - the song is reported as a sequence of start and end
+# events and no tree is built.
+#
+# Every event is a tuple (event, name, value, lineno) where event is
+# START or END and name and value are:
+#   'song'      None, the whole input
+#   'meta'      (key, value) of {title}, {subtitle} and {define}
+#   'verse'     None, rows between blank lines
+#   'chorus'    None, between {soc} and {eoc}
+#   'row'       None, line with chords or lyrics
+#   'cell'      chord name at START (may be empty), lyric at END
+#   'comment'   (style, text) - style is 'comment', 'italic' or 'box'
+#   'tab'       preformatted text at START, None at END
+#
+# Events follow the order of the source, in contrast with the document of
+# parser.parse() which moves {comment} and {tab} blocks (and a verse closed
+# by {soc}) before a verse or chorus which is still open. Meta, comment and
+# tab have no children, their END event follows right after START.
+#
+# Verses are delimited as by parser.parse() - a line without chords,
+# lyrics, # comments and {ci}/{cb} comments (e.g. a line of directives) is
+# blank. A blank line outside a chorus ends the verse, rows up to the next
+# blank line form the next verse. Rows before the first blank line are not
+# in any verse, their 'row' events come right in the 'song'.
+
+START = 'start'
+END = 'end'
+
+comment_styles = {
+    'c': 'comment', 'comment': 'comment',
+    'ci': 'italic', 'comment_italic': 'italic',
+    'cb': 'box', 'comment_box': 'box',
+}
+
+meta_keys = {
+    't': 'title', 'title': 'title',
+    'st': 'subtitle', 'subtitle': 'subtitle',
+    'define': 'define',
+}
+
+# rendering hints, not implemented yet
+ignored_directives = ('np', 'new_page', 'npp', 'new_physical_page', 'ns', 'new_song', 'rowname')
+
+def iterevents(tokens):
+    '''
+    Returns an iterator of events (see above) of output of
+    tokenizer.tokenize()
+
+    Raises the same errors as parser.parse() for invalid directives.
+    '''
+    # open blocks and the pending cell
+    block = None
+    row = False
+    chord = None
+    lyric = ''
+    had_content = False
+    # a blank line was seen, rows start a verse
+    verse_ready = False
+    lineno = 1
+
+    for (lineno, ttype, tvalue) in tokens:
+        if ttype == 'chord':
+            if chord is not None:
+                yield (END, 'cell', lyric, lineno)
+            elif not row:
+                if block is None and verse_ready:
+                    block = 'verse'
+                    yield (START, block, None, lineno)
+                row = True
+                yield (START, 'row', None, lineno)
+            chord = tvalue.strip()
+            lyric = ''
+            yield (START, 'cell', chord, lineno)
+
+        elif ttype == 'lyric':
+            # if a lyric appears before a chord, assume a blank chord
+            tvalue = tvalue.lstrip()
+            if tvalue:
+                if chord is None:
+                    if not row:
+                        if block is None and verse_ready:
+                            block = 'verse'
+                            yield (START, block, None, lineno)
+                        row = True
+                        yield (START, 'row', None, lineno)
+                    chord = ''
+                    lyric = tvalue
+                    yield (START, 'cell', chord, lineno)
+                else:
+                    lyric += tvalue
+
+        elif ttype == 'eol':
+            if row:
+                yield (END, 'cell', lyric, lineno)
+                yield (END, 'row', None, lineno)
+                row = False
+                chord = None
+            elif block != 'chorus' and not had_content:
+                # blank line (directives don't count) ends a verse
+                if block == 'verse':
+                    yield (END, block, None, lineno)
+                    block = None
+                verse_ready = True
+
+        elif ttype == 'sol':
+            had_content = False
+
+        elif ttype == 'directive':
+            tag, arg = tvalue.split(':', 1) if ':' in tvalue else (tvalue, '')
+            tag = tag.lower()
+            # a directive ends the pending cell, but not the row
+            if chord is not None:
+                yield (END, 'cell', lyric, lineno)
+                chord = None
+            if tag in meta_keys or tag in comment_styles or tag == 'tab':
+                if not arg: raise BadDirectiveError('{%s} directive needs an argument at line %s' % (tag, lineno))
+
+            if tag in meta_keys:
+                value = (meta_keys[tag], arg)
+                yield (START, 'meta', value, lineno)
+                yield (END, 'meta', value, lineno)
+
+            elif tag in comment_styles:
+                value = (comment_styles[tag], arg)
+                # italic and box comments are content of the line like
+                #   in parser.parse()
+                if value[0] != 'comment':
+                    had_content = True
+                yield (START, 'comment', value, lineno)
+                yield (END, 'comment', value, lineno)
+
+            elif tag in ('soc', 'start_of_chorus'):
+                if arg: raise BadDirectiveError('{%s} directive needs no argument %r at line %d' % (tag, arg, lineno))
+                if row:
+                    yield (END, 'row', None, lineno)
+                    row = False
+                if block is not None:
+                    yield (END, block, None, lineno)
+                block = 'chorus'
+                yield (START, block, None, lineno)
+
+            elif tag in ('eoc', 'end_of_chorus'):
+                if arg: raise BadDirectiveError('{%s} directive needs no argument %r at line %d' % (tag, arg, lineno))
+                if row:
+                    yield (END, 'row', None, lineno)
+                    row = False
+                if block is not None:
+                    yield (END, block, None, lineno)
+                block = None
+
+            elif tag == 'tab':
+                yield (START, 'tab', arg, lineno)
+                yield (END, 'tab', None, lineno)
+
+            elif tag in ignored_directives:
+                pass
+
+            else:
+                raise NotFinishedError('Unimplemented directive %s at line %d' % (tag, lineno))
+
+        elif ttype == 'sof':
+            had_content = False
+            yield (START, 'song', None, lineno)
+
+        elif ttype == 'eof':
+            if row:
+                if chord is not None:
+                    yield (END, 'cell', lyric, lineno)
+                yield (END, 'row', None, lineno)
+            if block is not None:
+                yield (END, block, None, lineno)
+            yield (END, 'song', None, lineno)
+
+        elif ttype == 'comment':
+            had_content = True
+
+        else:
+            raise BadFormattingError('Unrecognized token %r (%r) at line %d' % (ttype, tvalue, lineno))
+
+class Handler(object):
+    '''
+    Base class of callback consumers of events, see feed()
+
+    Methods are called with name, value and line number of each event,
+    subclasses override what they need.
+    '''
+    def start(self, name, value, lineno):
+        pass
+
+    def end(self, name, value, lineno):
+        pass
+
+def feed(tokens, handler):
+    'Calls handler (Handler) for all events of tokens, returns handler'
+    start = handler.start
+    end = handler.end
+    for event, name, value, lineno in iterevents(tokens):
+        if event is START:
+            start(name, value, lineno)
+        else:
+            end(name, value, lineno)
+    return handler
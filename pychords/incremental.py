@@ -0,0 +1,146 @@
+import codecs
+import hashlib
+import io
+import json
+import os
+import re
+
+from . import __version__, tokenizer, parser, render2pdf, chords, compiled
+
+class IncrementalBuild:
+    '''
+    PDF songbook build re-rendering only changed songs
+
+    Every source file is rendered into its own PDF artifact in the
+    artifacts subdirectory of the build directory, other files of the
+    build directory (e.g. the songbook itself) are never touched. The
+    manifest remembers content hash, title and artifact of each file
+    together with hash of the style sheet, so the next build renders only
+    new or modified songs (or all of them, if the style changed) and
+    re-assembles the songbook from the artifacts.
+
+    Songs are transposed by transpose semitones, see
+    chords.transposeDocument().
+    '''
+    manifestName = 'manifest.json'
+    artifactsName = 'artifacts'
+    # artifacts are named by sha256 of their source
+    artifactPattern = re.compile(r'^[0-9a-f]{64}\.pdf$')
+
+    def __init__(self, buildDir, styleSheet, transpose = 0, flats = None):
+        self.buildDir = buildDir
+        self.styleSheet = styleSheet
+        self.transpose = transpose % 12
+        self.flats = flats
+        # transposition changes all artifacts just like the style
+        self.styleHash = hashlib.sha256(
+            (__version__ + json.dumps([vars(styleSheet), self.transpose, flats],
+                                      sort_keys = True)).encode('utf-8')).hexdigest()
+        self.artifactsDir = os.path.join(buildDir, self.artifactsName)
+        os.makedirs(self.artifactsDir, exist_ok = True)
+        self.manifestPath = os.path.join(buildDir, self.manifestName)
+        self.manifest = self.loadManifest()
+
+    def loadManifest(self):
+        try:
+            with open(self.manifestPath) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        # artifacts rendered with different style or version are useless
+        if manifest.get('style') != self.styleHash:
+            return {}
+        return manifest.get('songs', {})
+
+    def saveManifest(self):
+        tmpPath = self.manifestPath + '.tmp'
+        with open(tmpPath, 'w') as f:
+            json.dump({'style': self.styleHash, 'songs': self.manifest}, f, indent = 1)
+        os.replace(tmpPath, self.manifestPath)
+
+    def renderSong(self, fileName, data, key):
+        '''
+        Parses (decodes, if it is a compiled songbook) and renders one source
+        file into its artifact
+
+        Returns manifest entry or None if no song could be parsed, songs
+        failing on unimplemented feature are left out.
+        '''
+        documents = []
+        if fileName.endswith(compiled.suffix):
+            # songs of compiled songbook are stored already parsed
+            with compiled.CompiledSongbook(fileName) as songbook:
+                documents.extend(songbook)
+        else:
+            tokens = tokenizer.tokenize(codecs.getreader('utf-8-sig')(io.BytesIO(data)))
+            for document, error in parser.parse_songs(tokens):
+                if error is not None:
+                    print(fileName, error)
+                else:
+                    documents.append(document)
+        if not documents:
+            return None
+        if self.transpose:
+            for document in documents:
+                chords.transposeDocument(document, self.transpose, self.flats)
+        artifact = key + '.pdf'
+        songs = render2pdf.renderChunk(self.artifactPath(artifact), self.styleSheet, documents)
+        return {'hash': key, 'artifact': artifact, 'title': songs[0][0], 'songs': songs}
+
+    def build(self, fileNames, outputFile, order = 'none', keep = False):
+        '''
+        Builds songbook outputFile from fileNames, returns number of
+        re-rendered songs
+
+        If keep is True (watch mode), a file which can't be read or parsed
+        at all is reported and its previous artifact is used.
+        '''
+        entries = []
+        rendered = 0
+        for fileName in fileNames:
+            entry = self.manifest.get(fileName)
+            try:
+                with open(fileName, 'rb') as f:
+                    data = f.read()
+                key = hashlib.sha256(data).hexdigest()
+                if entry is not None and entry['hash'] == key and \
+                        os.path.isfile(self.artifactPath(entry['artifact'])):
+                    entries.append(entry)
+                    continue
+                print('Rendering "%s"' % fileName)
+                rendered += 1
+                entry = self.renderSong(fileName, data, key)
+            except (OSError, UnicodeDecodeError, parser.BadDirectiveError, parser.BadFormattingError) as e:
+                if not keep:
+                    raise
+                print(fileName, e)
+                if entry is not None and os.path.isfile(self.artifactPath(entry['artifact'])):
+                    entries.append(entry)
+                continue
+            if entry is None:
+                self.manifest.pop(fileName, None)
+                continue
+            self.manifest[fileName] = entry
+            entries.append(entry)
+
+        if order == 'title':
+            print('Sorting songs according to title')
+            entries.sort(key = lambda e: e['title'] or '')
+
+        print('Assembling', outputFile)
+        render2pdf.mergeChunks(outputFile,
+            [(self.artifactPath(e['artifact']), [tuple(s) for s in e['songs']]) for e in entries])
+
+        self.saveManifest()
+        self.removeStale()
+        return rendered
+
+    def artifactPath(self, name):
+        return os.path.join(self.artifactsDir, name)
+
+    def removeStale(self):
+        'Deletes artifacts not referenced by the manifest'
+        used = set(e['artifact'] for e in self.manifest.values())
+        for name in os.listdir(self.artifactsDir):
+            if self.artifactPattern.match(name) and name not in used:
+                os.remove(self.artifactPath(name))
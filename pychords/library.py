@@ -0,0 +1,172 @@
+import codecs
+import hashlib
+import io
+import json
+import os
+import sqlite3
+from collections import namedtuple
+
+from . import tokenizer
+
+# suffixes of chordpro files found when scanning directories
+suffixes = ('.cho', '.chopro', '.chordpro', '.crd', '.pro')
+
+####                   ####
+#### metadata scanning ####
+####                   ####
+
+def scanMetadata(infile):
+    '''
+    Reads metadata (title, subtitle, defines) of a song from infile
+
+    Only the leading directives are read - scanning stops at the first
+    chord or lyric, so the rest of the file is not even tokenized.
+    Returns dict with keys 'title', 'subtitle' (None if missing) and
+    'define' (list).
+    '''
+    return scanTokens(tokenizer.tokenize(infile))
+
+def scanTokens(tokens):
+    'Reads metadata from output of tokenizer.tokenize(), see scanMetadata()'
+    meta = {'title': None, 'subtitle': None, 'define': []}
+    for lineno, ttype, tvalue in tokens:
+        if ttype in ('chord', 'lyric'):
+            break
+        if ttype != 'directive':
+            continue
+        tag, arg = tvalue.split(':', 1) if ':' in tvalue else (tvalue, '')
+        tag = tag.lower()
+        if not arg:
+            continue
+        if tag in ('t', 'title'):
+            meta['title'] = arg
+        elif tag in ('st', 'subtitle'):
+            meta['subtitle'] = arg
+        elif tag == 'define':
+            meta['define'].append(arg)
+    return meta
+
+def scanFile(fileName):
+    'Returns metadata of file, see scanMetadata()'
+    with codecs.open(fileName, 'r', 'utf-8-sig') as f:
+        return scanMetadata(f)
+
+def findFiles(paths):
+    'Expands directories in paths to chordpro files found in them'
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    if name.lower().endswith(suffixes):
+                        yield os.path.join(root, name)
+        else:
+            yield path
+
+####               ####
+#### library index ####
+####               ####
+
+SongInfo = namedtuple('SongInfo', 'path title subtitle defines mtime hash')
+
+class LibraryIndex:
+    '''
+    Persistent (SQLite) index of song metadata
+
+    The index allows to sort and select songs of a large library without
+    parsing them. Files are rescanned only if their mtime or size changed.
+    '''
+    sortKeys = ('title', 'subtitle', 'path', 'mtime')
+
+    def __init__(self, dbPath):
+        self.db = sqlite3.connect(dbPath)
+        # files skipped by the last update()
+        self.errors = []
+        self.db.execute('''CREATE TABLE IF NOT EXISTS songs (
+            path TEXT PRIMARY KEY,
+            title TEXT,
+            subtitle TEXT,
+            defines TEXT,
+            mtime REAL,
+            size INTEGER,
+            hash TEXT)''')
+        self.db.execute('CREATE INDEX IF NOT EXISTS songs_title ON songs (title COLLATE NOCASE)')
+
+    def close(self):
+        self.db.close()
+
+    def update(self, paths, prune = True):
+        '''
+        Scans files (directories are searched recursively), returns tuple
+        (number of scanned files, number of removed entries). If prune is
+        True, entries of no longer existing files are removed.
+
+        Files which can't be read or decoded are skipped (their old entries
+        are removed), list of (file name, error) of them is kept in errors.
+        '''
+        known = dict((row[0], (row[1], row[2])) for row in
+                     self.db.execute('SELECT path, mtime, size FROM songs'))
+        scanned = 0
+        self.errors = []
+        with self.db:
+            for fileName in findFiles(paths):
+                fileName = os.path.abspath(fileName)
+                try:
+                    st = os.stat(fileName)
+                    if known.get(fileName) == (st.st_mtime, st.st_size):
+                        continue
+                    with open(fileName, 'rb') as f:
+                        data = f.read()
+                    meta = scanMetadata(codecs.getreader('utf-8-sig')(io.BytesIO(data)))
+                except (OSError, ValueError) as e:
+                    # UnicodeDecodeError is a ValueError
+                    self.errors.append((fileName, e))
+                    self.db.execute('DELETE FROM songs WHERE path = ?', (fileName,))
+                    continue
+                self.db.execute('INSERT OR REPLACE INTO songs VALUES (?, ?, ?, ?, ?, ?, ?)', (
+                    fileName, meta['title'] and meta['title'].strip(),
+                    meta['subtitle'] and meta['subtitle'].strip(),
+                    json.dumps([d.strip() for d in meta['define']]), st.st_mtime, st.st_size,
+                    hashlib.sha256(data).hexdigest()))
+                scanned += 1
+
+            removed = 0
+            if prune:
+                for fileName in known:
+                    if not os.path.isfile(fileName):
+                        self.db.execute('DELETE FROM songs WHERE path = ?', (fileName,))
+                        removed += 1
+        return scanned, removed
+
+    def query(self, title = None, subtitle = None, define = None, path = None,
+              sort = 'title', limit = None):
+        '''
+        Returns list of SongInfo of matching songs
+
+        title, subtitle, define (chord name of a {define}) and path are
+        case-insensitive SQL LIKE patterns ('%' matches anything), sort is
+        one of sortKeys.
+        '''
+        if sort not in self.sortKeys:
+            raise ValueError('Unsupported sort key %s' % sort)
+        where = []
+        params = []
+        for column, pattern in (('title', title), ('subtitle', subtitle), ('path', path)):
+            if pattern is not None:
+                where.append('%s LIKE ?' % column)
+                params.append(pattern)
+        if define is not None:
+            # defines are stored as JSON list of "name fingering" strings
+            where.append('defines LIKE ?')
+            params.append('%%"%s %%' % define)
+        sql = 'SELECT path, title, subtitle, defines, mtime, hash FROM songs'
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        if sort == 'mtime':
+            sql += ' ORDER BY mtime, path'
+        else:
+            sql += ' ORDER BY %s COLLATE NOCASE, path' % sort
+        if limit:
+            sql += ' LIMIT %d' % limit
+        return [SongInfo(r[0], r[1] or '', r[2] or '', json.loads(r[3]), r[4], r[5])
+                for r in self.db.execute(sql, params)]
@@ -6,8 +6,13 @@ import re
 import string
 import sys
 import codecs
+import functools
+import io
 
-from . import tokenizer, parser, render, render2pdf
+# backends (reportlab, sqlite, process pools) are imported only when
+#   they are needed, short invocations are dominated by the startup
+from . import tokenizer, parser, render, profiling, chords, watch, compiled
+from .style import StyleSheet
 
 def getDocumentTitle(d):
     head = d.find('head')
@@ -15,18 +20,310 @@ def getDocumentTitle(d):
     if title != None:
         return title.text.strip()
     return "" 
-     
-def main():
+
+def parseFile(fileName, cache = None, profile = False):
+    '''
+    Tokenizes and parses single chordpro file, "-" is standard input.
+
+    Returns tuple (file name, documents, error) with list of documents of
+    songs of the file (see tokenizer.split_songs()) - songs which failed
+    on unimplemented feature are left out, error holds the first reason.
+    If cache (ParseCache) is given, unchanged files are loaded from it.
+    If profile is True, stages are measured (see profiling module).
+    '''
+    if fileName.endswith(compiled.suffix):
+        return (fileName, loadCompiled(fileName), None)
+    if profile:
+        return profileFile(fileName, cache)
+    if cache is None:
+        with openSource(fileName) as chordfile:
+            return parseStream(fileName, chordfile)
+
+    data = readSource(fileName)
+    key = cache.key(data)
+    documents = cache.load(key)
+    if documents is not None:
+        return (fileName, documents, None)
+    result = parseStream(fileName, codecs.getreader('utf-8-sig')(io.BytesIO(data)))
+    if result[2] is None:
+        cache.store(key, result[1])
+    return result
+
+def loadCompiled(fileName):
+    'Returns list of all songs of compiled songbook, see compiled module'
+    with compiled.CompiledSongbook(fileName) as songbook:
+        return list(songbook)
+
+def openSource(fileName):
+    'Opens chordpro file for reading, "-" is standard input'
+    if fileName == '-':
+        return codecs.getreader('utf-8-sig')(sys.stdin.buffer)
+    return codecs.open(fileName, 'r', 'utf-8-sig')
+
+def readSource(fileName):
+    'Returns content (bytes) of chordpro file, "-" is standard input'
+    if fileName == '-':
+        return sys.stdin.buffer.read()
+    with open(fileName, 'rb') as f:
+        return f.read()
+
+def parseStream(fileName, chordfile):
+    'Tokenizes and parses already opened chordpro file, see parseFile()'
+    documents = []
+    firstError = None
+    for document, error in parser.parse_songs(tokenizer.tokenize(chordfile)):
+        if error is None:
+            documents.append(document)
+        elif firstError is None:
+            firstError = error
+    return (fileName, documents, firstError)
+
+def profileFile(fileName, cache = None):
+    'Variant of parseFile() measuring each stage separately'
+    with profiling.stage('read', fileName) as record:
+        data = readSource(fileName)
+        record.count = len(data)
+
+    if cache is not None:
+        with profiling.stage('cache', fileName) as record:
+            key = cache.key(data)
+            documents = cache.load(key)
+            record.count = int(documents is not None)
+        if documents is not None:
+            return (fileName, documents, None)
+
+    tokens = profiling.tokenize(codecs.getreader('utf-8-sig')(io.BytesIO(data)), fileName)
+    documents = []
+    firstError = None
+    for song in tokenizer.split_songs(tokens):
+        try:
+            documents.append(profiling.parse(list(song), fileName))
+        except parser.NotFinishedError as e:
+            firstError = firstError or e
+    if cache is not None and firstError is None:
+        cache.store(key, documents)
+    return (fileName, documents, firstError)
+
+# errors of files being edited in watch mode, see keepFile()
+watchErrors = (OSError, UnicodeDecodeError, parser.BadDirectiveError, parser.BadFormattingError)
+
+def keepFile(fileName, cache = None, profile = False):
+    '''
+    Variant of parseFile() for watch mode - a file which can't be read
+    or parsed at all gives tuple (file name, None, error) instead of
+    raising, so a bad save does not stop the watcher
+    '''
+    try:
+        return parseFile(fileName, cache, profile)
+    except watchErrors as e:
+        return (fileName, None, e)
+
+def parseFiles(fileNames, jobs = 1, cache = None, profile = False, keep = False):
+    '''
+    Parses all files, results are delivered in the same order as fileNames.
+
+    If jobs is greater than 1, files are spread across a pool of jobs
+    worker processes, value 0 means one worker per cpu core. If keep is
+    True, broken files are reported instead of raising, see keepFile().
+    '''
+    worker = functools.partial(keepFile if keep else parseFile, cache = cache, profile = profile)
+    if profile or '-' in fileNames:
+        # stages are recorded by hooks of this process, standard input
+        #   is readable only here
+        jobs = 1
+    if jobs == 0:
+        jobs = os.cpu_count() or 1
+    if jobs == 1 or len(fileNames) < 2:
+        yield from map(worker, fileNames)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    # several files per task keeps the inter-process traffic low
+    chunkSize = max(1, len(fileNames) // (jobs * 4))
+    with ProcessPoolExecutor(jobs) as pool:
+        yield from pool.map(worker, fileNames, chunksize = chunkSize)
+
+def indexMain(argv):
+    """Main for "pychords index" commands - song library index"""
+
+    from .library import LibraryIndex
+
+    argParser = argparse.ArgumentParser(prog='pychords index',
+        description='Metadata index of a song library')
+    argParser.add_argument('--db', default='pychords.db', help='Index database file (default: %(default)s)')
+    commands = argParser.add_subparsers(dest='command', metavar='command')
+    commands.required = True
+
+    update = commands.add_parser('update', help='Scan files and directories into the index')
+    update.add_argument('paths', nargs='+', metavar='path', help='chordpro files or directories')
+
+    query = commands.add_parser('query', help='Print songs matching the filter')
+    render = commands.add_parser('render',
+        help='Render songs matching the filter, other options are passed to pychords')
+    for p in (query, render):
+        p.add_argument('--title', help='Title pattern (SQL LIKE, %% matches anything)')
+        p.add_argument('--subtitle', help='Subtitle pattern')
+        p.add_argument('--define', help='Name of chord defined in the song')
+        p.add_argument('--path', help='File path pattern')
+        p.add_argument('--sort', choices=LibraryIndex.sortKeys, default='title', help='Order of songs')
+        p.add_argument('--limit', type=int, help='Maximal number of songs')
+
+    args, rest = argParser.parse_known_args(argv)
+    if rest and args.command != 'render':
+        argParser.error('unrecognized arguments: %s' % ' '.join(rest))
+
+    index = LibraryIndex(args.db)
+    try:
+        if args.command == 'update':
+            scanned, removed = index.update(args.paths)
+            for fileName, error in index.errors:
+                print(fileName, error)
+            print('%d files scanned, %d removed' % (scanned, removed))
+            return
+
+        songs = index.query(args.title, args.subtitle, args.define, args.path, args.sort, args.limit)
+    finally:
+        index.close()
+
+    if args.command == 'query':
+        for song in songs:
+            print('%s\t%s\t%s' % (song.title, song.subtitle, song.path))
+    elif not songs:
+        sys.stderr.write('No songs selected\n')
+        sys.exit(1)
+    else:
+        # only selected songs are parsed, in the order of the index
+        main(rest + ['-o', 'none', '--'] + [song.path for song in songs])
+
+def searchMain(argv):
+    """Main for "pychords search" command - full-text lyric and chord search"""
+
+    from .search import SearchIndex
+
+    argParser = argparse.ArgumentParser(prog='pychords search',
+        description='Search songs by lyrics and chords')
+    argParser.add_argument('words', nargs='*', metavar='word', help='Words of lyrics to search for')
+    argParser.add_argument('--db', default='pychords.db', help='Index database file (default: %(default)s)')
+    argParser.add_argument('-c', '--chord', action='append', default=[], help='Chord used in the song (repeatable)')
+    argParser.add_argument('-u', '--update', nargs='+', metavar='path',
+        help='Index new and changed chordpro files or directories first')
+    argParser.add_argument('--limit', type=int, default=20, help='Maximal number of results (default: %(default)s)')
+    args = argParser.parse_args(argv)
+
+    index = SearchIndex(args.db)
+    try:
+        if args.update:
+            indexed, removed = index.update(args.update)
+            for fileName, error in index.errors:
+                print(fileName, error)
+            print('%d files indexed, %d removed' % (indexed, removed))
+        if args.words or args.chord:
+            for result in index.search(' '.join(args.words), args.chord, args.limit):
+                print('%8.2f  %s  %s:%s' % (result.score, result.title, result.path,
+                                            ','.join(str(l) for l in result.lines)))
+    finally:
+        index.close()
+
+def serveMain(argv):
+    """Main for "pychords serve" command - HTTP render server"""
+
+    from .server import RenderServer, RenderService
+
+    argParser = argparse.ArgumentParser(prog='pychords serve',
+        description='HTTP server rendering chordpro text posted as JSON to /render')
+    argParser.add_argument('--host', default='127.0.0.1', help='Address to listen on (default: %(default)s)')
+    argParser.add_argument('--port', type=int, default=8000, help='Port to listen on (default: %(default)s)')
+    argParser.add_argument('--cache-size', type=int, default=64,
+        help='Maximal size of the output cache in MB (default: %(default)s)')
+    argParser.add_argument('-v', '--verbose', action='store_true', help='Log every request')
+    args = argParser.parse_args(argv)
+
+    server = RenderServer((args.host, args.port), RenderService(args.cache_size * 1024 * 1024),
+                          verbose = args.verbose)
+    print('Serving on http://%s:%d/render (Ctrl+C to stop)' % server.server_address[:2])
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+def compileMain(argv):
+    """Main for "pychords compile" command - compiled songbook"""
+
+    from .library import findFiles
+
+    argParser = argparse.ArgumentParser(prog='pychords compile',
+        description='Compile songs into a binary songbook, which is loaded without parsing '
+                    '(pass it to pychords as any chordpro file)')
+    argParser.add_argument('paths', nargs='+', metavar='path',
+        help='chordpro files or directories, - is standard input')
+    argParser.add_argument('-o', '--output', required=True,
+        help='Songbook file, should end with %s' % compiled.suffix)
+    args = argParser.parse_args(argv)
+
+    def documents():
+        for f in findFiles(args.paths):
+            with openSource(f) as chordfile:
+                for document, error in parser.parse_songs(tokenizer.tokenize(chordfile)):
+                    if error is not None:
+                        print(f, error)
+                    else:
+                        yield document
+
+    count = compiled.compileSongbook(args.output, documents())
+    print('%d songs compiled into "%s"' % (count, args.output))
+
+commands = {
+    'compile': compileMain,
+    'index': indexMain,
+    'search': searchMain,
+    'serve': serveMain,
+}
+
+def main(argv = None):
     """Main for command line interface"""
 
+    if argv is None:
+        argv = sys.argv[1:]
+    if argv and argv[0] in commands:
+        return commands[argv[0]](argv[1:])
+
     argParser = argparse.ArgumentParser(
         description='Tool for processing song lyrics stored in ChordPro formatted files')
-    argParser.add_argument('files', help='chordpro files to be processed', nargs='+', metavar='file')
+    argParser.add_argument('files', nargs='+', metavar='file',
+        help='chordpro files to be processed, - is standard input (songs of a file are separated by {new_song})')
     argParser.add_argument('-f', choices=['text', 'html', 'html_css', 'pdf'], help='Output format', default='text')
     argParser.add_argument('-s', help='Style sheet file')
-    argParser.add_argument('-n', help='Output name (name of the output file)')
+    argParser.add_argument('-n', help='Output name (name of the output file, text and html formats go to standard output if not set)')
     argParser.add_argument('-o', choices=['none', 'title', 'file'], help='Order before rendering', default='none')
-    args = argParser.parse_args()
+    argParser.add_argument('-j', '--jobs', type=int, default=1,
+        help='Number of parallel parsing and PDF rendering processes (0 means one per cpu core)')
+    argParser.add_argument('--cache-dir', help='Directory for caching of parsed files')
+    argParser.add_argument('--cache-size', type=int, default=256,
+        help='Maximal size of the parse cache in MB (default: %(default)s)')
+    argParser.add_argument('--build-dir',
+        help='Directory with artifacts of incremental PDF build (only changed songs are re-rendered)')
+    argParser.add_argument('-d', '--diagrams', action='store_true',
+        help='Draw chord diagrams of each song (built-in fingerings or {define} directives)')
+    argParser.add_argument('-t', '--transpose', type=int, default=0, metavar='N',
+        help='Transpose chords by N semitones (negative is down)')
+    argParser.add_argument('--accidentals', choices=['auto', 'sharps', 'flats'], default='auto',
+        help='Accidentals of transposed chords, auto chooses by key of each song (default: %(default)s)')
+    argParser.add_argument('--stream', action='store_true',
+        help='Parse, render and write songs one by one in bounded memory (text and html formats, '
+             'order by title is not supported for standard input)')
+    argParser.add_argument('-w', '--watch', action='store_true',
+        help='Keep running and rebuild the output whenever input files or the style sheet change')
+    argParser.add_argument('--watch-interval', type=float, default=0.2, metavar='SECONDS',
+        help='Polling interval of watch mode (default: %(default)s)')
+    argParser.add_argument('--debounce', type=float, default=0.1, metavar='SECONDS',
+        help='Quiet time after the last change before rebuild in watch mode (default: %(default)s)')
+    argParser.add_argument('--profile', action='store_true',
+        help='Measure time and memory of each stage, implies single job')
+    argParser.add_argument('--profile-json', help='Write profiling records to JSON file')
+    args = argParser.parse_args(argv)
     
     # check arguments - format
     if args.f not in ['text', 'html', 'html_css', 'pdf']:
@@ -34,9 +331,7 @@ def main():
         sys.exit(1)
 
     # initialize style-sheet
-    styleSheet = render2pdf.StyleSheet()
-    if args.s:
-        styleSheet.loadFromFile(args.s)
+    styleSheet = loadStyleSheet(args)
 
     # generate output name
     outputName = None
@@ -45,22 +340,241 @@ def main():
     # if no name is specified, take name of the first file
     elif len(args.files) > 0:
         (root, ext) = os.path.splitext(os.path.basename(args.files[0]))
-        outputName = root
+        outputName = root if args.files[0] != '-' else 'stdin'
     else:
         sys.stderr.write('No files to be processed')
         sys.exit(1)
 
-    # parse all files 
-    documents = []
-    for f in args.files:
+    if args.jobs < 0:
+        sys.stderr.write('Number of jobs must not be negative\n')
+        sys.exit(1)
+
+    if args.watch and (args.profile or args.profile_json):
+        sys.stderr.write('Profiling is not supported in watch mode\n')
+        sys.exit(1)
+
+    if '-' in args.files and (args.watch or args.build_dir or args.files.count('-') > 1):
+        sys.stderr.write('Standard input can be read only once, without watch mode and incremental build\n')
+        sys.exit(1)
+
+    if args.stream and (args.f == 'pdf' or args.watch or args.profile or args.profile_json):
+        sys.stderr.write('Streaming is supported only for text and html formats without watch and profiling\n')
+        sys.exit(1)
+
+    if args.stream and args.o == 'title' and '-' in args.files:
+        sys.stderr.write('Standard input can\'t be ordered by title in stream mode\n')
+        sys.exit(1)
+
+    flats = {'auto': None, 'sharps': False, 'flats': True}[args.accidentals]
+
+    if args.build_dir:
+        if args.f != 'pdf':
+            sys.stderr.write('Incremental build is supported only for pdf format\n')
+            sys.exit(1)
+        from .incremental import IncrementalBuild
+        build = IncrementalBuild(args.build_dir, styleSheet, args.transpose, flats)
+        build.build(args.files, outputName + '.pdf', args.o, args.watch)
+        if args.watch:
+            def rebuild(changed):
+                nonlocal build
+                # the build itself finds changed songs
+                if args.s in changed:
+                    styleSheet = reloadStyleSheet(args, build.styleSheet)
+                    if styleSheet is not build.styleSheet:
+                        build = IncrementalBuild(args.build_dir, styleSheet, args.transpose, flats)
+                build.build([f for f in args.files if os.path.isfile(f)], outputName + '.pdf', args.o, True)
+            watch.watch(watchedFiles(args), rebuild, args.watch_interval, args.debounce)
+        return
+
+    cache = None
+    if args.cache_dir:
+        from .cache import ParseCache
+        cache = ParseCache(args.cache_dir, args.cache_size * 1024 * 1024)
+
+    if args.stream:
+        streamFiles(args, styleSheet, outputName, cache, flats)
+        return
+
+    profiler = None
+    if args.profile or args.profile_json:
+        profiler = profiling.Profiler()
+        profiler.start()
+
+    # parse all files, documents are kept by file name for watch mode
+    documents = {}
+    readDocuments(documents, args.files, args, cache, profiler is not None, flats)
+    renderDocuments(songsOf(documents, args.files), args, styleSheet, outputName)
+
+    if profiler is not None:
+        profiler.stop()
+        for line in profiler.summary():
+            sys.stderr.write(line + '\n')
+        if args.profile_json:
+            profiler.writeJson(args.profile_json)
+
+    if args.watch:
+        def rebuild(changed):
+            nonlocal styleSheet
+            if args.s in changed:
+                styleSheet = reloadStyleSheet(args, styleSheet)
+            # only changed songs are parsed again
+            readDocuments(documents, [f for f in args.files if f in changed],
+                          args, cache, False, flats)
+            renderDocuments(songsOf(documents, args.files), args, styleSheet, outputName)
+        watch.watch(watchedFiles(args), rebuild, args.watch_interval, args.debounce)
+
+def loadStyleSheet(args):
+    'Returns style sheet of the command line arguments'
+    styleSheet = StyleSheet()
+    if args.s:
+        styleSheet.loadFromFile(args.s)
+    if args.diagrams:
+        styleSheet.chordDiagrams = True
+    return styleSheet
+
+def reloadStyleSheet(args, styleSheet):
+    'Loads modified style sheet in watch mode, keeps styleSheet if it is broken'
+    print('Reading style sheet "%s"' % args.s)
+    try:
+        return loadStyleSheet(args)
+    except (IOError, ValueError, KeyError) as e:
+        print(args.s, e)
+        return styleSheet
+
+def watchedFiles(args):
+    'Returns files watched for changes in watch mode'
+    return list(args.files) + ([args.s] if args.s else [])
+
+def songsOf(documents, fileNames):
+    'Returns list of documents of all songs of fileNames, see readDocuments()'
+    return [d for f in fileNames if f in documents for d in documents[f]]
+
+def readDocuments(documents, fileNames, args, cache, profile, flats):
+    '''
+    Parses and transposes fileNames into documents (dict file name ->
+    list of documents of its songs), files which disappeared are removed
+
+    In watch mode, a file which can't be read or parsed is reported and
+    its previous documents are kept.
+    '''
+    existing = []
+    for f in fileNames:
+        if f == '-' or os.path.isfile(f):
+            existing.append(f)
+        else:
+            print('File "%s" not found' % f)
+            documents.pop(f, None)
+
+    parsed = []
+    for f, songs, error in parseFiles(existing, args.jobs, cache, profile, args.watch):
         print('Reading "%s"' % f)
-        chordfile = codecs.open(f, 'r', 'utf-8-sig')
+        if error is not None:
+            print(f, error)
+        if songs is None:
+            continue
+        documents[f] = songs
+        parsed.extend(songs)
+    if cache is not None:
+        cache.trim()
+
+    if args.transpose % 12:
+        with profiling.stage('transpose') as record:
+            record.count = len(parsed)
+            for document in parsed:
+                chords.transposeDocument(document, args.transpose, flats)
+
+def streamFiles(args, styleSheet, outputName, cache, flats):
+    '''
+    Renders files as a pipeline - every song is tokenized, parsed, rendered
+    and written before the next one is read, so memory does not grow with
+    the number of songs - files with many songs separated by {new_song}
+    (e.g. exported songbooks on standard input) included. Order by title
+    uses a pre-pass reading only the leading metadata directives of each
+    song (see songbook.Songbook), the songs are then parsed one by one in
+    order of their titles, as in the normal mode.
+    Messages go to standard error, standard output may carry the output.
+    '''
+    sys.stderr.write('Rendering to %s\n' % args.f)
+    fileNameOutput = outputName + render.extensions[args.f] if args.n else None
+    render.renderToFile(streamDocuments(args.files, args, cache, flats), args.f, fileNameOutput,
+                        show_diagrams = styleSheet.chordDiagrams)
+    if cache is not None:
+        cache.trim()
+
+def streamDocuments(fileNames, args, cache, flats):
+    'Generator of parsed and transposed documents of fileNames, see streamFiles()'
+    if args.o == 'title':
+        songs = titleSongs(fileNames)
+    else:
+        songs = streamSongs(fileNames, args.jobs, cache)
+    for f, document, error in songs:
+        if error is not None:
+            sys.stderr.write('%s %s\n' % (f, error))
+            continue
+        if args.transpose % 12:
+            chords.transposeDocument(document, args.transpose, flats)
+        yield document
+
+def titleSongs(fileNames):
+    '''
+    Generator of (file name, document, error) of all songs of fileNames
+    ordered by title, songs of equal titles keep their order
+
+    Only metadata of the songs is read up front, every song is parsed
+    when it is consumed (parse cache and parallel jobs are not used).
+    Standard input can't be read this way.
+    '''
+    from .songbook import Songbook
+    existing = []
+    for f in fileNames:
+        if os.path.isfile(f):
+            existing.append(f)
+        else:
+            sys.stderr.write('File "%s" not found\n' % f)
+    sys.stderr.write('Sorting songs according to title\n')
+    # only the song being rendered is kept
+    with Songbook(existing, cacheSize = 0) as songbook:
+        titles = songbook.titles()
+        for i in sorted(range(len(titles)), key = lambda i: titles[i]):
+            f = songbook.info(i).path
+            try:
+                yield (f, songbook.document(i), None)
+            except parser.NotFinishedError as e:
+                yield (f, None, e)
+
+def streamSongs(fileNames, jobs, cache):
+    '''
+    Generator of (file name, document, error) of all songs of fileNames
+
+    Without cache and parallel jobs, songs of a file are parsed one by
+    one as they are consumed, so only a single song is held in memory.
+    Otherwise whole files are parsed by parseFiles().
+    '''
+    if cache is not None or jobs != 1:
+        for f, documents, error in parseFiles(fileNames, jobs, cache):
+            sys.stderr.write('Reading "%s"\n' % f)
+            for document in documents:
+                yield (f, document, None)
+            if error is not None:
+                yield (f, None, error)
+        return
+
+    for f in fileNames:
+        sys.stderr.write('Reading "%s"\n' % f)
+        if f.endswith(compiled.suffix):
+            with compiled.CompiledSongbook(f) as songbook:
+                for document in songbook:
+                    yield (f, document, None)
+            continue
         try:
-            tokens = tokenizer.tokenize(chordfile)
-            document = parser.parse(tokens)
-            documents.append(document)
-        except parser.NotFinishedError as e:
-            print(f, e)
+            with openSource(f) as chordfile:
+                for document, error in parser.parse_songs(tokenizer.tokenize(chordfile)):
+                    yield (f, document, error)
+        except OSError as e:
+            yield (f, None, e)
+
+def renderDocuments(documents, args, styleSheet, outputName):
+    'Orders and renders list of documents into the output of arguments'
 
     # order before rendering
     if args.o == 'title':
@@ -70,17 +584,17 @@ def main():
          
     # render all documents
     print('Rendering to', args.f)
-    if args.f == 'text' :
-        for line in render.renderToAscii(documents):
-            print (line)
-    elif args.f == 'html' :
-        for line in render.renderToHtmlTables(documents):
-            print (line)
-    elif args.f == 'pdf':
-        fileNameOutput = outputName + '.pdf'
-        render = render2pdf.Render2Pdf(fileNameOutput, styleSheet)
-        render.render(documents)
-    elif args.f == 'html_css' :
-        for line in render.renderToHtmlCss(documents):
-            print (line)
-
+    with profiling.stage('render') as record:
+        record.count = len(documents)
+        if args.f == 'pdf':
+            from . import render2pdf
+            fileNameOutput = outputName + '.pdf'
+            if args.jobs != 1 and len(documents) > 1:
+                render2pdf.renderParallel(fileNameOutput, styleSheet, documents, args.jobs)
+            else:
+                pdfRender = render2pdf.Render2Pdf(fileNameOutput, styleSheet)
+                pdfRender.render(documents)
+        else:
+            # text output goes to standard output unless name is given
+            fileNameOutput = outputName + render.extensions[args.f] if args.n else None
+            render.renderToFile(documents, args.f, fileNameOutput, show_diagrams = styleSheet.chordDiagrams)
@@ -0,0 +1,125 @@
+import sys
+
+####                        ####
+#### compact document model ####
+####                        ####
+
+# Memory efficient alternative to the ElementTree documents built by
+# parser.parse(). All classes provide the read-only subset of the
+# ElementTree API used by the renderers (getroot, find, findall, tag,
+# text, attrib and iteration over children), so documents of both models
+# can be passed to render.renderToAscii(), render.renderToHtml*() and
+# render2pdf.Render2Pdf.render().
+
+class Node(object):
+    'Element without children (title, comment, tab, cell of a row, ...)'
+    __slots__ = ('tag', 'text', '_attrib')
+
+    def __init__(self, tag, text, attrib = None):
+        self.tag = tag
+        self.text = text
+        # most nodes have no attributes, don't waste a dict for them
+        self._attrib = attrib or None
+
+    @property
+    def attrib(self):
+        if self._attrib is None:
+            self._attrib = {}
+        return self._attrib
+
+    def __iter__(self):
+        return iter(())
+
+class Row(object):
+    '''
+    Row of chord/lyric pairs stored as parallel tuples
+
+    Iteration delivers transient 'cho' nodes, as found in ElementTree rows.
+    '''
+    __slots__ = ('chords', 'lyrics')
+    tag = 'row'
+    text = None
+
+    def __init__(self, chords, lyrics):
+        self.chords = chords
+        self.lyrics = lyrics
+
+    def __len__(self):
+        return len(self.chords)
+
+    def __iter__(self):
+        for chord, lyric in zip(self.chords, self.lyrics):
+            yield Node('cho', lyric, {'c': chord})
+
+class Block(object):
+    'Verse or chorus, list of rows and comments'
+    __slots__ = ('tag', 'lines')
+    text = None
+
+    def __init__(self, tag, lines):
+        self.tag = tag
+        self.lines = lines
+
+    def __len__(self):
+        return len(self.lines)
+
+    def __iter__(self):
+        return iter(self.lines)
+
+class Song(object):
+    '''
+    Song document - metadata and list of blocks
+
+    The song plays the role of the tree, of the root and of the <head>
+    element, find('body') returns the list of blocks.
+    '''
+    __slots__ = ('title', 'subtitle', 'defines', 'blocks')
+
+    def __init__(self, title = None, subtitle = None, defines = (), blocks = None):
+        self.title = title
+        self.subtitle = subtitle
+        self.defines = tuple(defines)
+        self.blocks = blocks if blocks is not None else []
+
+    def getroot(self):
+        return self
+
+    def find(self, path):
+        if path == 'head':
+            return self
+        elif path == 'body':
+            return self.blocks
+        elif path in ('title', 'subtitle'):
+            text = getattr(self, path)
+            return Node(path, text) if text is not None else None
+        elif path == 'define':
+            return Node('define', self.defines[0]) if self.defines else None
+        return None
+
+    def findall(self, path):
+        if path == 'define':
+            return [Node('define', d) for d in self.defines]
+        found = self.find(path)
+        return [found] if found is not None else []
+
+def fromElementTree(document):
+    'Converts document built by parser.parse() into compact Song'
+    root = document.getroot()
+    head = root.find('head')
+    song = Song()
+    for e in head:
+        if e.tag == 'define':
+            song.defines += (e.text,)
+        elif e.tag in ('title', 'subtitle'):
+            setattr(song, e.tag, e.text)
+    song.blocks = [convertElement(e) for e in root.find('body')]
+    return song
+
+def convertElement(e):
+    'Converts element of the document body (recursively)'
+    if e.tag == 'row':
+        return Row(tuple([sys.intern(cho.attrib.get('c', '')) for cho in e]),
+                   tuple([cho.text for cho in e]))
+    elif e.tag in ('verse', 'chorus'):
+        return Block(e.tag, [convertElement(line) for line in e])
+    return Node(e.tag, e.text, dict(e.attrib))
@@ -0,0 +1,71 @@
+import itertools
+import sys
+
+class BufferedSink:
+    '''
+    Writes lines of renderer output to binary stream in large chunks
+
+    Lines are collected until chunkLines of them are buffered, then they
+    are joined and encoded at once and written by single write() call.
+    '''
+    def __init__(self, stream, encoding = 'utf-8', chunkLines = 8192, newline = '\n'):
+        self.stream = stream
+        self.encoding = encoding
+        self.chunkLines = chunkLines
+        self.newline = newline
+        self.parts = []
+
+    def write(self, line):
+        'Writes one line (without line terminator)'
+        self.parts.append(line)
+        if len(self.parts) >= self.chunkLines:
+            self.writeChunk(self.parts)
+            self.parts = []
+
+    def writeLines(self, lines):
+        'Writes all lines delivered by iterable (e.g. renderer generator)'
+        lines = iter(lines)
+        # top up the pending chunk first, then continue by whole chunks
+        self.parts.extend(itertools.islice(lines, self.chunkLines - len(self.parts)))
+        while len(self.parts) >= self.chunkLines:
+            self.writeChunk(self.parts)
+            self.parts = list(itertools.islice(lines, self.chunkLines))
+
+    def writeChunk(self, parts):
+        parts.append('')
+        self.stream.write(self.newline.join(parts).encode(self.encoding))
+
+    def flush(self):
+        if self.parts:
+            self.writeChunk(self.parts)
+            self.parts = []
+        self.stream.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.flush()
+        return False
+
+def openSink(path = None, **kwargs):
+    '''
+    Returns BufferedSink writing to file path, or to standard output if path
+    is None or '-'. The caller is responsible for closing the file
+    (sink.stream) - see writeTo() for the managed variant.
+    '''
+    if path is None or path == '-':
+        # anything already printed must precede the rendered output
+        sys.stdout.flush()
+        return BufferedSink(sys.stdout.buffer, **kwargs)
+    return BufferedSink(open(path, 'wb'), **kwargs)
+
+def writeTo(path, lines, **kwargs):
+    'Writes all lines to file path (or standard output), see openSink()'
+    sink = openSink(path, **kwargs)
+    try:
+        sink.writeLines(lines)
+        sink.flush()
+    finally:
+        if sink.stream is not getattr(sys.stdout, 'buffer', None):
+            sink.stream.close()
@@ -2,6 +2,9 @@ from xml.etree.ElementTree import ElementTree, Element, SubElement, Comment
 #from xml.etree.ElementTree import _ElementInterface as ElementBase
 from xml.etree.ElementTree import tostring as dumpElement
 
+from .model import fromElementTree
+from .tokenizer import split_songs
+
 ####        ####
 #### parser ####
 ####        ####
@@ -51,8 +54,41 @@ def isComment(o):
     'Test wether "o" is an ElementTree.Comment'
     return isElement(o) and o.tag is Comment
 
-def parse(tokens):
-    'Returns an ElementTree-based DOM using output from tokenizer()'
+def parse(tokens, model = 'etree'):
+    '''
+    Returns a DOM using output from tokenizer()
+
+    model parameter selects the document representation - 'etree' for
+    ElementTree, 'compact' for memory efficient model.Song
+    '''
+    if model not in ('etree', 'compact'):
+        raise ValueError('Unknown document model %r' % model)
+    document = StateMachine().parse(tokens)
+    if model == 'compact':
+        document = fromElementTree(document)
+    return document
+
+def parse_songs(tokens, model = 'etree'):
+    '''
+    Returns an iterator of (DOM, error) of songs separated by {new_song}
+    in output from tokenizer(), see tokenizer.split_songs()
+
+    Songs are parsed one by one as the iterator advances. A song failing
+    on unimplemented feature has DOM None and the NotFinishedError, the
+    following songs are parsed nevertheless.
+    '''
+    for song in split_songs(tokens):
+        try:
+            yield (parse(song, model), None)
+        except NotFinishedError as e:
+            yield (None, e)
+
+def parse_stack(tokens):
+    '''
+    Returns an ElementTree-based DOM using output from tokenizer()
+
+    Original stack based implementation, kept as reference for parse().
+    '''
     
     document = ElementTree(Element('chordpro'))
     root = document.getroot()
@@ -94,7 +130,12 @@ def parse(tokens):
             raise BadFormattingError('Unrecognized token %r (%r) at line %d' % (ttype, tvalue, lineno))
     
     # time to stuff metadata into the document's <head> tag
-    meta = stack[0]
+    fill_head(head, stack[0])
+
+    return document
+
+def fill_head(head, meta):
+    'Stores collected metadata as children of <head>'
     if 'title' in meta:
         e = Element('title')
         e.text = meta['title']
@@ -109,8 +150,6 @@ def parse(tokens):
             e.text = d
             head.append(e)
 
-    return document
-
 def eol_handler(tokens, stack, lineno, ttype, tvalue):
     '''
     Parser handler of end-of-line and end-of-file events
@@ -240,6 +279,189 @@ def directive_handler(tokens, stack, lineno, ttype, tvalue):
         # TODO: - g, grid
         raise NotFinishedError('Unimplemented directive %s at line %d' % (tag, lineno))
 
+####                      ####
+#### state machine parser ####
+####                      ####
+
+class StateMachine(object):
+    '''
+    Parser producing the same document as parse_stack() in amortized
+    O(1) time per token.
+
+    Elements waiting for their row, verse or chorus are kept in the
+    "pending" list (the stack of parse_stack() without meta and body).
+    Instead of scanning the stack for LineBegin, VerseBegin and
+    ChorusBegin markers, offsets of the open markers are tracked in
+    self.marks, so closing a line, verse or chorus only touches the
+    elements which are moved into it.
+    '''
+
+    def __init__(self):
+        self.meta = {}
+        self.pending = []
+        self.marks = {LineBegin: [], VerseBegin: [], ChorusBegin: []}
+
+    def parse(self, tokens):
+        document = ElementTree(Element('chordpro'))
+        root = document.getroot()
+        head = SubElement(root, 'head')
+        self.body = SubElement(root, 'body')
+
+        pending = self.pending
+        lines = self.marks[LineBegin]
+        for (lineno, ttype, tvalue) in tokens:
+            ttype = ttype.lower()
+            if ttype == 'chord':
+                # always maintain a chord:lyric pairing
+                e = Element('cho', {'c':tvalue.strip()})
+                e.text = ''
+                pending.append(e)
+            elif ttype == 'lyric':
+                # if a lyric appears before a chord, assume a blank chord
+                tvalue = tvalue.lstrip()
+                if tvalue:
+                    e = pending[-1] if pending else None
+                    if not isinstance(e, Element) or e.tag != 'cho':
+                        e = Element('cho', {'c':''})
+                        e.text = tvalue
+                        pending.append(e)
+                    else:
+                        e.text = e.text + tvalue
+            elif ttype == 'sol':
+                lines.append(len(pending))
+                pending.append(LineBegin)
+            elif ttype in ('eol', 'eof'):
+                self.end_of_line()
+            elif ttype == 'directive':
+                self.directive(lineno, tvalue)
+            elif ttype == 'comment':
+                pending.append(Comment(tvalue))
+            elif ttype == 'sof':
+                pass
+            else:
+                raise BadFormattingError('Unrecognized token %r (%r) at line %d' % (ttype, tvalue, lineno))
+
+        fill_head(head, self.meta)
+        return document
+
+    def push(self, o):
+        'Appends element or marker to the pending list'
+        if o in self.marks:
+            self.marks[o].append(len(self.pending))
+        self.pending.append(o)
+
+    def pop_to(self, marker):
+        '''
+        Removes the last "marker" and returns everything pending after it.
+
+        Returns empty list if there is no such marker.
+        '''
+        offsets = self.marks[marker]
+        if not offsets:
+            return []
+        offset = offsets.pop()
+        pending = self.pending
+        l = pending[offset + 1:]
+        del pending[offset:]
+        # markers above the offset have been removed as well
+        for m in self.marks.values():
+            while m and m[-1] > offset:
+                m.pop()
+        return l
+
+    def end_of_line(self):
+        'Handler of end-of-line and end-of-file events, see eol_handler()'
+        line = self.pop_to(LineBegin)
+
+        if len(line):
+            if not all(map(isComment, line)):
+                r = Element('row')
+                r.extend(line)
+                self.pending.append(r)
+            else:
+                # current line contains nothing but Comment objects
+                self.pending.extend(line)
+
+        # blank line - separates verse blocks unless we are in a chorus
+        elif not self.marks[ChorusBegin]:
+            verse = self.pop_to(VerseBegin)
+            if verse:
+                v = Element('verse')
+                v.extend(verse)
+                self.body.append(v)
+            else:
+                # we're not in a verse, so move all trailing elements
+                #   to the document
+                pending = self.pending
+                i = len(pending)
+                while i > 0 and isElement(pending[i - 1]):
+                    i -= 1
+                self.body.extend(pending[i:])
+                del pending[i:]
+            self.push(VerseBegin)
+
+    def directive(self, lineno, tvalue):
+        'Handler for all directives, see directive_handler()'
+
+        tag, arg = tvalue.split(':', 1) if ':' in tvalue else (tvalue, '')
+        tag = tag.lower()
 
+        if tag in ('t', 'title', 'st', 'subtitle', 'define', 'c', 'comment',
+                   'ci', 'comment_italic', 'cb', 'comment_box', 'tab'):
+            if not arg: raise BadDirectiveError('{%s} directive needs an argument at line %s' % (tag, lineno))
 
+        if tag in ('t', 'title'):
+            self.meta['title'] = arg
 
+        elif tag in ('st', 'subtitle'):
+            self.meta['subtitle'] = arg
+
+        elif tag == 'define':
+            self.meta.setdefault('define', []).append(arg)
+
+        elif tag in ('c', 'comment'):
+            c = Element('comment')
+            c.text = arg
+            self.body.append(c)
+
+        elif tag in ('ci', 'comment_italic'):
+            c = Element('comment', {'italic':'true'})
+            c.text = arg
+            self.pending.append(c)
+
+        elif tag in ('cb', 'comment_box'):
+            c = Element('comment', {'box':'true'})
+            c.text = arg
+            self.pending.append(c)
+
+        elif tag in ('soc', 'start_of_chorus'):
+            # close the current verse, if any, then start a chorus
+            if arg: raise BadDirectiveError('{%s} directive needs no argument %r at line %d' % (tag, arg, lineno))
+            self.pop_to(LineBegin)
+            verse = self.pop_to(VerseBegin)
+            if verse:
+                v = Element('verse')
+                v.extend(verse)
+                self.pending.append(v)
+            self.push(ChorusBegin)
+
+        elif tag in ('eoc', 'end_of_chorus'):
+            # close the current chorus, but don't start a verse
+            if arg: raise BadDirectiveError('{%s} directive needs no argument %r at line %d' % (tag, arg, lineno))
+            self.pop_to(LineBegin)
+            c = Element('chorus')
+            self.body.append(c)
+            c.extend(self.pop_to(ChorusBegin))
+
+        elif tag == 'tab':
+            t = Element('tab')
+            t.text = arg
+            self.body.append(t)
+
+        elif tag in ('np', 'new_page', 'npp', 'new_physical_page',
+                                                      'ns', 'new_song', 'rowname'):
+            # rendering hints, not implemented yet
+            pass
+
+        else:
+            raise NotFinishedError('Unimplemented directive %s at line %d' % (tag, lineno))
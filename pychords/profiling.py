@@ -0,0 +1,179 @@
+import json
+import time
+import tracemalloc
+
+####                   ####
+#### stage measurement ####
+####                   ####
+
+# Callables notified with a StageRecord whenever a measured stage finishes.
+# Library users wrap their direct tokenizer/parser/render calls in stage()
+# (or use tokenize(), parse() and render() below) and register a hook,
+# e.g. a Profiler, to collect the same counters as "pychords --profile".
+hooks = []
+
+def addHook(hook):
+    'Registers hook called with StageRecord of every finished stage'
+    hooks.append(hook)
+
+def removeHook(hook):
+    hooks.remove(hook)
+
+class StageRecord(object):
+    '''
+    Wall time, item count and peak memory of one stage of one file,
+    fileName is None for stages of the whole run (e.g. rendering of the
+    songbook)
+    '''
+    def __init__(self, stage, fileName):
+        self.stage = stage
+        self.fileName = fileName
+        self.seconds = 0.0
+        self.count = 0
+        # peak of memory allocated during the stage, None if tracemalloc
+        #   is not tracing
+        self.peakMemory = None
+
+    def asDict(self):
+        return {
+            'stage': self.stage,
+            'file': self.fileName,
+            'seconds': self.seconds,
+            'count': self.count,
+            'peak_memory': self.peakMemory,
+        }
+
+class stage(object):
+    '''
+    Context manager measuring one processing stage
+
+        with profiling.stage('parse', fileName) as record:
+            document = parser.parse(tokens)
+            record.count = len(tokens)
+    '''
+    def __init__(self, name, fileName = None):
+        self.record = StageRecord(name, fileName)
+
+    def __enter__(self):
+        self.tracing = tracemalloc.is_tracing()
+        if self.tracing:
+            tracemalloc.reset_peak()
+            self.baseMemory = tracemalloc.get_traced_memory()[0]
+        self.start = time.perf_counter()
+        return self.record
+
+    def __exit__(self, excType, excValue, traceback):
+        self.record.seconds = time.perf_counter() - self.start
+        if self.tracing:
+            self.record.peakMemory = tracemalloc.get_traced_memory()[1] - self.baseMemory
+        for hook in list(hooks):
+            hook(self.record)
+        return False
+
+def tokenize(infile, fileName = None):
+    'Measured tokenizer.tokenize(), returns list of tokens'
+    from . import tokenizer
+    with stage('tokenize', fileName) as record:
+        tokens = list(tokenizer.tokenize(infile))
+        record.count = len(tokens)
+    return tokens
+
+def parse(tokens, fileName = None, **kwargs):
+    'Measured parser.parse() of list of tokens'
+    from . import parser
+    with stage('parse', fileName) as record:
+        record.count = len(tokens)
+        return parser.parse(iter(tokens), **kwargs)
+
+def render(lines, fileName = None):
+    'Measured consumption of renderer generator, returns list of lines'
+    with stage('render', fileName) as record:
+        lines = list(lines)
+        record.count = len(lines)
+    return lines
+
+####          ####
+#### profiler ####
+####          ####
+
+class Profiler(object):
+    'Hook collecting records of all stages, see addHook()'
+
+    def __init__(self, traceMemory = True):
+        self.records = []
+        self.traceMemory = traceMemory
+
+    def __call__(self, record):
+        self.records.append(record)
+
+    def start(self):
+        if self.traceMemory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        addHook(self)
+
+    def stop(self):
+        removeHook(self)
+        if self.traceMemory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def stages(self):
+        'Returns names of recorded stages in order of appearance'
+        names = []
+        for r in self.records:
+            if r.stage not in names:
+                names.append(r.stage)
+        return names
+
+    def files(self):
+        '''
+        Returns {file name: {stage: StageRecord}}, repeated stages are
+        summed, stages of the whole run are left out
+        '''
+        files = {}
+        for r in self.records:
+            if r.fileName is None:
+                continue
+            perFile = files.setdefault(r.fileName, {})
+            if r.stage in perFile:
+                total = perFile[r.stage]
+                summed = StageRecord(r.stage, r.fileName)
+                summed.seconds = total.seconds + r.seconds
+                summed.count = total.count + r.count
+                if r.peakMemory is not None:
+                    summed.peakMemory = max(total.peakMemory or 0, r.peakMemory)
+                perFile[r.stage] = summed
+            else:
+                perFile[r.stage] = r
+        return files
+
+    def summary(self, limit = 10):
+        'Returns lines of table with totals and the slowest files'
+        stages = self.stages()
+        files = self.files()
+        lines = []
+
+        lines.append('%-12s %10s %10s %12s' % ('stage', 'seconds', 'count', 'peak KiB'))
+        for name in stages:
+            records = [r for r in self.records if r.stage == name]
+            peaks = [r.peakMemory for r in records if r.peakMemory is not None]
+            lines.append('%-12s %10.4f %10d %12s' % (name,
+                sum(r.seconds for r in records), sum(r.count for r in records),
+                '%.1f' % (max(peaks) / 1024.0) if peaks else '-'))
+
+        lines.append('')
+        lines.append('slowest files:')
+        # only stages measured per file have columns
+        stages = [s for s in stages if any(s in perFile for perFile in files.values())]
+        lines.append(' '.join(['%10s' % s[:10] for s in stages + ['total']]) + '  file')
+        totals = sorted(files.items(),
+                        key = lambda item: sum(r.seconds for r in item[1].values()),
+                        reverse = True)
+        for fileName, perFile in totals[:limit]:
+            columns = ['%10.4f' % perFile[s].seconds if s in perFile else '%10s' % '-' for s in stages]
+            columns.append('%10.4f' % sum(r.seconds for r in perFile.values()))
+            lines.append(' '.join(columns) + '  ' + str(fileName))
+        return lines
+
+    def writeJson(self, fileName):
+        with open(fileName, 'w') as f:
+            json.dump({'records': [r.asDict() for r in self.records]}, f, indent = 1)
@@ -1,13 +1,111 @@
 #import urllib
-import xml.sax.saxutils
+import functools
+
+from . import output, wrap
+from .chords import songDiagrams
+
+# same as xml.sax.saxutils.escape(s, {' ': '&nbsp;'}), but xml.sax.saxutils
+#   imports urllib, which is slow for a short invocation
+htmlEscapes = str.maketrans({'&': '&amp;', '<': '&lt;', '>': '&gt;', ' ': '&nbsp;'})
 
 def safeText(s, html=False):
     'Sanitizes text from unknown 3rd parties during rendering'
     # TODO: no, really, sanitize text please
     if html:
-        return xml.sax.saxutils.escape(s, {' ': '&nbsp;'})
+        return s.translate(htmlEscapes)
     return s
 
+
+####                ####
+#### Chord diagrams ####
+####                ####
+
+
+def asciiDiagram(name, define, smallgrid = False):
+    '''
+    Returns list of lines of ASCII chord grid, all of the same width
+
+    define is chords.Define or None for chord without fingering (empty
+    grid). Strings are one column apart if smallgrid is True.
+    '''
+    frets = define.frets if define else (-2,) * 6
+    sep = '' if smallgrid else ' '
+    rows = max([4] + list(frets))
+    lines = [name]
+    lines.append(sep.join({-1: 'x', 0: 'o'}.get(f, ' ') for f in frets))
+    if define is None or define.baseFret == 1:
+        lines.append('=' * len(lines[-1]))
+    else:
+        lines.append('-' * len(lines[-1]))
+    for fret in range(1, rows + 1):
+        line = sep.join('*' if f == fret else '|' for f in frets)
+        if fret == 1 and define is not None and define.baseFret > 1:
+            line += ' %d' % define.baseFret
+        lines.append(line)
+    width = max(len(l) for l in lines)
+    return [l.ljust(width) for l in lines]
+
+def renderDiagramsAscii(diagrams, width, chord_gap, smallgrid = False):
+    '''
+    Renders (name, define) pairs of songDiagrams() as rows of ASCII
+    chord grids separated by chord_gap, rows are at most width wide
+    '''
+    row = []
+    rowWidth = 0
+    grids = [asciiDiagram(name, define, smallgrid) for name, define in diagrams]
+    for grid in grids + [None]:
+        if row and (grid is None or rowWidth + len(chord_gap) + len(grid[0]) > width):
+            height = max(len(g) for g in row)
+            for i in range(height):
+                yield chord_gap.join(g[i] if i < len(g) else ' ' * len(g[0]) for g in row).rstrip()
+            yield ''
+            row = []
+        if grid is not None:
+            rowWidth = rowWidth + len(chord_gap) + len(grid[0]) if row else len(grid[0])
+            row.append(grid)
+
+def svgDiagram(name, define):
+    '''
+    Returns inline SVG chord grid, define is chords.Define or None for
+    chord without fingering (empty grid)
+    '''
+    frets = define.frets if define else (-2,) * 6
+    rows = max([4] + list(frets))
+    step, top, left = 10, 28, 12
+    right = left + step * (len(frets) - 1)
+    bottom = top + step * rows
+    svg = ['<svg xmlns="http://www.w3.org/2000/svg" width="%d" height="%d" class="chord">' % (
+        right + 20, bottom + 6)]
+    svg.append('<text x="%d" y="11" text-anchor="middle" font-weight="bold">%s</text>' % (
+        (left + right) // 2, safeText(name, html = True)))
+    svg.append('<path stroke="black" fill="none" d="%s"/>' % ' '.join(
+        ['M%d %dV%d' % (left + i * step, top, bottom) for i in range(len(frets))] +
+        ['M%d %dH%d' % (left, top + i * step, right) for i in range(rows + 1)]))
+    if define is None or define.baseFret == 1:
+        svg.append('<path stroke="black" stroke-width="3" d="M%d %dH%d"/>' % (left, top, right))
+    else:
+        svg.append('<text x="%d" y="%d" font-size="9">%d</text>' % (right + 4, top + 8, define.baseFret))
+    for i, f in enumerate(frets):
+        x = left + i * step
+        if f == -1:
+            svg.append('<text x="%d" y="%d" text-anchor="middle" font-size="9">x</text>' % (x, top - 3))
+        elif f == 0:
+            svg.append('<circle cx="%d" cy="%d" r="3" stroke="black" fill="none"/>' % (x, top - 6))
+        elif f > 0:
+            svg.append('<circle cx="%d" cy="%d" r="4"/>' % (x, top + f * step - step // 2))
+    svg.append('</svg>')
+    return ''.join(svg)
+
+# the same chord is repeated in many songs of a songbook
+svgDiagramCached = functools.lru_cache(maxsize = 1024)(svgDiagram)
+
+def renderDiagramsHtml(diagrams):
+    'Renders (name, define) pairs of songDiagrams() as <div> of inline SVGs'
+    yield '<div class="defines">'
+    for name, define in diagrams:
+        yield svgDiagramCached(name, define)
+    yield '</div>'
+
     
 ####                 ####
 #### Render to ASCII ####
@@ -21,7 +119,9 @@ def renderToAscii(document,
                   chord_catalog = None,
                   chord_gap = '   ', 
                   chorus_indent = '    ',
-                  smallgrid=False):
+                  smallgrid=False,
+                  wrap_method = 'greedy',
+                  show_diagrams = False):
     '''
     Renders a chordpro document into readable ASCII text.
     
@@ -29,7 +129,14 @@ def renderToAscii(document,
     
     chord_gap parameter is the space between chord grids within the same row
     
-    chorus_indent parameter is, well, should be bloody obvious
+    chorus_indent parameter is, well, should be bloody obvious - it is also
+    used for continuation lines of wrapped rows
+
+    wrap_method parameter is 'greedy' or 'optimal', see wrap module
+
+    show_diagrams parameter enables grids of the song chords, fingerings
+    come from {define} directives and chord_catalog (see chords module),
+    chords without fingering are drawn empty if show_undefined_chords
     '''
 
     root = document.getroot()
@@ -52,6 +159,12 @@ def renderToAscii(document,
             subtitle = ' '.join(subtitle)
         yield subtitle.center(width)
         yield ''
+
+    if show_diagrams:
+        for line in renderDiagramsAscii(
+                songDiagrams(document, chord_catalog or None, show_undefined_chords),
+                width, chord_gap, smallgrid):
+            yield line
     
     # render each block (verse, chorus, tab, comment)
     for block in body:
@@ -67,45 +180,21 @@ def renderToAscii(document,
                     # split the row into a two-row table:
                     #   top row is chord names, padded on right with one space
                     #   bottom row is lyrics, use ... if no textual content
-                    # use wrapper list "rows" so we can overflow line-wraps
-                    rows = [
-                        [
-                            [safeText(cho.attrib.get('c', '')) + ' ' for cho in line],
-                            [safeText(cho.text) if cho.text else '... ' for cho in line]
-                        ]
-                    ]
-
-                    # get each column's max width
-                    widths = [map(max, zip( *[[len(item) for item in subrow] for subrow in row])) for row in rows]
-                     
-                    # commence line-wrapping
-                    for r, row in enumerate(rows):
-                        for i, row_widths in enumerate(widths):
-                            if sum(row_widths) > width:
-                                rows.insert(r+1, [[''],['']])
-                                widths.insert(r+1, [len(chorus_indent)])
-                                # move 2 cells minimum to new row
-                                for a in (1, 2):
-                                    rows[r+1][0].insert(1, rows[r][0].pop())
-                                    rows[r+1][1].insert(1, rows[r][1].pop())
-                                    widths[r+1].insert(1, widths[r].pop())
-                                # while the line is too long
-                                #   or the break is mid-lyric-word
-                                while sum(row_widths) > width or \
-                                                  not row[1][-1].endswith(' '):
-                                    rows[r+1][0].insert(1, rows[r][0].pop())
-                                    rows[r+1][1].insert(1, rows[r][1].pop())
-                                    widths[r+1].insert(1, widths[r].pop())
-
-                    # each column gets template string based on width
-                    templates = [['%%-%ds' % i for i in row_widths] for row_widths in widths]
-
-                    for r in range(len(rows)):
-                        # yield the chord names row
-                        yield indent + ''.join([t % i for (t, i) in zip(templates[r], rows[r][0])])
+                    chords = [safeText(cho.attrib.get('c', '')) + ' ' for cho in line]
+                    lyrics = [safeText(cho.text) if cho.text else '... ' for cho in line]
+                    widths = [max(len(c), len(l)) for c, l in zip(chords, lyrics)]
 
+                    # wrap long rows at word boundaries, continuation
+                    #   lines are indented by chorus_indent
+                    for n, (start, end) in enumerate(wrap.wrap(
+                            widths, [l.endswith(' ') for l in lyrics],
+                            width - len(indent), len(chorus_indent), wrap_method)):
+                        prefix = indent + ' ' * len(chorus_indent) if n else indent
+                        columns = range(start, end)
+                        # yield the chord names row
+                        yield prefix + ''.join([chords[i].ljust(widths[i]) for i in columns])
                         # yield the lyrics row
-                        yield indent + ''.join([ t % i for (t, i) in zip(templates[r], rows[r][1])])
+                        yield prefix + ''.join([lyrics[i].ljust(widths[i]) for i in columns])
                 
                 elif line.tag == 'comment':
                     # TODO: implement me - italics, box
@@ -141,7 +230,8 @@ def renderToHtmlTables(document,
                        basename = '',
                        show_chords = True,
                        show_undefined_chords = True,
-                       chord_catalog = None):
+                       chord_catalog = None,
+                       show_diagrams = False):
     
     root = document.getroot()
     head = root.find('head')
@@ -158,7 +248,7 @@ def renderToHtmlTables(document,
     yield '''
         <style type="text/css">
             h1, h2 { text-align: center }
-            .defines img { vertical-align: top; padding: 0px; margin: 0px }
+            .defines svg { vertical-align: top; padding: 0px; margin: 0px }
             div.chorus table { margin-left: 2em }
             div.chorus, div.verse, div.defines { padding-bottom: 1em }
             td.chord { color: #006; font-weight: bold; }
@@ -174,6 +264,11 @@ def renderToHtmlTables(document,
         yield '<h1>%s</h1>' % safeText(head.find('title').text.strip(), html=True)
     if head.find('subtitle') != None:
         yield '<h2>%s</h2>' % safeText(head.find('subtitle').text.strip(), html=True)
+
+    if show_diagrams:
+        for line in renderDiagramsHtml(
+                songDiagrams(document, chord_catalog or None, show_undefined_chords)):
+            yield line
     
     # render each block (verse, chorus, tab, comment)
     for block in body:
@@ -247,7 +342,8 @@ def renderToHtmlCss(document,
                     basename = '',
                     show_chords = True,
                     show_undefined_chords = True,
-                    chord_catalog = None):
+                    chord_catalog = None,
+                    show_diagrams = False):
     
     root = document.getroot()
     head = root.find('head')
@@ -267,7 +363,7 @@ def renderToHtmlCss(document,
     yield '''
         <style type="text/css">
             h1, h2 { text-align: center }
-            .defines img { vertical-align: top; padding: 0px; margin: 0px }
+            .defines svg { vertical-align: top; padding: 0px; margin: 0px }
             .chorus { margin-left: 2em }
             .chorus, .verse { clear: left; margin-bottom: 1em }
             .row { clear: left }
@@ -285,6 +381,11 @@ def renderToHtmlCss(document,
         yield '<h1>%s</h1>' % safeText(head.find('title').text.strip(), html=True)
     if head.find('subtitle') != None:
         yield '<h2>%s</h2>' % safeText(head.find('subtitle').text.strip(), html=True)
+
+    if show_diagrams:
+        for line in renderDiagramsHtml(
+                songDiagrams(document, chord_catalog or None, show_undefined_chords)):
+            yield line
     
     # render each block (verse, chorus, tab, comment)
     for block in body:
@@ -337,3 +438,41 @@ def renderToHtmlCss(document,
     yield '</html>'
 
 
+####                              ####
+#### Render documents into a file ####
+####                              ####
+
+
+def renderLines(documents, fmt, **kwargs):
+    '''
+    Renders all documents using renderer of format fmt ('text', 'html' or
+    'html_css'), keyword arguments are passed to the renderer
+    '''
+    try:
+        renderer = renderers[fmt]
+    except KeyError:
+        raise ValueError('Unsupported format %s' % fmt)
+    for document in documents:
+        for line in renderer(document, **kwargs):
+            yield line
+
+
+def renderToFile(documents, fmt, path = None, **kwargs):
+    '''
+    Renders all documents into file path through buffered output sink,
+    path None or '-' means standard output
+    '''
+    output.writeTo(path, renderLines(documents, fmt, **kwargs))
+
+
+renderers = {
+    'text': renderToAscii,
+    'html': renderToHtmlTables,
+    'html_css': renderToHtmlCss,
+}
+
+extensions = {
+    'text': '.txt',
+    'html': '.html',
+    'html_css': '.html',
+}
@@ -1,6 +1,10 @@
-import json
+import functools
 import os
+import shutil
+import tempfile
 import xml.sax.saxutils
+from concurrent.futures import ProcessPoolExecutor
+from importlib import resources
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import A4
 from reportlab.pdfbase.pdfmetrics import stringWidth
@@ -8,7 +12,10 @@ from reportlab.pdfbase import pdfmetrics
 import reportlab.rl_config
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
-from pkg_resources import resource_filename
+
+from .chords import songDiagrams
+# StyleSheet used to live here
+from .style import StyleSheet
 
 
 def safeText(s, html=False):
@@ -18,42 +25,93 @@ def safeText(s, html=False):
             return xml.sax.saxutils.escape(s, {' ': '&nbsp;'})
         return s
 
-class StyleSheet:
-    '''Visual definition of song typesetting'''
-    def __init__(self):
-        # Default values
-        self.fontLyrics = ('Helvetica', 10)
-        self.fontChords = ('Helvetica', 8)
-        self.fontTitle = ('Helvetica', 20)
-        self.fontSubTitle = ('Helvetica', 12)
-
-    def loadFromFile(self, filePath): 
-        '''Load stylesheet from file system'''
-        # first - try to open file as provided (cwd without full path)
-        if not os.path.isfile(filePath):
-            # second - try to open file from home directory 
-            filePath = os.path.expanduser("~/" + os.path.basename(filePath))
-
-        if not os.path.isfile(filePath):
-            raise IOError('Stylesheet file not found: %s' % filePath)
-
-        with open(filePath) as dataFile:    
-            data = json.load(dataFile)
-            dataFile.close()
-            if data['pdf']:
-                dataPdf = data['pdf']
-                if dataPdf['title'] and len(dataPdf['title']) >= 2:
-                    self.fontTitle = (dataPdf['title'][0], dataPdf['title'][1])
-                if dataPdf['subtitle'] and len(dataPdf['subtitle']) >= 2:
-                    self.fontSubTitle = (dataPdf['subtitle'][0], dataPdf['subtitle'][1])
-                if dataPdf['lyrics'] and len(dataPdf['lyrics']) >= 2:
-                    self.fontLyrics = (dataPdf['lyrics'][0], dataPdf['lyrics'][1])
-                if dataPdf['chords'] and len(dataPdf['chords']) >= 2:
-                    self.fontChords = (dataPdf['chords'][0], dataPdf['chords'][1])
+fontsRegistered = False
+
+def registerFonts():
+    'Registers bundled fonts with reportlab, once per process'
+    global fontsRegistered
+    if fontsRegistered:
+        return
+
+    fonts = resources.files(__package__) / 'fonts'
+    with (fonts / 'hv.ttf').open('rb') as hvFont:
+        pdfmetrics.registerFont(TTFont('Helvetica', hvFont))
+
+    with (fonts / 'hv-oblique.ttf').open('rb') as hvObliqueFont:
+        pdfmetrics.registerFont(TTFont('HelveticaOblique', hvObliqueFont))
+    fontsRegistered = True
+
+class GlyphWidths(dict):
+    '''
+    Widths of single characters of one font (in 1/1000 of font size),
+    filled lazily from reportlab metrics
+    '''
+    def __init__(self, fontName):
+        self.fontName = fontName
+
+    def __missing__(self, char):
+        width = self[char] = stringWidth(char, self.fontName, 1000)
+        return width
+
+class FontMetrics:
+    '''
+    Cached measurement of strings
+
+    Ascent and height are computed once per (font, size), string widths
+    are summed from per-font glyph width tables and extents of repeated
+    strings (chord names, common words) are kept in a bounded LRU cache.
+    '''
+    def __init__(self, cacheSize = 4096):
+        self.heights = {}
+        self.glyphs = {}
+        self.stringExtent = functools.lru_cache(maxsize = cacheSize)(self.measure)
+
+    def height(self, fontName, fontSize):
+        key = (fontName, fontSize)
+        height = self.heights.get(key)
+        if height is None:
+            face = pdfmetrics.getFont(fontName).face
+            ascent = (face.ascent * fontSize) / 1000.0
+            descent = (face.descent * fontSize) / 1000.0
+            height = self.heights[key] = ascent - descent # <-- descent it's negative
+        return height
+
+    def width(self, s, fontName, fontSize):
+        glyphs = self.glyphs.get(fontName)
+        if glyphs is None:
+            glyphs = self.glyphs[fontName] = GlyphWidths(fontName)
+        if isinstance(s, bytes):
+            s = s.decode('utf-8')
+        return 0.001 * fontSize * sum([glyphs[c] for c in s])
+
+    def measure(self, s, fontName, fontSize):
+        'Returns (width, height) of string s, use cached stringExtent()'
+        return (self.width(s, fontName, fontSize), self.height(fontName, fontSize))
+
+# measurements are shared by all renderers of the process
+fontMetrics = FontMetrics()
 
 class Render2Pdf:
-    def __init__(self, fileName, styleSheet):
+    # size of chord diagrams - distance of strings, frets and grid cells
+    diagramString = 6
+    diagramFret = 7
+    diagramCell = 50
+
+    def __init__(self, fileName, styleSheet, batchText = True, verbose = True, chordCatalog = None):
+        '''
+        If batchText is True, rows of verses and choruses are emitted as
+        one text object per block with a single font switch for chords
+        and lyrics instead of separate drawString() call per cell.
+
+        Chord diagrams (if enabled by the style sheet) use fingerings of
+        {define} directives and chordCatalog (built-in catalog if None),
+        see chords.songDiagrams().
+        '''
         self.fileName = fileName
+        self.batchText = batchText
+        self.verbose = verbose
+        # number of the first page of each rendered document
+        self.songPages = []
         self.cFontName = 'Helvetica' 
         self.cFontSize = 10 
         self.canv = canvas.Canvas(self.fileName, bottomup = 0, pagesize=A4)
@@ -62,22 +120,17 @@ class Render2Pdf:
         self.marginTop = 40 
         self.offsetPara = 10
         self.style = styleSheet
+        self.metrics = fontMetrics
+        self.chordCatalog = chordCatalog
+        # form XObject name of each distinct diagram grid
+        self.diagramForms = {}
 
-        hvFont = resource_filename(__name__, 'fonts/hv.ttf')
-        pdfmetrics.registerFont(TTFont('Helvetica', hvFont))
-
-        hvObliqueFont = resource_filename(__name__, 'fonts/hv-oblique.ttf')
-        pdfmetrics.registerFont(TTFont('HelveticaOblique', hvObliqueFont))
+        registerFonts()
 
     def getStringExtent(self, str, fontName = None, fontSize = None):
         fontName = fontName if fontName is not None else self.cFontName
         fontSize = fontSize if fontSize is not None else self.cFontSize
-        face = pdfmetrics.getFont(fontName).face
-        ascent = (face.ascent * fontSize) / 1000.0
-        descent = (face.descent * fontSize) / 1000.0
-        height = ascent - descent # <-- descent it's negative
-        width = stringWidth(str, fontName, fontSize)
-        return (width, height)
+        return self.metrics.stringExtent(str, fontName, fontSize)
 
     def setFont(self, font):
         self.cFont= font
@@ -86,10 +139,18 @@ class Render2Pdf:
         except:
             pass
 
+    def validFont(self, font, fallback):
+        'Returns font if it is registered, fallback otherwise'
+        try:
+            pdfmetrics.getFont(font[0])
+        except Exception:
+            return fallback
+        return font
+
     def drawString(self, x, y, string, fontName = None, fontSize = None):
         fontName = fontName if fontName is not None else self.cFontName
         fontSize = fontSize if fontSize is not None else self.cFontSize
-        box = self.getStringExtent(string.encode('utf-8'), fontName, fontSize)
+        box = self.getStringExtent(string, fontName, fontSize)
         self.canv.drawString(x, y + box[1], string)
         return box
 
@@ -98,9 +159,11 @@ class Render2Pdf:
         Renders a chordpro documents into PDF file.
         '''
 
-        print('Rendering PDF output to', self.fileName)
+        if self.verbose:
+            print('Rendering PDF output to', self.fileName)
 
         for documentIx, document in enumerate(documents):
+            self.songPages.append(self.canv.getPageNumber())
             root = document.getroot()
             head = root.find('head')
             body = root.find('body')
@@ -126,6 +189,9 @@ class Render2Pdf:
                 strSize = self.drawString(self.marginLeft, posY, subtitle)
                 posY += 30
 
+            if self.style.chordDiagrams:
+                posY = self.drawDiagrams(songDiagrams(document, self.chordCatalog), posY)
+
             self.setFont(self.style.fontLyrics)
 
             # render each block (verse, chorus, tab, comment)
@@ -152,27 +218,10 @@ class Render2Pdf:
                                         break
                         
                     # draw paragraph
-
-                    # rendering of rows 
-                    for row in blockRows:
-                        posX = self.marginLeft 
-                        for item in zip(row[1], row[0]):
-                            #print(item)
-                            # draw chord
-                            lyricOffsetY = 0
-                            chordBox = (0, 0)
-                            if blockHasChords:
-                                self.setFont(self.style.fontChords)
-                                chordBox = self.drawString(posX, posY, item[1])
-                                lyricOffsetY = chordBox[1]
-
-                            # draw lyrics 
-                            self.setFont(self.style.fontLyrics)
-                            textBox = self.drawString(posX, posY + lyricOffsetY, item[0])
-                            posX += max(textBox[0], chordBox[0])
-
-                        posY += lyricOffsetY + textBox[1]
-                        posY += 5 
+                    if self.batchText:
+                        posY = self.drawBlockBatched(blockRows, blockHasChords, posY)
+                    else:
+                        posY = self.drawBlock(blockRows, blockHasChords, posY)
 
                     posY += self.offsetPara
 
@@ -180,4 +229,224 @@ class Render2Pdf:
 
         self.canv.save()
 
+    def drawBlock(self, blockRows, blockHasChords, posY):
+        '''
+        Draws rows of a verse or chorus cell by cell, returns new posY
+        '''
+        for row in blockRows:
+            posX = self.marginLeft 
+            for item in zip(row[1], row[0]):
+                # draw chord
+                lyricOffsetY = 0
+                chordBox = (0, 0)
+                if blockHasChords:
+                    self.setFont(self.style.fontChords)
+                    chordBox = self.drawString(posX, posY, item[1])
+                    lyricOffsetY = chordBox[1]
+
+                # draw lyrics 
+                self.setFont(self.style.fontLyrics)
+                textBox = self.drawString(posX, posY + lyricOffsetY, item[0])
+                posX += max(textBox[0], chordBox[0])
+
+            posY += lyricOffsetY + textBox[1]
+            posY += 5 
+        return posY
+
+    def drawBlockBatched(self, blockRows, blockHasChords, posY):
+        '''
+        Draws rows of a verse or chorus as one text object, all chords
+        first, then all lyrics, returns new posY - the layout is the same
+        as of drawBlock()
+        '''
+        canvasFont = (self.canv._fontname, self.canv._fontsize)
+        lyricsFont = self.validFont(self.style.fontLyrics, canvasFont)
+        chordsFont = self.validFont(self.style.fontChords, lyricsFont)
+
+        chords = []
+        lyrics = []
+        for row in blockRows:
+            posX = self.marginLeft
+            for lyric, chord in zip(row[1], row[0]):
+                lyricOffsetY = 0
+                chordWidth = 0
+                if blockHasChords:
+                    chordWidth, lyricOffsetY = self.getStringExtent(chord)
+                    chords.append((posX, posY + lyricOffsetY, chord))
+                textWidth, textHeight = self.getStringExtent(lyric)
+                lyrics.append((posX, posY + lyricOffsetY + textHeight, lyric))
+                posX += max(textWidth, chordWidth)
+
+            posY += lyricOffsetY + textHeight
+            posY += 5
+
+        text = self.canv.beginText()
+        for font, cells in ((chordsFont, chords), (lyricsFont, lyrics)):
+            if cells:
+                text.setFont(font[0], font[1])
+                for x, y, s in cells:
+                    text.setTextOrigin(x, y)
+                    text.textOut(s)
+        self.canv.drawText(text)
+
+        # keep font state of the canvas as after drawBlock()
+        self.setFont(self.style.fontLyrics)
+        return posY
+
+    def diagramForm(self, define):
+        '''
+        Returns name of form XObject with grid of define (chords.Define or
+        None for empty grid), the form is created on first use, so every
+        distinct grid is stored only once in the output
+        '''
+        key = (define.frets, define.baseFret) if define else None
+        name = self.diagramForms.get(key)
+        if name is None:
+            name = self.diagramForms[key] = 'ChordDiagram%d' % len(self.diagramForms)
+            self.canv.beginForm(name)
+            self.drawDiagramGrid(define)
+            self.canv.endForm()
+        return name
+
+    def drawDiagramGrid(self, define):
+        '''
+        Draws grid of define (chords.Define or None for empty grid) into
+        current form or page
+        '''
+        frets = define.frets if define else (-2,) * 6
+        baseFret = define.baseFret if define else 1
+
+        # coordinates are relative to top left corner of markers row, the
+        #   grid starts below them and left of it is room for markers and
+        #   dots of the first string (the form clips at its bounding box)
+        dx, dy = self.diagramString, self.diagramFret
+        rows = max([4] + list(frets))
+        left = 3
+        right = left + dx * (len(frets) - 1)
+        top = 7
+        canv = self.canv
+        canv.setLineWidth(0.5)
+        for i in range(len(frets)):
+            canv.line(left + i * dx, top, left + i * dx, top + rows * dy)
+        for i in range(rows + 1):
+            canv.line(left, top + i * dy, right, top + i * dy)
+        if baseFret == 1:
+            canv.setLineWidth(2)
+            canv.line(left, top, right, top)
+        else:
+            canv.setFont(self.cFontName, 6)
+            canv.drawString(right + 3, top + dy - 1, str(baseFret))
+        canv.setLineWidth(0.5)
+        for i, f in enumerate(frets):
+            x = left + i * dx
+            if f == -1:
+                canv.line(x - 2, 1, x + 2, 5)
+                canv.line(x - 2, 5, x + 2, 1)
+            elif f == 0:
+                canv.circle(x, 3, 2, stroke = 1, fill = 0)
+            elif f > 0:
+                canv.circle(x, top + (f - 0.5) * dy, 2.3, stroke = 0, fill = 1)
+
+    def drawDiagram(self, define):
+        'Draws grid of define at origin of the current coordinates'
+        # forms carry the bottomup=0 preamble of the page, flip them back
+        self.canv.transform(1, 0, 0, -1, 0, self.pageHeight)
+        self.canv.doForm(self.diagramForm(define))
+
+    def drawDiagrams(self, diagrams, posY):
+        '''
+        Draws (name, define) pairs of chords.songDiagrams() in rows below
+        each other, returns new posY
+        '''
+        if not diagrams:
+            return posY
+        font = self.validFont(self.style.fontChords, (self.cFontName, self.cFontSize))
+        labelHeight = self.metrics.height(font[0], font[1])
+        perRow = max(1, int((self.pageWidth - 2 * self.marginLeft) // self.diagramCell))
+        self.canv.setFont(font[0], font[1])
+        for i in range(0, len(diagrams), perRow):
+            row = diagrams[i:i + perRow]
+            rows = max([4] + [max(d.frets) for name, d in row if d])
+            for j, (name, define) in enumerate(row):
+                x = self.marginLeft + j * self.diagramCell
+                self.canv.drawString(x, posY + labelHeight, name)
+                self.canv.saveState()
+                self.canv.translate(x - 3, posY + labelHeight + 2)
+                self.drawDiagram(define)
+                self.canv.restoreState()
+            posY += labelHeight + 2 + 7 + rows * self.diagramFret + 10
+        return posY
+
+####                        ####
+#### parallel PDF rendering ####
+####                        ####
+
+def renderChunk(fileName, styleSheet, documents):
+    '''
+    Worker of renderParallel() - renders documents into intermediate PDF
+
+    Returns list of (title, first page index) of rendered documents.
+    '''
+    r = Render2Pdf(fileName, styleSheet, verbose = False)
+    r.render(documents)
+    result = []
+    for document, page in zip(documents, r.songPages):
+        title = document.getroot().find('head').find('title')
+        result.append((safeText(title.text).strip() if title != None else None, page - 1))
+    return result
+
+def mergeChunks(fileName, chunks):
+    '''
+    Concatenates intermediate PDF files into fileName
+
+    chunks is list of (chunk file name, [(title, page index), ...]), the
+    outline of the result gets one entry per titled document.
+    '''
+    try:
+        from pypdf import PdfWriter
+    except ImportError:
+        raise RuntimeError('Merging of PDF files requires the pypdf package')
+
+    writer = PdfWriter()
+    outline = []
+    for chunkFileName, songs in chunks:
+        pages = len(writer.pages)
+        writer.append(chunkFileName, import_outline = False)
+        for title, page in songs:
+            if title is not None:
+                outline.append((title, pages + page))
+    for title, page in outline:
+        writer.add_outline_item(title, page)
+    with open(fileName, 'wb') as f:
+        writer.write(f)
+
+def renderParallel(fileName, styleSheet, documents, jobs = 0, chunkSize = None):
+    '''
+    Renders documents to PDF file using pool of worker processes
+
+    Documents are split into chunks of consecutive songs, each chunk is
+    rendered into intermediate PDF by a worker and all chunks are merged
+    into fileName, keeping the page order and the outline entries.
+    Value 0 of jobs means one worker per cpu core.
+    '''
+    if jobs == 0:
+        jobs = os.cpu_count() or 1
+    if not chunkSize:
+        # more chunks than workers balances uneven songs, but every chunk
+        #   embeds its own copy of the fonts
+        chunkSize = max(1, -(-len(documents) // (jobs * 2)))
 
+    print('Rendering PDF output to', fileName)
+    directory = tempfile.mkdtemp(prefix = 'pychords-', dir = os.path.dirname(os.path.abspath(fileName)))
+    try:
+        chunkFiles = []
+        with ProcessPoolExecutor(jobs) as pool:
+            futures = []
+            for i in range(0, len(documents), chunkSize):
+                chunkFileName = os.path.join(directory, 'chunk%06d.pdf' % len(futures))
+                futures.append(pool.submit(renderChunk, chunkFileName, styleSheet, documents[i:i + chunkSize]))
+                chunkFiles.append(chunkFileName)
+            chunks = [(f, future.result()) for f, future in zip(chunkFiles, futures)]
+        mergeChunks(fileName, chunks)
+    finally:
+        shutil.rmtree(directory, ignore_errors = True)
@@ -0,0 +1,204 @@
+import codecs
+import io
+import math
+import os
+import re
+import sqlite3
+from collections import namedtuple
+
+from . import tokenizer
+from .chords import normalizeChord
+from .library import findFiles
+
+wordPattern = re.compile(r'\w+')
+
+def words(text):
+    'Splits text into normalized (lower case) words'
+    return wordPattern.findall(text.lower())
+
+def splitDirective(tvalue):
+    'Returns (lower case tag, argument) of directive token value'
+    tag, arg = tvalue.split(':', 1) if ':' in tvalue else (tvalue, '')
+    return tag.lower(), arg
+
+def extractTerms(tokens):
+    '''
+    Returns {(kind, term): {line number: count}} of a tokenized song
+
+    kind is 'w' for words of lyrics, titles and comments and 'c' for
+    normalized chord names. Lyric fragments of a line are joined first,
+    so words split by inline chords are found as a whole.
+    '''
+    terms = {}
+    line = []
+
+    def add(kind, term, lineno):
+        lines = terms.setdefault((kind, term), {})
+        lines[lineno] = lines.get(lineno, 0) + 1
+
+    for lineno, ttype, tvalue in tokens:
+        if ttype == 'lyric':
+            line.append(tvalue)
+        elif ttype == 'chord':
+            add('c', normalizeChord(tvalue), lineno)
+        elif ttype == 'directive':
+            tag, arg = splitDirective(tvalue)
+            if tag in ('t', 'title', 'st', 'subtitle', 'c', 'comment',
+                               'ci', 'comment_italic', 'cb', 'comment_box'):
+                line.append(' ' + arg)
+        elif ttype == 'eol':
+            for word in words(''.join(line)):
+                add('w', word, lineno)
+            line = []
+    return terms
+
+def readTokens(fileName):
+    'Returns list of tokens of chordpro file'
+    with codecs.open(fileName, 'r', 'utf-8-sig') as f:
+        return list(tokenizer.tokenize(f))
+
+SearchResult = namedtuple('SearchResult', 'path title score lines')
+
+class SearchIndex:
+    '''
+    On-disk (SQLite) inverted index of lyric words and chords
+
+    Postings are stored per (kind, term, file, line), clustered by term,
+    so a query reads only postings of the searched terms. Files are
+    re-indexed only if their mtime or size changed.
+    '''
+    def __init__(self, dbPath):
+        self.db = sqlite3.connect(dbPath)
+        # files skipped by the last update()
+        self.errors = []
+        self.db.executescript('''
+            CREATE TABLE IF NOT EXISTS search_files (
+                id INTEGER PRIMARY KEY,
+                path TEXT UNIQUE,
+                title TEXT,
+                mtime REAL,
+                size INTEGER);
+            CREATE TABLE IF NOT EXISTS search_postings (
+                kind TEXT,
+                term TEXT,
+                file INTEGER,
+                line INTEGER,
+                count INTEGER,
+                PRIMARY KEY (kind, term, file, line)) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS search_postings_file ON search_postings (file);
+        ''')
+
+    def close(self):
+        self.db.close()
+
+    def update(self, paths, prune = True):
+        '''
+        Indexes new and changed files (directories are searched
+        recursively), returns tuple (number of indexed files, number of
+        removed files). If prune is True, no longer existing files are
+        removed from the index.
+
+        Files which can't be read or decoded are skipped (and removed from
+        the index), list of (file name, error) of them is kept in errors.
+        '''
+        known = dict((row[0], (row[1], row[2], row[3])) for row in
+                     self.db.execute('SELECT path, id, mtime, size FROM search_files'))
+        indexed = 0
+        self.errors = []
+        with self.db:
+            for fileName in findFiles(paths):
+                fileName = os.path.abspath(fileName)
+                entry = known.get(fileName)
+                try:
+                    st = os.stat(fileName)
+                    if entry is not None and entry[1:] == (st.st_mtime, st.st_size):
+                        continue
+                    tokens = readTokens(fileName)
+                except (OSError, ValueError) as e:
+                    # UnicodeDecodeError is a ValueError
+                    self.errors.append((fileName, e))
+                    if entry is not None:
+                        self.remove(entry[0])
+                    continue
+                if entry is not None:
+                    self.remove(entry[0])
+                self.add(fileName, st, tokens)
+                indexed += 1
+
+            removed = 0
+            if prune:
+                for fileName, entry in known.items():
+                    if not os.path.isfile(fileName):
+                        self.remove(entry[0])
+                        removed += 1
+        return indexed, removed
+
+    def add(self, fileName, st, tokens):
+        'Indexes tokens of fileName (see readTokens()), st is its os.stat()'
+        title = ''
+        for lineno, ttype, tvalue in tokens:
+            if ttype == 'directive':
+                tag, arg = splitDirective(tvalue)
+                if tag in ('t', 'title') and arg:
+                    title = arg.strip()
+        fileId = self.db.execute('INSERT INTO search_files (path, title, mtime, size) VALUES (?, ?, ?, ?)',
+                                 (fileName, title, st.st_mtime, st.st_size)).lastrowid
+        self.db.executemany('INSERT INTO search_postings VALUES (?, ?, ?, ?, ?)',
+            ((kind, term, fileId, lineno, count)
+             for (kind, term), lines in extractTerms(tokens).items()
+             for lineno, count in lines.items()))
+
+    def remove(self, fileId):
+        self.db.execute('DELETE FROM search_postings WHERE file = ?', (fileId,))
+        self.db.execute('DELETE FROM search_files WHERE id = ?', (fileId,))
+
+    def search(self, text = '', chords = (), limit = 20):
+        '''
+        Returns list of SearchResult ranked by relevance
+
+        text is split into words, chords are normalized chord names. Score
+        of a file is sum of tf-idf weights of matched terms, multiplied by
+        number of distinct matched terms, with a bonus for lines matching
+        all words (the searched line). lines of the result are numbers of
+        lines with matches, best lines first.
+        '''
+        terms = [('w', w) for w in dict.fromkeys(words(text))]
+        terms += [('c', normalizeChord(c)) for c in dict.fromkeys(chords)]
+        if not terms:
+            return []
+
+        total = self.db.execute('SELECT COUNT(*) FROM search_files').fetchone()[0]
+        postings = {}
+        for kind, term in terms:
+            postings[(kind, term)] = self.db.execute(
+                'SELECT file, line, count FROM search_postings WHERE kind = ? AND term = ?',
+                (kind, term)).fetchall()
+
+        scores = {}
+        # {file: {line: set of matched terms}}
+        fileLines = {}
+        for key, rows in postings.items():
+            files = set(r[0] for r in rows)
+            if not files:
+                continue
+            idf = math.log(1.0 + total / float(len(files)))
+            for fileId, line, count in rows:
+                scores[fileId] = scores.get(fileId, 0.0) + count * idf
+                fileLines.setdefault(fileId, {}).setdefault(line, set()).add(key)
+
+        wordTerms = set(t for t in terms if t[0] == 'w')
+        results = []
+        for fileId, score in scores.items():
+            lines = fileLines[fileId]
+            score *= len(set().union(*lines.values()))
+            if len(wordTerms) > 1 and any(keys >= wordTerms for keys in lines.values()):
+                score *= 2
+            ranked = sorted(lines, key = lambda line: (-len(lines[line]), line))
+            results.append((score, fileId, ranked))
+        results.sort(key = lambda r: -r[0])
+
+        out = []
+        for score, fileId, lines in results[:limit]:
+            path, title = self.db.execute('SELECT path, title FROM search_files WHERE id = ?', (fileId,)).fetchone()
+            out.append(SearchResult(path, title, score, lines))
+        return out
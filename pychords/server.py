@@ -0,0 +1,213 @@
+import collections
+import hashlib
+import io
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from . import __version__, tokenizer, parser, render, render2pdf, chords
+
+contentTypes = {
+    'text': 'text/plain; charset=utf-8',
+    'html': 'text/html; charset=utf-8',
+    'html_css': 'text/html; charset=utf-8',
+    'pdf': 'application/pdf',
+}
+
+class RequestError(ValueError):
+    'Invalid render request, reported to the client as 400 Bad Request'
+
+class RenderCache:
+    '''
+    Thread safe LRU cache of rendered outputs
+
+    Entries are evicted when their total size exceeds maxSize bytes.
+    '''
+    def __init__(self, maxSize):
+        self.maxSize = maxSize
+        self.size = 0
+        self.entries = collections.OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            data = self.entries.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, key, data):
+        if len(data) > self.maxSize:
+            return
+        with self.lock:
+            if key in self.entries:
+                return
+            self.entries[key] = data
+            self.size += len(data)
+            while self.size > self.maxSize:
+                oldKey, oldData = self.entries.popitem(last = False)
+                self.size -= len(oldData)
+
+class RenderService:
+    '''
+    Renders chordpro text to text, html or pdf - the server independent
+    part of the render server
+
+    A request is a dict:
+        {"text": chordpro source (songs separated by {new_song}), "format": "text"|"html"|"html_css"|"pdf",
+         "style": content of style sheet file (optional),
+         "transpose": semitones, "accidentals": "auto"|"sharps"|"flats",
+         "diagrams": true|false}
+
+    Fonts are registered once, when the service is created. reportlab
+    keeps fonts and other state in module globals, so PDF rendering is
+    serialized by a lock, parsing and text/html rendering run
+    concurrently. Outputs are cached by hash of the whole request.
+    '''
+    def __init__(self, cacheSize = 64 * 1024 * 1024):
+        self.cache = RenderCache(cacheSize)
+        self.pdfLock = threading.Lock()
+        with self.pdfLock:
+            render2pdf.registerFonts()
+
+    def key(self, request):
+        'Returns cache key of request (hash of its canonical JSON)'
+        data = json.dumps(request, sort_keys = True, separators = (',', ':'))
+        return hashlib.sha256((__version__ + '\0' + data).encode('utf-8')).hexdigest()
+
+    def render(self, request):
+        '''
+        Returns tuple (content type, output bytes, key, cached) of request
+        (see class documentation), raises RequestError for invalid ones
+        '''
+        if not isinstance(request, dict) or not isinstance(request.get('text'), str):
+            raise RequestError('Request must be a JSON object with "text" string')
+        fmt = request.get('format', 'text')
+        if fmt not in contentTypes:
+            raise RequestError('Unsupported format %s' % fmt)
+
+        key = self.key(request)
+        data = self.cache.get(key)
+        if data is not None:
+            return contentTypes[fmt], data, key, True
+
+        styleSheet = render2pdf.StyleSheet()
+        try:
+            if request.get('style'):
+                styleSheet.loadFromData(request['style'])
+            styleSheet.chordDiagrams = bool(request.get('diagrams', styleSheet.chordDiagrams))
+            transpose = int(request.get('transpose', 0))
+            flats = {'auto': None, 'sharps': False, 'flats': True}[request.get('accidentals', 'auto')]
+        except (KeyError, TypeError, ValueError, IndexError) as e:
+            raise RequestError('Invalid options: %s' % e)
+
+        # songs failing on unimplemented feature are left out like in the
+        #   command line tool, unless there is nothing left
+        documents = []
+        firstError = None
+        try:
+            for document, error in parser.parse_songs(tokenizer.tokenize(io.StringIO(request['text']))):
+                if error is None:
+                    documents.append(document)
+                elif firstError is None:
+                    firstError = error
+        except (parser.BadDirectiveError, parser.BadFormattingError) as e:
+            raise RequestError(str(e))
+        if firstError is not None and not documents:
+            raise RequestError(str(firstError))
+        if transpose % 12:
+            for document in documents:
+                chords.transposeDocument(document, transpose, flats)
+
+        if fmt == 'pdf':
+            output = io.BytesIO()
+            with self.pdfLock:
+                r = render2pdf.Render2Pdf(output, styleSheet, verbose = False)
+                r.render(documents)
+            data = output.getvalue()
+        else:
+            lines = render.renderLines(documents, fmt, show_diagrams = styleSheet.chordDiagrams)
+            data = '\n'.join(lines).encode('utf-8')
+
+        self.cache.put(key, data)
+        return contentTypes[fmt], data, key, False
+
+class RenderHandler(BaseHTTPRequestHandler):
+    '''
+    HTTP interface of RenderService
+
+    POST /render with JSON request returns the output, GET /health
+    returns cache statistics.
+    '''
+    server_version = 'pychords/' + __version__
+    # keep-alive connections of load balancers and benchmarks
+    protocol_version = 'HTTP/1.1'
+    # headers and body are separate writes, don't wait for delayed ACK
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        if self.path != '/health':
+            return self.sendError(404, 'Not found')
+        cache = self.server.service.cache
+        self.send(200, 'application/json', json.dumps({
+            'status': 'ok', 'entries': len(cache.entries), 'bytes': cache.size,
+            'hits': cache.hits, 'misses': cache.misses}).encode('utf-8'))
+
+    def do_POST(self):
+        if self.path != '/render':
+            return self.sendError(404, 'Not found')
+        try:
+            length = int(self.headers['Content-Length'])
+        except (TypeError, ValueError):
+            # the body, if any, can't be skipped without its length
+            self.close_connection = True
+            return self.sendError(400, 'Missing or invalid Content-Length')
+        if length < 0:
+            # read(-1) would wait for the client to close the connection
+            self.close_connection = True
+            return self.sendError(400, 'Invalid Content-Length')
+        if length > self.server.maxRequest:
+            # the unread body would be taken for the next request
+            self.close_connection = True
+            return self.sendError(413, 'Request too large')
+        try:
+            request = json.loads(self.rfile.read(length).decode('utf-8'))
+            contentType, data, key, cached = self.server.service.render(request)
+        except (ValueError, UnicodeDecodeError) as e:
+            # RequestError and JSON errors are ValueErrors
+            return self.sendError(400, str(e))
+        except Exception as e:
+            self.log_error('Rendering failed: %r', e)
+            return self.sendError(500, 'Rendering failed')
+        self.send(200, contentType, data, {'ETag': '"%s"' % key, 'X-Cache': 'hit' if cached else 'miss'})
+
+    def send(self, code, contentType, data, headers = {}):
+        self.send_response(code)
+        self.send_header('Content-Type', contentType)
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def sendError(self, code, message):
+        self.send(code, 'application/json', json.dumps({'error': message}).encode('utf-8'))
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            BaseHTTPRequestHandler.log_message(self, format, *args)
+
+class RenderServer(ThreadingHTTPServer):
+    'Threaded HTTP server of RenderService, one thread per connection'
+    daemon_threads = True
+
+    def __init__(self, address, service = None, maxRequest = 4 * 1024 * 1024, verbose = False):
+        self.service = service if service is not None else RenderService()
+        self.maxRequest = maxRequest
+        self.verbose = verbose
+        ThreadingHTTPServer.__init__(self, address, RenderHandler)
@@ -0,0 +1,250 @@
+import collections
+import io
+import itertools
+import re
+import threading
+from collections import namedtuple
+
+from . import tokenizer, parser, library, compiled
+
+# metadata of a song, index is position of the song in its file
+SongEntry = namedtuple('SongEntry', 'path index title subtitle defines')
+
+# files without this are taken as single songs and scanned only up to the
+# first chord or lyric, false positives (e.g. in a tab) are harmless
+newSongPattern = re.compile(r'\{\s*(ns|new_song)\s*[:}]', re.I)
+
+def readText(fileName):
+    'Returns decoded content of chordpro file'
+    with open(fileName, 'rb') as f:
+        return f.read().decode('utf-8-sig')
+
+def scanSongs(fileName):
+    '''
+    Returns tuple (list of metadata of songs of fileName, list of starts
+    of the songs, length of the text), see library.scanMetadata() and
+    tokenizer.split_songs()
+
+    Start of a song is tuple (line, skip, offset) - the song is the song
+    number skip (from 0) of the text from the line on, parts of the
+    previous songs on the line come first. offset is position of the line
+    in the file (bytes), so the song is read without the preceding ones.
+    '''
+    with open(fileName, 'rb') as f:
+        data = f.read()
+    text = data.decode('utf-8-sig')
+    if not newSongPattern.search(text):
+        return [library.scanMetadata(io.StringIO(text))], [(1, 0, 0)], len(text)
+    songs = []
+    starts = []
+    # line of the last content of each song
+    ends = []
+    for song in tokenizer.split_songs(tokenizer.tokenize(io.StringIO(text))):
+        song = list(song)
+        line = song[0][0]
+        skip = 0
+        while skip < len(ends) and ends[-1 - skip] >= line:
+            skip += 1
+        songs.append(library.scanTokens(song))
+        starts.append((line, skip))
+        ends.append(max(t[0] for t in song if t[1] in ('directive', 'chord', 'lyric')))
+    return songs, lineOffsets(data, starts), len(text)
+
+def lineOffsets(data, starts):
+    'Adds byte offsets in data of the lines to starts (line, skip) ordered by line'
+    result = []
+    line = 1
+    offset = 0
+    for start, skip in starts:
+        # lines are split on \n only, as by io.StringIO
+        while line < start:
+            offset = data.index(b'\n', offset) + 1
+            line += 1
+        result.append((start, skip, offset))
+    return result
+
+class Songbook:
+    '''
+    Lazy sequence of songs of chordpro files and directories
+
+    Only metadata of the songs (SongEntry - title, subtitle, defines) is
+    read up front, on the first access. A song is parsed when it is
+    accessed by index and the documents are kept in a LRU cache of at most
+    cacheSize characters of their source, so memory does not grow with the
+    size of the library. Songs of compiled songbooks (see compiled module)
+    are decoded instead of parsed. model is the document model of
+    parser.parse().
+
+    Songs of a file separated by {new_song} are items of their own, their
+    starting lines are found by the scan, so only the accessed song is
+    parsed. Parse errors (parser.NotFinishedError, ...) are raised on
+    access of the failing song only.
+    '''
+    def __init__(self, paths, cacheSize = 4 * 1024 * 1024, model = 'etree'):
+        self.paths = [paths] if isinstance(paths, str) else list(paths)
+        self.cacheSize = cacheSize
+        self.model = model
+        self.entries = None
+        self.sizes = None
+        self.starts = None
+        self.books = {}
+        self.cache = collections.OrderedDict()
+        self.cachedSize = 0
+        self.lock = threading.Lock()
+
+    def close(self):
+        'Closes compiled songbooks, the songbook can be scanned again'
+        for book in self.books.values():
+            book.close()
+        self.books = {}
+        self.entries = None
+        self.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.close()
+        return False
+
+    def scan(self):
+        'Reads metadata of all songs, done by the first access'
+        entries = []
+        sizes = []
+        starts = []
+        for fileName in library.findFiles(self.paths):
+            if fileName.endswith(compiled.suffix):
+                book = self.books.get(fileName)
+                if book is None:
+                    book = self.books[fileName] = compiled.CompiledSongbook(fileName)
+                for i in range(len(book)):
+                    title, subtitle, defines = book.head(i)
+                    entries.append(SongEntry(fileName, i, title, subtitle, defines))
+                    # a word of the record stands for a few characters
+                    sizes.append(4 * (book.songs[i + 1] - book.songs[i]))
+                    starts.append(None)
+                continue
+            songs, songStarts, size = scanSongs(fileName)
+            for i, meta in enumerate(songs):
+                entries.append(SongEntry(fileName, i, meta['title'], meta['subtitle'],
+                                         tuple(meta['define'])))
+                sizes.append(size // len(songs))
+            starts.extend(songStarts)
+        self.entries = entries
+        self.sizes = sizes
+        self.starts = starts
+
+    def info(self, index):
+        'Returns SongEntry of song index without parsing it'
+        if self.entries is None:
+            self.scan()
+        return self.entries[index]
+
+    def titles(self):
+        'Returns list of (stripped) titles of all songs'
+        if self.entries is None:
+            self.scan()
+        return [(e.title or '').strip() for e in self.entries]
+
+    def find(self, title):
+        'Returns index of the first song with title, None if there is no such song'
+        key = compiled.titleKey(title)
+        for i, t in enumerate(self.titles()):
+            if compiled.titleKey(t) == key:
+                return i
+        return None
+
+    def __len__(self):
+        if self.entries is None:
+            self.scan()
+        return len(self.entries)
+
+    def __getitem__(self, index):
+        if self.entries is None:
+            self.scan()
+        if isinstance(index, slice):
+            return [self.document(i) for i in range(*index.indices(len(self.entries)))]
+        if index < 0:
+            index += len(self.entries)
+        if not 0 <= index < len(self.entries):
+            raise IndexError('Song index out of range')
+        return self.document(index)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.document(i)
+
+    def batches(self, size = 50, indexes = None):
+        '''
+        Returns iterator of lists of at most size documents (of songs
+        indexes, all by default), e.g. for render2pdf.Render2Pdf.render()
+
+        Batches are built as they are consumed, so only a batch and the
+        cache are in memory at a time.
+        '''
+        if indexes is None:
+            indexes = range(len(self))
+        batch = []
+        for i in indexes:
+            batch.append(self[i])
+            if len(batch) == size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def document(self, index):
+        'Returns document of song index, parsed or taken from the cache'
+        if self.entries is None:
+            self.scan()
+        with self.lock:
+            document = self.cache.get(index)
+            if document is not None:
+                self.cache.move_to_end(index)
+                return document
+
+        entry = self.entries[index]
+        if entry.path in self.books:
+            document = self.books[entry.path][entry.index]
+        else:
+            document = self.parse(entry.path, self.starts[index])
+            if document is None:
+                raise IndexError('Song %d of "%s" not found, the file changed since scan()' % (
+                    entry.index, entry.path))
+        with self.lock:
+            if index not in self.cache:
+                self.cache[index] = document
+                self.cachedSize += self.sizes[index]
+            self.cache.move_to_end(index)
+            # keep at least the requested document
+            while self.cachedSize > self.cacheSize and len(self.cache) > 1:
+                i, d = self.cache.popitem(last = False)
+                self.cachedSize -= self.sizes[i]
+        return document
+
+    def parse(self, fileName, start):
+        '''
+        Parses song of fileName at start (see scanSongs()), returns its
+        document or None if there is no such song
+        '''
+        line, skip, offset = start
+        with open(fileName, 'rb') as f:
+            if line == 1:
+                text = f.read().decode('utf-8-sig')
+                if not newSongPattern.search(text):
+                    # a single song, even an empty one, see scanSongs()
+                    return parser.parse(tokenizer.tokenize(io.StringIO(text)), self.model)
+            f.seek(offset)
+            # only lines up to the end of the song are read
+            lines = io.TextIOWrapper(f, 'utf-8-sig', newline = '\n')
+            songs = tokenizer.split_songs(tokenizer.tokenize(lines, line))
+            song = next(itertools.islice(songs, skip, None), None)
+            if song is None:
+                return None
+            return parser.parse(song, self.model)
+
+    def clear(self):
+        'Drops all cached documents'
+        with self.lock:
+            self.cache.clear()
+            self.cachedSize = 0
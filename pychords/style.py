@@ -0,0 +1,43 @@
+import json
+import os
+
+class StyleSheet:
+    '''Visual definition of song typesetting'''
+    def __init__(self):
+        # Default values
+        self.fontLyrics = ('Helvetica', 10)
+        self.fontChords = ('Helvetica', 8)
+        self.fontTitle = ('Helvetica', 20)
+        self.fontSubTitle = ('Helvetica', 12)
+        # draw grids of the song chords below the title
+        self.chordDiagrams = False
+
+    def loadFromFile(self, filePath): 
+        '''Load stylesheet from file system'''
+        # first - try to open file as provided (cwd without full path)
+        if not os.path.isfile(filePath):
+            # second - try to open file from home directory 
+            filePath = os.path.expanduser("~/" + os.path.basename(filePath))
+
+        if not os.path.isfile(filePath):
+            raise IOError('Stylesheet file not found: %s' % filePath)
+
+        with open(filePath) as dataFile:    
+            data = json.load(dataFile)
+            dataFile.close()
+            self.loadFromData(data)
+
+    def loadFromData(self, data):
+        '''Load stylesheet from parsed JSON data (content of stylesheet file)'''
+        if data['pdf']:
+            dataPdf = data['pdf']
+            if dataPdf['title'] and len(dataPdf['title']) >= 2:
+                self.fontTitle = (dataPdf['title'][0], dataPdf['title'][1])
+            if dataPdf['subtitle'] and len(dataPdf['subtitle']) >= 2:
+                self.fontSubTitle = (dataPdf['subtitle'][0], dataPdf['subtitle'][1])
+            if dataPdf['lyrics'] and len(dataPdf['lyrics']) >= 2:
+                self.fontLyrics = (dataPdf['lyrics'][0], dataPdf['lyrics'][1])
+            if dataPdf['chords'] and len(dataPdf['chords']) >= 2:
+                self.fontChords = (dataPdf['chords'][0], dataPdf['chords'][1])
+            if 'diagrams' in dataPdf:
+                self.chordDiagrams = bool(dataPdf['diagrams'])
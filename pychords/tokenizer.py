@@ -4,10 +4,29 @@ from xml.etree.ElementTree import ElementTree, Element, SubElement, Comment
 #from xml.etree.ElementTree import _ElementInterface as ElementBase
 from xml.etree.ElementTree import tostring as dumpElement
 
-def tokenize(infile):
+# token types indexed by number of the matching pattern group
+tokentypes = (None, 'directive', 'chord', 'comment', 'lyric')
+
+pattern = re.compile(r'''
+    \s* \{ ( [^}]+ ) \} # directive (meta or block)
+|
+    \[ ( [^\]]+ ) \]    # chord
+|
+    \s* \#  ( .+ )      # comment - only if # is not in chord or directive
+|
+    ( [^[]+ )           # lyric
+''', re.VERBOSE)
+scan = pattern.finditer
+
+tab_end = r'^\s*\{(eot|end_of_tab)\}\s*$'
+
+def tokenize(infile, first = 1):
     '''
     Splits bytes from infile into tokens for the parser.
     
+    Lines are read lazily from infile (any iterable of lines), first is
+    number of its first line (when infile starts in the middle of a file).
+    
     Returns an iterator which delivers tokens in the tuple form:
         (line number, token type, token value)
     
@@ -27,40 +46,26 @@ def tokenize(infile):
     'sol', 'eol': start of line, end of line
     '''
     
-    tokentypes = ('directive', 'chord', 'comment', 'lyric')
-    
-    # pattern.findall(line) returns tuples of form 
-    #   (directive, chord, comment, lyric)
-    #   where only one is not an empty string
-
-    pattern = re.compile(r'''
-        \s* \{ ( [^}]+ ) \} # directive (meta or block)
-    |
-        \[ ( [^\]]+ ) \]    # chord
-    |
-        \s* \#  ( .+ )      # comment - only if # is not in chord or directive
-    |
-        ( [^[]+ )           # lyric
-    ''', re.VERBOSE)
-    
-    yield (1, 'sof', '')
-    # wrap readlines() in iterator so can be passed to preformatted_tokenizer()
-    lines = iter(enumerate(infile.readlines()))
+    yield (first, 'sof', '')
+    # a single enumerate() iterator is shared with preformatted_tokenize(),
+    # so lines of {tab} sections are consumed from the same stream
+    lines = enumerate(infile, first)
+    lineno = first
     
     for lineno, line in lines:
-        yield (lineno+1, 'sol', '')
+        yield (lineno, 'sol', '')
         
-        line = line.rstrip()
-        for tokens in pattern.findall(line):
-            (ttype, tvalue) = [t for t in zip(tokentypes, tokens) if t[1] != ''][0]
+        for match in scan(line.rstrip()):
+            # exactly one group matches, lastindex tells which one
+            ttype = tokentypes[match.lastindex]
+            tvalue = match.group(match.lastindex)
             if ttype == 'directive' and tvalue in ('sot', 'start_of_tab'):
-                tvalue = preformatted_tokenize(lines, r'^\s*\{(eot|end_of_tab)\}\s*$')
-                tvalue = 'tab:' + ''.join([v[1] for v in tvalue])
-            yield (lineno + 1, ttype, tvalue)
+                tvalue = 'tab:' + ''.join([v[1] for v in preformatted_tokenize(lines, tab_end)])
+            yield (lineno, ttype, tvalue)
         
-        yield (lineno + 1, 'eol', '')
+        yield (lineno, 'eol', '')
     
-    yield (lineno + 1, 'eof', '')
+    yield (lineno, 'eof', '')
 
 def preformatted_tokenize(lines, pattern):
     'Returns untokenized text from iterator "lines"'
@@ -73,3 +78,68 @@ def preformatted_tokenize(lines, pattern):
 
 
 
+
+new_song_tags = ('ns', 'new_song')
+
+def is_new_song(token):
+    'Tells if token is a {new_song} directive'
+    return token[1] == 'directive' and token[2].split(':', 1)[0].strip().lower() in new_song_tags
+
+def split_songs(tokens):
+    '''
+    Splits tokens of a stream of songs separated by {new_song} (or {ns})
+    directives.
+
+    Returns an iterator of token iterators, one per song, each starting
+    with 'sof' and ending with 'eof' like output of tokenize(). Songs are
+    split lazily, so a stream of any length is processed in constant
+    memory. As with itertools.groupby(), a song must be consumed before
+    the next one is requested - the rest of it is skipped otherwise.
+    Line numbers are kept from the whole stream. Songs without any
+    directive, chord or lyric (e.g. leading or trailing separators) are
+    left out.
+    '''
+    tokens = iter(tokens)
+    head = []
+    while True:
+        # read ahead to the first content of the song, blank songs end here
+        for token in tokens:
+            ttype = token[1]
+            if ttype == 'eof':
+                return
+            elif is_new_song(token):
+                # rest of the line belongs to the next song
+                head = [(token[0], 'sol', '')]
+            elif ttype != 'sof':
+                head.append(token)
+                if ttype in ('directive', 'chord', 'lyric'):
+                    break
+        else:
+            return
+
+        end = []
+        song = song_tokens(head, tokens, end)
+        yield song
+        for token in song:
+            pass
+        if not end or end[0][1] == 'eof':
+            return
+        head = [(end[0][0], 'sol', '')]
+
+def song_tokens(head, tokens, end):
+    '''
+    Returns tokens of one song, see split_songs() - head are the already
+    read tokens, the token ending the song is appended to end
+    '''
+    yield (head[0][0], 'sof', '')
+    yield from head
+    for token in tokens:
+        if is_new_song(token):
+            end.append(token)
+            yield (token[0], 'eol', '')
+            yield (token[0], 'eof', '')
+            return
+        yield token
+        if token[1] == 'eof':
+            end.append(token)
+            return
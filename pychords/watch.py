@@ -0,0 +1,66 @@
+import os
+import time
+
+def fileState(path):
+    'Returns (mtime, size) of path or None if it does not exist'
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+class Watcher:
+    '''
+    Polls a set of files for modification
+
+    Files are compared by mtime and size, so only a stat() per file and
+    poll is needed. Removed files are reported as changed too.
+    '''
+    def __init__(self, paths, interval = 0.2):
+        self.interval = interval
+        self.states = dict((path, fileState(path)) for path in paths)
+
+    def changes(self):
+        'Returns list of files changed since the previous call'
+        changed = []
+        for path, state in self.states.items():
+            current = fileState(path)
+            if current != state:
+                self.states[path] = current
+                changed.append(path)
+        return changed
+
+    def wait(self, debounce = 0.1):
+        '''
+        Blocks until some files change, returns list of them
+
+        Changes are collected until files are quiet for debounce seconds,
+        so a burst of writes (editor saving several files, save via
+        temporary file) results in a single rebuild.
+        '''
+        changed = []
+        while not changed:
+            time.sleep(self.interval)
+            changed = self.changes()
+        while True:
+            time.sleep(debounce)
+            more = self.changes()
+            if not more:
+                return changed
+            changed += [path for path in more if path not in changed]
+
+def watch(paths, rebuild, interval = 0.2, debounce = 0.1):
+    '''
+    Calls rebuild(changed) with list of changed files after every change
+    of paths, until interrupted by Ctrl+C
+    '''
+    watcher = Watcher(paths, interval)
+    print('Watching %d files for changes (Ctrl+C to stop)' % len(watcher.states))
+    try:
+        while True:
+            changed = watcher.wait(debounce)
+            start = time.perf_counter()
+            rebuild(changed)
+            print('Rebuilt in %.3f s, watching for changes' % (time.perf_counter() - start))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,101 @@
+####               ####
+#### line wrapping ####
+####               ####
+
+# Wrapping of rows of chord/lyric cells into lines of limited width.
+# Cells are never split; a line should end after a cell whose lyric ends
+# with whitespace (word boundary), breaking mid-word only if no boundary
+# fits. The first line has the full width, continuation lines are
+# narrower by indent.
+
+def prefixSums(widths):
+    sums = [0]
+    for w in widths:
+        sums.append(sums[-1] + w)
+    return sums
+
+def greedy(widths, breakable, width, indent = 0):
+    '''
+    Greedy wrapping - each line takes as many cells as fit
+
+    widths is list of cell widths, breakable[i] tells whether line may
+    end after cell i. Returns list of (start, end) ranges of cell indices.
+    '''
+    sums = prefixSums(widths)
+    n = len(widths)
+    lines = []
+    start = 0
+    avail = width
+    lastBreak = lastFit = -1
+    i = 0
+    while i < n:
+        if sums[i + 1] - sums[start] <= avail:
+            lastFit = i
+            if breakable[i]:
+                lastBreak = i
+            i += 1
+            continue
+        # cell i doesn't fit - end the line at the last word boundary,
+        #   at the last fitting cell or (too wide cell) right after it
+        if lastBreak >= start:
+            end = lastBreak
+        elif lastFit >= start:
+            end = lastFit
+        else:
+            end = i
+        lines.append((start, end + 1))
+        start = i = end + 1
+        avail = width - indent
+        lastBreak = lastFit = -1
+    if start < n:
+        lines.append((start, n))
+    return lines
+
+def optimal(widths, breakable, width, indent = 0):
+    '''
+    Minimum raggedness wrapping - minimizes sum of squared free space of
+    all lines but the last one, see greedy() for parameters
+    '''
+    sums = prefixSums(widths)
+    n = len(widths)
+    # penalties make mid-word breaks and overflowing lines last resorts
+    midWord = width * width
+    overflow = midWord * width
+
+    # best[start] is (cost, end) of the best layout of cells start..n-1
+    best = [None] * n + [(0, None)]
+    for start in range(n - 1, -1, -1):
+        avail = width if start == 0 else width - indent
+        choice = None
+        for end in range(start + 1, n + 1):
+            w = sums[end] - sums[start]
+            if w > avail and choice is not None:
+                break
+            if w > avail:
+                cost = (w - avail) * overflow
+            elif end == n:
+                cost = 0
+            else:
+                cost = (avail - w) ** 2
+            if end < n and not breakable[end - 1]:
+                cost += midWord
+            cost += best[end][0]
+            if choice is None or cost < choice[0]:
+                choice = (cost, end)
+        best[start] = choice
+
+    lines = []
+    start = 0
+    while start < n:
+        end = best[start][1]
+        lines.append((start, end))
+        start = end
+    return lines
+
+def wrap(widths, breakable, width, indent = 0, method = 'greedy'):
+    'Wraps cells using greedy() or optimal() algorithm'
+    if method == 'optimal':
+        return optimal(widths, breakable, width, indent)
+    elif method == 'greedy':
+        return greedy(widths, breakable, width, indent)
+    raise ValueError('Unknown wrapping method %r' % method)
@@ -2,23 +2,30 @@ from setuptools import setup, find_packages
 
 setup(
     name = 'pychords',
-    version = '1.0',
+    version = '1.0', # keep in sync with pychords.__version__
     description = 'Tool for processing song lyrics in ChrodPro format',
     url = 'https://github.com/mnezerka/pychords',
     author='Michal Nezerka',
     author_email='michal.nezerka@gmail.com',
     license = 'MIT',
     keywords = 'chordpro',
-    packages = find_packages(),
+    packages = find_packages(exclude = ['benchmarks', 'benchmarks.*']),
+    # importlib.resources.files(), tracemalloc.reset_peak(), ThreadingHTTPServer
+    python_requires = '>=3.9',
     install_requires = ['reportlab'],
+    extras_require = {
+        'parallel': ['pypdf'],
+    },
     classifiers = [
         'Development Status :: 4 - Beta',
         'Intended Audience :: Developers',
         'License :: OSI Approved :: MIT License',
         'Programming Language :: Python :: 3',
-        'Programming Language :: Python :: 3.2',
-        'Programming Language :: Python :: 3.3',
-        'Programming Language :: Python :: 3.4'
+        'Programming Language :: Python :: 3 :: Only',
+        'Programming Language :: Python :: 3.9',
+        'Programming Language :: Python :: 3.10',
+        'Programming Language :: Python :: 3.11',
+        'Programming Language :: Python :: 3.12'
     ],
     entry_points = {
         'console_scripts': [ 'pychords=pychords.main:main']
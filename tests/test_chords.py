@@ -0,0 +1,45 @@
+'''
+Tests of chord name parsing and transposition
+'''
+
+import io
+
+import pytest
+
+from pychords import tokenizer, parser, chords, model
+
+def parse(text):
+    return parser.parse(tokenizer.tokenize(io.StringIO(text)))
+
+@pytest.mark.parametrize('name', ['C', 'C#m7', 'Bbmaj7', 'Am7b5', 'C7#9', 'Gsus4', 'Cadd9',
+                                  'C(add9)', 'G/B', 'F#m7/C#', 'Ebdim', 'Hm', 'CM7', 'C-7', 'C+'])
+def test_chord(name):
+    assert chords.parseChord(name) is not None
+
+@pytest.mark.parametrize('name', ['Bridge', 'Coda', 'Chorus', 'Fine', 'A tempo', 'Dal Segno',
+                                  'N.C.', 'x2', ''])
+def test_not_chord(name):
+    assert chords.parseChord(name) is None
+    assert chords.transposeTable(2, False)[name] == name
+
+def test_transpose_keeps_marks():
+    document = chords.transposeDocument(parse('\n[C]one [Bridge]two [Coda]\n'), 2, False)
+    assert [e.get('c') for e in document.getroot().iter('cho')] == ['D', 'Bridge', 'Coda']
+
+def test_no_diagrams_of_marks():
+    document = parse('\n[C]one [Bridge]two [Fine]\n')
+    assert [name for name, define in chords.songDiagrams(document)] == ['C']
+
+@pytest.mark.parametrize('compact', [False, True])
+def test_transpose_defines(compact):
+    document = parse('{define: F base-fret 1 frets 1 3 3 2 1 1}\n'
+                     '{define: G base-fret 1 frets 3 2 0 0 0 3}\n'
+                     '{define: Intro base-fret 1 frets 0 0 0 0 0 0}\n\n[F]x [G]y\n')
+    if compact:
+        document = model.fromElementTree(document)
+    chords.transposeDocument(document, 2, False)
+    defines = [e.text.strip() for e in document.getroot().find('head').findall('define')]
+    # movable F is shifted, open G is dropped, Intro is not a chord
+    assert defines == ['G base-fret 3 frets 1 3 3 2 1 1', 'Intro base-fret 1 frets 0 0 0 0 0 0']
+    diagrams = dict(chords.songDiagrams(document))
+    assert diagrams['A'] == chords.CATALOG['A']
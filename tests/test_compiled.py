@@ -0,0 +1,109 @@
+'''
+Tests of compiled songbooks - title lookup, header validation and use by
+the command line tool
+'''
+
+import io
+import struct
+
+import pytest
+
+from pychords import tokenizer, parser, compiled, model
+from pychords.incremental import IncrementalBuild
+from pychords.style import StyleSheet
+
+def writeBook(tmp_path, titles, name = 'book'):
+    fileName = str(tmp_path / (name + compiled.suffix))
+    text = '\n{ns}\n'.join('{t:%s}\n\n[C]one\n' % title for title in titles)
+    documents = [d for d, error in parser.parse_songs(tokenizer.tokenize(io.StringIO(text)))]
+    compiled.compileSongbook(fileName, documents)
+    return fileName
+
+def test_incremental_build(tmp_path):
+    fileName = writeBook(tmp_path, ['Zeta', 'Alpha'])
+    build = IncrementalBuild(str(tmp_path / 'build'), StyleSheet(), 2)
+    assert build.build([fileName], str(tmp_path / 'out.pdf')) == 1
+    assert [s[0] for s in build.manifest[fileName]['songs']] == ['Zeta', 'Alpha']
+    assert build.build([fileName], str(tmp_path / 'out.pdf')) == 0
+
+TITLES = ['Zeta', 'alpha', 'Mid', ' Alpha ', 'ALPHA', 'zeta', 'Beta']
+
+def test_find(tmp_path):
+    with compiled.CompiledSongbook(writeBook(tmp_path, TITLES)) as book:
+        # the first of songs with equal keys (case and surrounding spaces
+        #   don't matter) is found
+        assert book.find('Alpha') == 1
+        assert book.find('alpha  ') == 1
+        assert book.find('ZETA') == 0
+        assert book.find('Beta') == 6
+        assert book.find('Mid') == 2
+        for title in ('', 'Alph', 'Alphaa', 'Gamma', 'Aaa', 'Zz'):
+            assert book.find(title) is None
+        assert book.byTitle('zeta').title == 'Zeta'
+        with pytest.raises(KeyError):
+            book.byTitle('Gamma')
+
+def test_find_every_title(tmp_path):
+    titles = ['Song %d' % (i % 37) for i in range(200)]
+    with compiled.CompiledSongbook(writeBook(tmp_path, titles)) as book:
+        for i, title in enumerate(titles):
+            assert book.find(title.upper()) == titles.index(title)
+
+def test_empty(tmp_path):
+    fileName = str(tmp_path / ('empty' + compiled.suffix))
+    assert compiled.compileSongbook(fileName, []) == 0
+    with compiled.CompiledSongbook(fileName) as book:
+        assert len(book) == 0
+        assert book.find('Any') is None
+        assert book.titles() == []
+
+def test_head(tmp_path):
+    text = ('{t:One}\n{st:Sub}\n{define: C base-fret 1 frets x 3 2 0 1 0}\n'
+            '{define: G base-fret 1 frets 3 2 0 0 0 3}\n\n[C]one\n{ns}\n\n[G]untitled\n')
+    documents = [d for d, error in parser.parse_songs(tokenizer.tokenize(io.StringIO(text)))]
+    fileName = str(tmp_path / ('book' + compiled.suffix))
+    compiled.compileSongbook(fileName, documents)
+    with compiled.CompiledSongbook(fileName) as book:
+        assert book.head(0) == ('One', 'Sub', (' C base-fret 1 frets x 3 2 0 1 0',
+                                               ' G base-fret 1 frets 3 2 0 0 0 3'))
+        assert book.head(1) == (None, None, ())
+        # head() and the decoded songs agree
+        for i, document in enumerate(documents):
+            song = model.fromElementTree(document)
+            assert book.head(i) == (song.title, song.subtitle, song.defines)
+            assert book[i].defines == song.defines
+
+def writeBytes(tmp_path, data):
+    fileName = tmp_path / ('bad' + compiled.suffix)
+    fileName.write_bytes(data)
+    return str(fileName)
+
+@pytest.mark.parametrize('size', [0, 1, compiled.header.size - 1, compiled.header.size, 0.5, -4, -1])
+def test_truncated(tmp_path, size):
+    with open(writeBook(tmp_path, TITLES), 'rb') as f:
+        data = f.read()
+    if isinstance(size, float):
+        size = int(len(data) * size)
+    with pytest.raises(ValueError):
+        compiled.CompiledSongbook(writeBytes(tmp_path, data[:size]))
+
+def test_appended(tmp_path):
+    with open(writeBook(tmp_path, TITLES), 'rb') as f:
+        data = f.read()
+    with pytest.raises(ValueError, match = 'Corrupted'):
+        compiled.CompiledSongbook(writeBytes(tmp_path, data + b'\0' * 4))
+
+def test_wrong_magic(tmp_path):
+    with open(writeBook(tmp_path, TITLES), 'rb') as f:
+        data = f.read()
+    with pytest.raises(ValueError, match = 'not a compiled songbook'):
+        compiled.CompiledSongbook(writeBytes(tmp_path, b'PYCHBOOX' + data[8:]))
+    with pytest.raises(ValueError, match = 'not a compiled songbook'):
+        compiled.CompiledSongbook(writeBytes(tmp_path, b'{t:Plain chordpro}\n' * 10))
+
+def test_wrong_version(tmp_path):
+    with open(writeBook(tmp_path, TITLES), 'rb') as f:
+        data = f.read()
+    data = data[:8] + struct.pack('<I', compiled.version + 1) + data[12:]
+    with pytest.raises(ValueError, match = 'Unsupported version'):
+        compiled.CompiledSongbook(writeBytes(tmp_path, data))
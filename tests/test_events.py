@@ -0,0 +1,126 @@
+'''
+Tests of the event API against the documents of parser.parse()
+'''
+
+import io
+import random
+
+import pytest
+
+from pychords import tokenizer, parser, events
+from benchmarks import corpus
+
+def tokens(text):
+    return tokenizer.tokenize(io.StringIO(text))
+
+def fromDocument(text):
+    'Returns blocks, rows and cells of parsed document, comments and meta'
+    root = parser.parse(tokens(text)).getroot()
+    structure = []
+    def walk(element):
+        for e in element:
+            if e.tag in ('verse', 'chorus'):
+                structure.append((events.START, e.tag))
+                walk(e)
+                structure.append((events.END, e.tag))
+            elif e.tag == 'row':
+                # rows of {ci} and {cb} comments have no cells
+                cells = tuple((c.get('c'), c.text) for c in e if c.tag == 'cho')
+                if cells:
+                    structure.append(('row', cells))
+    walk(root.find('body'))
+    comments = sorted((e.text, e.get('italic'), e.get('box')) for e in root.iter('comment'))
+    meta = [(e.tag, e.text) for e in root.find('head')]
+    return structure, comments, meta
+
+def fromEvents(text):
+    'Returns the same as fromDocument() from events'
+    structure = []
+    comments = []
+    meta = []
+    for event, name, value, lineno in events.iterevents(tokens(text)):
+        if name in ('verse', 'chorus'):
+            structure.append((event, name))
+        elif name == 'row' and event is events.START:
+            cells = []
+        elif name == 'row':
+            structure.append(('row', tuple(cells)))
+        elif name == 'cell' and event is events.START:
+            chord = value
+        elif name == 'cell':
+            cells.append((chord, value))
+        elif name == 'comment' and event is events.START:
+            style, text = value
+            comments.append((text, 'true' if style == 'italic' else None, 'true' if style == 'box' else None))
+        elif name == 'meta' and event is events.START:
+            meta.append(value)
+    # parser.parse() stores title and subtitle before defines
+    order = {'title': 0, 'subtitle': 1, 'define': 2}
+    meta.sort(key = lambda m: order[m[0]])
+    return structure, sorted(comments), meta
+
+def test_sample_songs():
+    rnd = random.Random(0)
+    for i in range(50):
+        text = corpus.makeSong(rnd, i)
+        assert fromEvents(text) == fromDocument(text)
+
+@pytest.mark.parametrize('text', [
+    '\n[C]one\n[G]two\n\n[D]three\n',
+    '\n[C]one\n{c:Comment}\n[G]two\n',
+    '\n[C]one\n{ci:Italic}\n[G]two\n',
+    '\n[C]one\n# source comment\n\n[G]two\n',
+    '\n{soc}\n[C]one\n\n[G]two\n{eoc}\n[D]three\n',
+    '{t:Title}\n[C]one\n\n\n\n[G]two',
+    'lyric without chord\n\n[C]one [G]two {c:Inline} [D]three\n',
+])
+def test_same_as_parse(text):
+    assert fromEvents(text) == fromDocument(text)
+
+def structure(text):
+    return [(event, name) for event, name, value, lineno in events.iterevents(tokens(text))
+            if name in ('verse', 'chorus', 'row')]
+
+START, END = events.START, events.END
+
+def test_rows_before_first_blank_line():
+    # as in parser.parse(), rows before the first blank line are in no verse
+    assert structure('[C]one\n[G]two\n\n[D]three\n') == [
+        (START, 'row'), (END, 'row'), (START, 'row'), (END, 'row'),
+        (START, 'verse'), (START, 'row'), (END, 'row'), (END, 'verse')]
+    assert fromEvents('[C]one\n[G]two\n\n[D]three\n') == fromDocument('[C]one\n[G]two\n\n[D]three\n')
+
+def test_verse_boundaries():
+    # a line of directives is blank, a line of {ci} comment is not
+    assert structure('{t:Title}\n[C]one\n{c:Comment}\n[G]two\n{ci:Italic}\n[D]three\n') == [
+        (START, 'verse'), (START, 'row'), (END, 'row'), (END, 'verse'),
+        (START, 'verse'), (START, 'row'), (END, 'row'), (START, 'row'), (END, 'row'), (END, 'verse')]
+
+def test_chorus_boundaries():
+    # blank lines don't end a chorus, {eoc} line is blank
+    assert structure('\n{soc}\n[C]one\n\n[G]two\n{eoc}\n[D]three\n') == [
+        (START, 'chorus'), (START, 'row'), (END, 'row'), (START, 'row'), (END, 'row'), (END, 'chorus'),
+        (START, 'verse'), (START, 'row'), (END, 'row'), (END, 'verse')]
+
+@pytest.mark.parametrize('text', ['{t}\n', '{soc: x}\n', '{unknown}\n'])
+def test_errors(text):
+    with pytest.raises(Exception) as parseError:
+        parser.parse(tokens(text))
+    with pytest.raises(Exception) as eventsError:
+        list(events.iterevents(tokens(text)))
+    assert type(eventsError.value) is type(parseError.value)
+
+def test_feed():
+    class Titles(events.Handler):
+        def __init__(self):
+            self.titles = []
+            self.cells = 0
+        def start(self, name, value, lineno):
+            if name == 'meta' and value[0] == 'title':
+                self.titles.append((value[1], lineno))
+        def end(self, name, value, lineno):
+            if name == 'cell':
+                self.cells += 1
+    handler = events.feed(tokens('{t:One}\n\n[C]one [G]two\n'), Titles())
+    assert handler.titles == [('One', 1)]
+    assert handler.cells == 2
@@ -0,0 +1,30 @@
+'''
+Tests of the incremental PDF build
+'''
+
+import os
+
+from pychords.incremental import IncrementalBuild
+from pychords.style import StyleSheet
+
+def writeSong(directory, name, title):
+    fileName = str(directory / name)
+    with open(fileName, 'w') as f:
+        f.write('{t:%s}\n\n[C]one\n' % title)
+    return fileName
+
+def test_foreign_files_survive(tmp_path):
+    songs = [writeSong(tmp_path, 'a.cho', 'A'), writeSong(tmp_path, 'b.cho', 'B')]
+    foreign = tmp_path / 'important.pdf'
+    foreign.write_bytes(b'%PDF-1.4 not ours')
+    output = str(tmp_path / 'book.pdf')
+
+    build = IncrementalBuild(str(tmp_path), StyleSheet())
+    assert build.build(songs, output) == 2
+    writeSong(tmp_path, 'b.cho', 'B2')
+    assert build.build(songs[1:], output) == 1
+
+    assert foreign.read_bytes() == b'%PDF-1.4 not ours'
+    assert os.path.isfile(output)
+    # only the old artifact of the changed song is gone
+    assert sorted(os.listdir(build.artifactsDir)) == sorted(e['artifact'] for e in build.manifest.values())
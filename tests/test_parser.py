@@ -0,0 +1,80 @@
+'''
+Differential tests of parser.parse() against the original stack based
+parser.parse_stack()
+'''
+
+import io
+import random
+from xml.etree.ElementTree import tostring
+
+import pytest
+
+from pychords import tokenizer, parser
+
+# every directive handled by parser.directive_handler(), with an argument
+#   where one is needed
+DIRECTIVES = [
+    '{t:Title}', '{title:Title}', '{st:Sub}', '{subtitle:Sub}',
+    '{define: C base-fret 1 frets x 3 2 0 1 0}',
+    '{c:Comment}', '{comment:Comment}', '{ci:Italic}', '{comment_italic:Italic}',
+    '{cb:Box}', '{comment_box:Box}', '{soc}', '{start_of_chorus}', '{eoc}',
+    '{end_of_chorus}', '{sot}\ne|--|\n{eot}', '{start_of_tab}\nB|--|\n{end_of_tab}',
+    '{tab:e|-0-|}', '{np}', '{new_page}', '{npp}', '{new_physical_page}', '{ns}',
+    '{new_song}', '{rowname}',
+]
+
+# directives with a wrong number of arguments and unknown ones
+INVALID = [
+    '{t}', '{title:}', '{st}', '{subtitle}', '{define}', '{c}', '{comment:}', '{ci}',
+    '{comment_italic}', '{cb}', '{comment_box}', '{tab}', '{soc:x}', '{eoc:x}',
+    '{start_of_chorus:x}', '{end_of_chorus:x}', '{unknown}', '{x:y}',
+]
+
+LINES = DIRECTIVES + [
+    '', '', '', '[C]one [G]two', 'plain lyric', '[Am]', '[D]x [E]', '# note',
+    'text # note', '[F]a # note', '{soc} [G]after', '[A]before {eoc}',
+    '[G]x {ci:mid} y', '{c:a}{ci:b}',
+]
+
+def outcome(parse, text):
+    'Returns serialized document or name of the raised exception'
+    try:
+        return tostring(parse(tokenizer.tokenize(io.StringIO(text))).getroot())
+    except Exception as e:
+        return type(e).__name__
+
+def assertSame(text):
+    assert outcome(parser.parse, text) == outcome(parser.parse_stack, text), text
+
+def fuzzSong(rnd, lines = 30):
+    return '\n'.join(rnd.choice(LINES) for i in range(rnd.randint(0, lines)))
+
+@pytest.mark.parametrize('directive', DIRECTIVES)
+def test_directive(directive):
+    assertSame(directive)
+    # in a verse, in a chorus and between verses
+    assertSame('[C]one\n%s\n[G]two\n' % directive)
+    assertSame('{soc}\n[C]one\n%s\n[G]two\n{eoc}\n' % directive)
+    assertSame('[C]one\n\n%s\n\n[G]two\n' % directive)
+    assertSame('[C]one %s [G]two\n' % directive.replace('\n', ' '))
+
+@pytest.mark.parametrize('directive', INVALID)
+def test_invalid_directive(directive):
+    assert isinstance(outcome(parser.parse, directive), str)
+    assertSame(directive)
+    assertSame('[C]one\n%s\n' % directive)
+
+def test_empty():
+    assertSame('')
+    assertSame('\n\n\n')
+
+def test_fuzz():
+    rnd = random.Random(0)
+    for i in range(1000):
+        assertSame(fuzzSong(rnd))
+
+def test_parse_songs_after_error():
+    text = '{t:One}\n{ns}\n{t:Two}\n{unknown}\n{ns}\n{t:Three}\n'
+    results = list(parser.parse_songs(tokenizer.tokenize(io.StringIO(text))))
+    assert [type(error) for document, error in results] == [type(None), parser.NotFinishedError, type(None)]
+    assert results[2][0].find('head/title').text == 'Three'
@@ -0,0 +1,32 @@
+'''
+Tests of the profiling summary
+'''
+
+from pychords import profiling, main
+
+def test_whole_run_stages_are_not_files():
+    profiler = profiling.Profiler(traceMemory = False)
+    profiler.start()
+    try:
+        with profiling.stage('parse', 'a.cho') as record:
+            record.count = 3
+        with profiling.stage('render') as record:
+            record.count = 5
+    finally:
+        profiler.stop()
+    assert list(profiler.files()) == ['a.cho']
+    lines = profiler.summary()
+    assert [l.split()[0] for l in lines[1:3]] == ['parse', 'render']
+    files = lines[lines.index('slowest files:') + 1:]
+    assert files[0].split() == ['parse', 'total', 'file']
+    assert [l.split()[-1] for l in files[1:]] == ['a.cho']
+
+def test_command_line(tmp_path, capsys):
+    song = tmp_path / 'song.cho'
+    song.write_text('{t:One}\n\n[C]one\n')
+    main.main(['--profile', '-t', '2', '-n', str(tmp_path / 'book'), str(song)])
+    err = capsys.readouterr().err.splitlines()
+    files = err[err.index('slowest files:') + 1:]
+    assert 'render' not in files[0] and 'transpose' not in files[0]
+    assert [l.split()[-1] for l in files[1:]] == [str(song)]
+    assert any(l.startswith('render') for l in err) and any(l.startswith('transpose') for l in err)
@@ -0,0 +1,52 @@
+'''
+Tests of the HTTP interface of the render server
+'''
+
+import json
+import socket
+import threading
+
+import pytest
+
+from pychords.server import RenderServer
+
+@pytest.fixture(scope = 'module')
+def server():
+    server = RenderServer(('127.0.0.1', 0))
+    thread = threading.Thread(target = server.serve_forever, daemon = True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def post(server, headers, body = b''):
+    'Returns (status, body) of raw request, the server must close the connection'
+    with socket.create_connection(server.server_address, timeout = 5) as s:
+        s.sendall(('POST /render HTTP/1.1\r\nHost: test\r\n%s\r\n' % ''.join(
+            '%s: %s\r\n' % h for h in headers)).encode('ascii') + body)
+        data = b''
+        while True:
+            chunk = s.recv(65536)
+            if not chunk:
+                break
+            data += chunk
+    head, body = data.split(b'\r\n\r\n', 1)
+    return int(head.split()[1]), body
+
+def test_render(server):
+    body = json.dumps({'text': '{t:One}\n\n[C]one\n'}).encode('utf-8')
+    with socket.create_connection(server.server_address, timeout = 5) as s:
+        s.sendall(b'POST /render HTTP/1.1\r\nHost: test\r\nContent-Length: %d\r\n\r\n' % len(body) + body)
+        data = s.recv(65536)
+    assert data.startswith(b'HTTP/1.1 200')
+
+@pytest.mark.parametrize('length', ['-1', 'abc', None])
+def test_invalid_length(server, length):
+    headers = [] if length is None else [('Content-Length', length)]
+    status, body = post(server, headers, b'{"text": ""}')
+    assert status == 400
+    assert 'Content-Length' in json.loads(body.decode('utf-8'))['error']
+
+def test_too_large(server):
+    status, body = post(server, [('Content-Length', str(server.maxRequest + 1))])
+    assert status == 413
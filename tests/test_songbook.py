@@ -0,0 +1,49 @@
+'''
+Tests of lazy access to songs of multi-song files through Songbook
+'''
+
+import io
+from xml.etree.ElementTree import tostring
+
+import pytest
+
+from pychords import tokenizer, parser, songbook
+
+TEXTS = [
+    '{t:One}\n\n[C]one\n{ns}\n{t:Two}\n\n[G]two\n{new_song}\n{t:Three}\n\n[D]three\n',
+    # separators sharing lines with the songs
+    '{t:One}\n\n[C]one\n[A]{ns}{c:Two}[B]{ns}{t:Three}\n\n[E]e\n[F]\n{ns}{t:Four}\n',
+    # blank songs, a tab and a leading separator
+    '{ns}\n\n{t:One}\n{sot}\n{ns}\n{eot}\n{ns}\n\n{ns}\n{t:Two}\n\n[C]two\n{ns}\n',
+    # byte order mark, line ends of windows and multi-byte characters
+    '\ufeff{t:Příliš}\r\n\r\n[C]žluťoučký\r\n{ns}\r\n{t:Kůň}\r\n\r\n[G]úpěl\r\n',
+]
+
+def write(tmp_path, text):
+    fileName = tmp_path / 'songs.cho'
+    fileName.write_bytes(text.encode('utf-8'))
+    return str(fileName)
+
+@pytest.mark.parametrize('text', TEXTS)
+def test_same_as_parse_songs(tmp_path, text):
+    expected = [tostring(d.getroot()) for d, error in
+                parser.parse_songs(tokenizer.tokenize(io.StringIO(text.lstrip('\ufeff'))))]
+    book = songbook.Songbook(write(tmp_path, text), cacheSize = 0)
+    assert len(book) == len(expected)
+    # in reverse, every song is parsed on its own
+    assert [tostring(book[i].getroot()) for i in reversed(range(len(book)))] == expected[::-1]
+
+def test_error_of_one_song(tmp_path):
+    book = songbook.Songbook(write(tmp_path, '{t:One}\n{ns}\n{t:Two}\n{unknown}\n{ns}\n{t:Three}\n'))
+    assert book.titles() == ['One', 'Two', 'Three']
+    with pytest.raises(parser.NotFinishedError):
+        book[1]
+    assert book[2].find('head/title').text == 'Three'
+    assert book[0].find('head/title').text == 'One'
+
+def test_cache_bounded(tmp_path):
+    text = '\n'.join('{t:Song %d}\n\n[C]la la la\n{ns}' % i for i in range(100))
+    book = songbook.Songbook(write(tmp_path, text), cacheSize = 200)
+    for i in range(0, 100, 7):
+        assert book[i].find('head/title').text == 'Song %d' % i
+    assert book.cachedSize <= 200 or len(book.cache) == 1
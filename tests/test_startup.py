@@ -0,0 +1,34 @@
+'''
+Tests of startup cost of the command line tool, heavy backends must be
+imported only when they are needed
+'''
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def run(*args):
+    env = dict(os.environ, PYTHONPATH = root)
+    return subprocess.run([sys.executable] + list(args), cwd = root, env = env, check = True,
+                          stdout = subprocess.PIPE, stderr = subprocess.PIPE, universal_newlines = True)
+
+@pytest.mark.parametrize('module', ['reportlab', 'sqlite3', 'pkg_resources', 'concurrent.futures.process'])
+def test_not_imported(module):
+    result = run('-c', 'import sys, pychords.main; print(%r in sys.modules)' % module)
+    assert result.stdout.strip() == 'False'
+
+def test_import_time():
+    # loose bound, the import takes a few tens of ms when it is lazy
+    best = None
+    for i in range(3):
+        result = run('-X', 'importtime', '-c', 'import pychords.main')
+        for line in result.stderr.splitlines():
+            if line.endswith('| pychords.main'):
+                cumulative = int(line.split('|')[1])
+                best = cumulative if best is None else min(best, cumulative)
+    assert best is not None
+    assert best < 500000
@@ -0,0 +1,39 @@
+'''
+Tests of stream mode against the normal mode of the command line tool
+'''
+
+import io
+
+import pytest
+
+from pychords import tokenizer, parser, compiled, main
+
+def writeFiles(tmp_path):
+    multi = tmp_path / 'multi.cho'
+    multi.write_text('{t:Zeta}\n\n[C]z\n{ns}\n{t:Alpha}\n\n[D]a\n{ns}\n{t:Broken}\n{unknown}\n'
+                     '{ns}\n{t:Mid}\n\n[E]m\n')
+    single = tmp_path / 'single.cho'
+    single.write_text('{t:Beta}\n\n[G]b\n')
+    book = str(tmp_path / ('book' + compiled.suffix))
+    text = '{t:Omega}\n\n[A]o\n{ns}\n{t:Gamma}\n\n[F]g\n'
+    compiled.compileSongbook(book, [d for d, e in parser.parse_songs(tokenizer.tokenize(io.StringIO(text)))])
+    return [str(multi), str(single), book]
+
+def render(tmp_path, files, *options):
+    output = str(tmp_path / 'out')
+    main.main(list(options) + ['-n', output] + files)
+    with open(output + '.txt') as f:
+        return f.read()
+
+@pytest.mark.parametrize('order', ['none', 'title'])
+def test_same_as_normal_mode(tmp_path, order):
+    files = writeFiles(tmp_path)
+    normal = render(tmp_path, files, '-o', order, '-t', '2')
+    assert render(tmp_path, files, '--stream', '-o', order, '-t', '2') == normal
+    titles = [line.replace(' ', '') for line in normal.splitlines() if line.startswith('   ')]
+    if order == 'title':
+        assert titles == ['Alpha', 'Beta', 'Gamma', 'Mid', 'Omega', 'Zeta']
+
+def test_title_order_of_stdin(tmp_path):
+    with pytest.raises(SystemExit):
+        main.main(['--stream', '-o', 'title', '-'])
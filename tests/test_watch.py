@@ -0,0 +1,37 @@
+'''
+Tests of re-reading edited files in watch mode
+'''
+
+import argparse
+
+import pytest
+
+from pychords import main, parser
+
+def readAgain(documents, fileName, watch):
+    args = argparse.Namespace(jobs = 1, transpose = 0, watch = watch)
+    main.readDocuments(documents, [fileName], args, None, False, None)
+
+@pytest.mark.parametrize('content', ['{title}\n\n[C]one\n'.encode('utf-8'), b'\n[C]\xff\n'],
+                         ids = ['directive', 'encoding'])
+def test_bad_save(tmp_path, content):
+    song = tmp_path / 'song.cho'
+    song.write_text('{title: One}\n\n[C]one\n')
+    documents = {}
+    readAgain(documents, str(song), True)
+    previous = documents[str(song)]
+    assert len(previous) == 1
+
+    song.write_bytes(content)
+    readAgain(documents, str(song), True)
+    assert documents[str(song)] is previous
+
+    song.write_text('{title: Two}\n\n[C]two\n')
+    readAgain(documents, str(song), True)
+    assert main.getDocumentTitle(documents[str(song)][0]) == 'Two'
+
+def test_bad_file_without_watch(tmp_path):
+    song = tmp_path / 'song.cho'
+    song.write_text('{title}\n')
+    with pytest.raises(parser.BadDirectiveError):
+        readAgain({}, str(song), False)
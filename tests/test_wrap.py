@@ -0,0 +1,79 @@
+'''
+Tests of wrapping of chord/lyric rows (wrap module and its use by
+render.renderToAscii())
+'''
+
+import io
+
+import pytest
+
+from pychords import tokenizer, parser, render, wrap
+
+METHODS = [wrap.greedy, wrap.optimal]
+
+def lines(ranges, cells):
+    return [''.join(cells[start:end]) for start, end in ranges]
+
+def layout(method, cells, width, indent = 0):
+    'Wraps list of cell texts, word boundary is after a trailing space'
+    return lines(method([len(c) for c in cells], [c.endswith(' ') for c in cells], width, indent), cells)
+
+@pytest.mark.parametrize('method', METHODS)
+def test_fits(method):
+    assert layout(method, ['one ', 'two'], 20) == ['one two']
+    assert layout(method, [], 20) == []
+
+@pytest.mark.parametrize('method', METHODS)
+def test_word_boundary(method):
+    # 'thr' 'ee' is one word split by a chord, the line ends before it
+    cells = ['one ', 'two ', 'thr', 'ee ', 'four']
+    assert layout(method, cells, 12) == ['one two ', 'three four']
+
+@pytest.mark.parametrize('method', METHODS)
+def test_mid_word_fallback(method):
+    # no boundary fits, the word is broken between cells
+    cells = ['abcd', 'efgh', 'ijkl']
+    assert layout(method, cells, 9) == ['abcdefgh', 'ijkl']
+
+@pytest.mark.parametrize('method', METHODS)
+def test_too_wide_cell(method):
+    # a cell is never split, it overflows on a line of its own
+    cells = ['a ', 'very-long-cell ', 'b']
+    assert layout(method, cells, 8) == ['a ', 'very-long-cell ', 'b']
+
+@pytest.mark.parametrize('method', METHODS)
+def test_indent(method):
+    # continuation lines have width - indent
+    cells = ['aaa ', 'bbb ', 'ccc ', 'ddd ']
+    assert layout(method, cells, 8, 4) == ['aaa bbb ', 'ccc ', 'ddd ']
+
+@pytest.mark.parametrize('method', METHODS)
+def test_no_room_for_continuation(method):
+    # width - indent <= 0 - one cell per continuation line, no endless loop
+    for indent in (8, 10):
+        cells = ['aaa ', 'bbb ', 'ccc ', 'ddd ']
+        assert layout(method, cells, 8, indent) == ['aaa bbb ', 'ccc ', 'ddd ']
+
+def test_unknown_method():
+    with pytest.raises(ValueError):
+        wrap.wrap([1], [True], 10, method = 'other')
+
+@pytest.mark.parametrize('method', ['greedy', 'optimal'])
+def test_render_continuation_indent(method):
+    # a blank line opens the first verse
+    text = '\n[C]one [G]two [Am]three [F]four\n\n{soc}\n[C]one [G]two [Am]three [F]four\n{eoc}\n'
+    document = parser.parse(tokenizer.tokenize(io.StringIO(text)))
+    output = [l.rstrip() for l in render.renderToAscii(document, width = 16, wrap_method = method,
+                                                        chorus_indent = '  ')]
+    assert output == [
+        'C   G   Am',
+        'one two three',
+        '  F',
+        '  four',
+        '',
+        '  C   G   Am',
+        '  one two three',
+        '    F',
+        '    four',
+        '',
+    ]